@@ -185,6 +185,19 @@ crypto_features = [
  'DURATION',
 ]
 
+FEATURES = {
+    "Botnet": botnet_best_features,
+    "DoH": doh_best_features,
+    "DoS": dos_best_features,
+    "DNS": dns_malware_features,
+    "TOR": tor_features,
+    "VPN": vpn_features,
+    "ALL": all_best_features,
+    "COMBO": combo_features,
+    "COMBO2": combo_2_features,
+    "Cryptomining": crypto_features,
+}
+
 def without_flow_header(features):
     _f = []
     for f in features:
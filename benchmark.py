@@ -0,0 +1,1060 @@
+#!/usr/bin/python3
+"""Benchmarks of feature_mining.py on synthetic flows.
+
+Usage:
+    benchmark.py features [-o results.json] [--compare baseline.json]
+    benchmark.py scaling [-o results.json] [--flows 1000,4000] [--workers 0,2,4]
+    benchmark.py differential --candidate "-b 64" [--reference ""] [--input "-c NAME.csv"]
+
+features - time every feature function of compute_plugin_metrics on synthetic flows
+           of several kinds (constant-size periodic, bursty, heavy-tailed, tiny) and
+           lengths. Results are saved as JSON baseline, comparing with earlier
+           baseline reports functions that got slower than threshold.
+scaling  - generate reproducible synthetic captures (pcap and tcpdump text) with given
+           number of flows, concurrency, packet rate and distribution of durations, and
+           measure packets/s, flows/s and peak RSS (of main process and of the largest
+           worker process) of -p, -c and -t modes of feature_mining.py for every input
+           size and number of workers.
+differential - run feature_mining.py with reference options and with candidate options
+           (optimized engine, spectral backend, ...) on the same flows and report per
+           column maximal absolute and relative deviation and flows that disagree on
+           boolean features, so fast paths can be adopted feature by feature.
+
+
+Copyright (C) 2022 CESNET
+
+LICENSE TERMS
+
+Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+    1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following disclaimer.
+    2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+    3. Neither the name of the Company nor the names of its contributors may be used to endorse or promote products derived from this software without specific prior written permission.
+
+ALTERNATIVELY, provided that this notice is retained in full, this product may be distributed under the terms of the GNU General Public License (GPL) version 2 or later, in which case the provisions of the GPL apply INSTEAD OF those given above.
+
+This software is provided as is'', and any express or implied warranties, including, but not limited to, the implied warranties of merchantability and fitness for a particular purpose are disclaimed. In no event shall the company or contributors be liable for any direct, indirect, incidental, special, exemplary, or consequential damages (including, but not limited to, procurement of substitute goods or services; loss of use, data, or profits; or business interruption) however caused and on any theory of liability, whether in contract, strict liability, or tort (including negligence or otherwise) arising in any way out of the use of this software, even if advised of the possibility of such damage.
+"""
+# Standard libraries imports
+import os
+import sys
+import time
+import struct
+import shutil
+import shlex
+import socket
+import tempfile
+import subprocess
+import json
+import platform
+import argparse
+from argparse import RawTextHelpFormatter
+import statistics
+import copy
+from datetime import datetime, timezone
+import numpy as np
+
+# Local imports
+import feature_mining as fm
+
+
+# synthetic flows
+FLOW_KINDS = ["periodic", "bursty", "heavy_tailed", "tiny"]
+LENGTHS = [10, 100, 1000, 10000, 100000]
+TINY_LENGTHS = [1, 2, 3]  # lengths of tiny flows, other kinds use LENGTHS
+PERIODIC_INTERVAL = 0.5  # seconds between packets of periodic flow
+PERIODIC_SIZE = 100  # length of packets of periodic flow
+BURST_SIZE = 20  # mean number of packets in burst of bursty flow
+BURST_SPACING = 0.001  # seconds between packets in burst
+BURST_GAP = 5.0  # mean seconds between bursts
+PARETO_SHAPE = 1.5  # shape of Pareto distribution of heavy-tailed flow
+MAX_LENGTH = 1500  # maximal length of packet
+
+
+def generate_flow(kind: str, n: int, rng: np.random.Generator, start: float = 0.0):
+    """Generate synthetic time series of flow.
+
+    Args:
+        kind (str): Kind of flow from FLOW_KINDS.
+        n (int): Number of packets.
+        rng (np.random.Generator): Random generator.
+        start (float, optional): Time of first packet. Defaults to 0.0.
+
+    Returns:
+        tuple: Lengths of packets (np.ndarray of int64) and times of packets
+            (np.ndarray of float64, increasing).
+    """
+    if kind == "periodic":
+        # constant size and interval with jitter of timestamps
+        lengths = np.full(n, PERIODIC_SIZE, dtype=np.int64)
+        gaps = PERIODIC_INTERVAL + rng.normal(0, PERIODIC_INTERVAL / 100, n)
+    elif kind == "bursty":
+        # bursts of small and full size packets separated by long gaps
+        lengths = rng.choice([40, 52, MAX_LENGTH], size=n, p=[0.3, 0.2, 0.5])
+        gaps = np.full(n, BURST_SPACING)
+        gaps[rng.random(n) < 1 / BURST_SIZE] = BURST_GAP
+        gaps *= rng.exponential(1.0, n)
+    elif kind == "heavy_tailed":
+        lengths = np.minimum(40 + rng.pareto(PARETO_SHAPE, n) * 100, MAX_LENGTH)
+        gaps = rng.pareto(PARETO_SHAPE, n) * 0.01
+    elif kind == "tiny":
+        lengths = rng.integers(40, MAX_LENGTH + 1, n)
+        gaps = rng.exponential(1.0, n)
+    else:
+        raise ValueError(f"Unknown kind of flow {kind}.")
+    gaps[0] = 0
+    times = start + np.cumsum(np.abs(gaps))
+    return lengths.astype(np.int64), times.astype(np.float64)
+
+
+def get_flow_lengths(kind: str, lengths: list):
+    """Get lengths of flows of kind, tiny flows have always TINY_LENGTHS."""
+    if kind == "tiny":
+        return TINY_LENGTHS
+    return lengths
+
+
+# benchmarks of feature functions
+MIN_REPEATS = 3
+MAX_REPEATS = 10000
+MIN_TIME = 0.2  # seconds of measured calls of one benchmark
+THRESHOLD = 1.25  # ratio of time to baseline that is reported as slowdown
+
+
+class FlowInputs(object):
+    """Inputs of feature functions of one flow prepared the same way as in
+    compute_plugin_metrics, so preparation is not part of measured calls. Plugin has
+    basic statistics that other steps read (FEATURE_STEPS), every call gets its copy.
+    """
+
+    def __init__(self, lengths: np.ndarray, times: np.ndarray, backend: str, grid: str):
+        self.bytes = lengths
+        self.time = times
+        self.data = lengths + 60
+        self.hist = {}
+        for d in self.data:
+            if d not in self.hist:
+                self.hist[d] = 0
+            self.hist[d] += 1
+        self.padded = dict(self.hist)
+        fm.pad_histogram(self.padded)
+        self.moments = fm.get_moments(self.data)
+        self.plugin = fm.TimeSeriesPlugin("", "", 0, 0)
+        fm.get_basic_stats(self.data, self.plugin, self.moments)
+        self.agg = fm.aggreagation_of_time_series(self.data, self.time)
+        self.spaces = fm.perform_spaces_detection(
+            self.time, space_min_length=0.05, sig_space_threshold=10
+        )
+        self.backend = backend
+        self.grid = grid
+
+
+# calls of feature functions with arguments of compute_plugin_metrics, histogram is
+# copied for functions that pad it
+BENCHMARKS = {
+    "get_moments": lambda f, p: fm.get_moments(f.data),
+    "get_basic_stats": lambda f, p: fm.get_basic_stats(f.data, p, f.moments),
+    "get_skewness": lambda f, p: fm.get_skewness(f.data, f.hist, p, f.moments),
+    "get_kurtosis": lambda f, p: fm.get_kurtosis(f.data, p, f.moments),
+    "get_entropy": lambda f, p: fm.get_entropy(f.data, p),
+    "perform_getting_hurst_exponent": lambda f, p: fm.perform_getting_hurst_exponent(f.data, p),
+    "is_benford_law_present": lambda f, p: fm.is_benford_law_present(f.data, f.hist, p),
+    "benford_law_probability": lambda f, p: fm.benford_law_probability(f.data, dict(f.hist), p),
+    "pad_histogram": lambda f, p: fm.pad_histogram(dict(f.hist)),
+    "get_area_of_value_distribution": lambda f, p: fm.get_area_of_value_distribution(f.padded, p),
+    "aggreagation_of_time_series": lambda f, p: fm.aggreagation_of_time_series(f.data, f.time),
+    "is_normal_distribution_present": lambda f, p: fm.is_normal_distribution_present(f.agg, p),
+    "get_cnt_distribution": lambda f, p: fm.get_cnt_distribution(f.agg, p),
+    "get_time_distribution": lambda f, p: fm.get_time_distribution(f.time, p),
+    "get_mean_scaled_time": lambda f, p: fm.get_mean_scaled_time(f.time, p),
+    "get_mean_difftimes": lambda f, p: fm.get_mean_difftimes(f.time, p),
+    "perform_spaces_detection": lambda f, p: fm.perform_spaces_detection(
+        f.time, space_min_length=0.05, sig_space_threshold=10
+    ),
+    "get_switching_metric": lambda f, p: fm.get_switching_metric(f.data, p),
+    "has_transient": lambda f, p: fm.has_transient(f.data, f.time, p, f.spaces),
+    "get_cnt_behavior": lambda f, p: fm.get_cnt_behavior(f.agg, p),
+    "has_clear_periodicity": lambda f, p: fm.has_clear_periodicity(f.data, f.time, f.hist, p),
+    "compute_frequency_features": lambda f, p: fm.compute_frequency_features(
+        f.time, f.data, p, f.backend, f.grid
+    ),
+    "compute_plugin_metrics": lambda f, p: fm.compute_plugin_metrics(
+        f.bytes, f.time, "", "", 0, 0, None, f.backend, f.grid
+    ),
+}
+
+
+def measure(function, flow: FlowInputs, min_time: float = MIN_TIME):
+    """Measure calls of benchmark on flow until they take min_time seconds.
+
+    Args:
+        function (function): Benchmark from BENCHMARKS.
+        flow (FlowInputs): Inputs of flow.
+        min_time (float, optional): Minimal measured time in seconds. Defaults to MIN_TIME.
+
+    Returns:
+        dict: Minimal, median and mean time of call in seconds and number of calls.
+    """
+    durations = []
+    total = 0.0
+    while len(durations) < MAX_REPEATS and (
+        len(durations) < MIN_REPEATS or total < min_time
+    ):
+        plugin = copy.copy(flow.plugin)
+        start = time.perf_counter()
+        function(flow, plugin)
+        duration = time.perf_counter() - start
+        durations.append(duration)
+        total += duration
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": total / len(durations),
+        "repeats": len(durations),
+    }
+
+
+def run_feature_benchmarks(
+    functions: list,
+    kinds: list,
+    lengths: list,
+    seed: int = 0,
+    min_time: float = MIN_TIME,
+    backend: str = "astropy",
+    grid: str = "fixed",
+):
+    """Run benchmarks of feature functions on synthetic flows.
+
+    Args:
+        functions (list): Names of benchmarks from BENCHMARKS.
+        kinds (list): Kinds of flows from FLOW_KINDS.
+        lengths (list): Lengths of flows (tiny flows have TINY_LENGTHS).
+        seed (int, optional): Seed of random generator of flows. Defaults to 0.
+        min_time (float, optional): Minimal measured time of benchmark. Defaults to MIN_TIME.
+        backend (str, optional): Spectral backend from SPECTRAL_BACKENDS. Defaults to "astropy".
+        grid (str, optional): Frequency grid from FREQUENCY_GRIDS. Defaults to "fixed".
+
+    Returns:
+        dict: Results by key function/kind/length.
+    """
+    results = {}
+    for kind in kinds:
+        for n in get_flow_lengths(kind, lengths):
+            rng = np.random.default_rng([seed, FLOW_KINDS.index(kind), n])
+            flow = FlowInputs(*generate_flow(kind, n, rng), backend, grid)
+            for name in functions:
+                result = measure(BENCHMARKS[name], flow, min_time)
+                results[f"{name}/{kind}/{n}"] = result
+                print(
+                    f"  {name:<32} {kind:<13} {n:>7} {result['min'] * 1e6:14.1f} {result['median'] * 1e6:14.1f} {result['repeats']:>7}",
+                    flush=True,
+                )
+    return results
+
+
+def get_environment():
+    """Get description of machine and versions for baseline."""
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+    }
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = THRESHOLD):
+    """Compare minimal times of benchmarks with baseline.
+
+    Args:
+        results (dict): Results of run_feature_benchmarks.
+        baseline (dict): Results of earlier run.
+        threshold (float, optional): Ratio of times reported as slowdown. Defaults to THRESHOLD.
+
+    Returns:
+        list: Slowdowns as tuples (key, baseline time, time, ratio) sorted by ratio.
+    """
+    slowdowns = []
+    for key, result in results.items():
+        if key not in baseline or baseline[key]["min"] <= 0:
+            continue
+        ratio = result["min"] / baseline[key]["min"]
+        if ratio > threshold:
+            slowdowns.append((key, baseline[key]["min"], result["min"], ratio))
+    slowdowns.sort(key=lambda slowdown: -slowdown[3])
+    return slowdowns
+
+
+def benchmark_features(arg):
+    """Run benchmarks of feature functions selected by arguments, save results and
+    compare them with baseline.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+
+    Returns:
+        int: Exit status, 1 if some benchmark is slower than baseline.
+    """
+    functions = arg.functions.split(",") if arg.functions != "" else list(BENCHMARKS)
+    for name in functions:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark {name}.")
+    kinds = arg.kinds.split(",")
+    lengths = [int(n) for n in arg.lengths.split(",")]
+    print(f"  {'function':<32} {'kind':<13} {'packets':>7} {'min [us]':>14} {'median [us]':>14} {'repeats':>7}")
+    results = run_feature_benchmarks(
+        functions, kinds, lengths, arg.seed, arg.min_time, arg.spectral_backend, arg.frequency_grid
+    )
+    report = {
+        "benchmark": "features",
+        "environment": get_environment(),
+        "settings": {
+            "seed": arg.seed,
+            "min_time": arg.min_time,
+            "spectral_backend": arg.spectral_backend,
+            "frequency_grid": arg.frequency_grid,
+        },
+        "results": results,
+    }
+    if arg.output != "":
+        with open(arg.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if arg.compare == "":
+        return 0
+    with open(arg.compare, "r") as f:
+        baseline = json.load(f)
+    slowdowns = compare_results(results, baseline["results"], arg.threshold)
+    print(f"Compared with {arg.compare} ({baseline['environment']['date']}):")
+    for key, old, new, ratio in slowdowns:
+        print(f"  SLOWER {key:<60} {old * 1e6:12.1f} us -> {new * 1e6:12.1f} us ({ratio:.2f}x)")
+    print(f"  {len(slowdowns)} of {len(results)} benchmarks slower than {arg.threshold}x")
+    return 1 if len(slowdowns) > 0 else 0
+
+
+# synthetic captures
+CAPTURE_START = 1662638393.0  # time of first packet of capture
+DURATIONS = ["exponential", "lognormal", "uniform"]
+LOGNORMAL_SIGMA = 1.0  # sigma of lognormal distribution of durations of flows
+REVERSE_PROBABILITY = 0.4  # probability of packet of flow sent by its destination
+HEADERS_LENGTH = 54  # Ethernet, IPv4 and TCP headers of frame in pcap
+SERVER_PORTS = [443, 80, 22, 8080]
+
+
+def get_durations(distribution: str, mean: float, n: int, rng: np.random.Generator):
+    """Get durations of flows with given distribution and mean.
+
+    Args:
+        distribution (str): Distribution from DURATIONS.
+        mean (float): Mean duration in seconds.
+        n (int): Number of flows.
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        np.ndarray: Durations of flows.
+    """
+    if distribution == "exponential":
+        return rng.exponential(mean, n)
+    if distribution == "lognormal":
+        return rng.lognormal(np.log(mean) - LOGNORMAL_SIGMA**2 / 2, LOGNORMAL_SIGMA, n)
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean, n)
+    raise ValueError(f"Unknown distribution of durations {distribution}.")
+
+
+def generate_capture(
+    flows: int,
+    concurrency: float,
+    rate: float,
+    packets: float,
+    durations: str = "exponential",
+    seed: int = 0,
+):
+    """Generate synthetic capture of TCP flows. Flows arrive as Poisson process, so
+    on average concurrency flows are active (Little's law) and packets arrive at rate
+    packets per second. Time series of flows have kinds of FLOW_KINDS and are
+    stretched to durations of flows.
+
+    Args:
+        flows (int): Number of flows.
+        concurrency (float): Mean number of concurrently active flows.
+        rate (float): Mean number of packets per second of capture.
+        packets (float): Mean number of packets of flow (geometric distribution, so
+            there are tiny flows too).
+        durations (str, optional): Distribution of durations of flows from DURATIONS. Defaults to "exponential".
+        seed (int, optional): Seed of random generator. Defaults to 0.
+
+    Returns:
+        dict: Columns of packets sorted by time (time, src_ip, src_port, dst_ip,
+            dst_port as numpy arrays, IPv4 addresses as integers, length of frame).
+    """
+    rng = np.random.default_rng(seed)
+    arrival = rate / packets
+    starts = CAPTURE_START + np.cumsum(rng.exponential(1 / arrival, flows))
+    lengths = rng.geometric(1 / packets, flows)
+    flow_durations = get_durations(durations, concurrency / arrival, flows, rng)
+    kinds = rng.choice(FLOW_KINDS[:3], size=flows)
+    columns = {name: [] for name in ["time", "flow", "length", "reverse"]}
+    for i in range(flows):
+        size, times = generate_flow(kinds[i], int(lengths[i]), rng)
+        if times[-1] > 0:
+            times = times * (flow_durations[i] / times[-1])
+        columns["time"].append(starts[i] + times)
+        columns["flow"].append(np.full(len(times), i, dtype=np.int64))
+        columns["length"].append(np.maximum(size, HEADERS_LENGTH))
+        columns["reverse"].append(rng.random(len(times)) < REVERSE_PROBABILITY)
+    columns = {name: np.concatenate(values) for name, values in columns.items()}
+    # timestamps of captures have microseconds
+    columns["time"] = np.round(columns["time"], 6)
+    order = np.argsort(columns["time"], kind="stable")
+    flow = columns["flow"][order]
+    reverse = columns["reverse"][order]
+    client_ip = (10 << 24) + np.arange(flows, dtype=np.int64)
+    client_port = rng.integers(1024, 65536, flows)
+    server_ip = (172 << 24) + (16 << 16) + rng.integers(1, 1 << 12, flows)
+    server_port = rng.choice(SERVER_PORTS, size=flows)
+    return {
+        "time": columns["time"][order],
+        "src_ip": np.where(reverse, server_ip[flow], client_ip[flow]),
+        "src_port": np.where(reverse, server_port[flow], client_port[flow]),
+        "dst_ip": np.where(reverse, client_ip[flow], server_ip[flow]),
+        "dst_port": np.where(reverse, client_port[flow], server_port[flow]),
+        "length": columns["length"][order],
+    }
+
+
+def iter_capture(capture: dict):
+    """Iterate packets of capture as (seconds, microseconds, src_ip, src_port, dst_ip,
+    dst_port, length) with addresses as strings."""
+    microseconds = np.round(capture["time"] * 1e6).astype(np.int64)
+    for ts, src_ip, src_port, dst_ip, dst_port, length in zip(
+        microseconds.tolist(),
+        capture["src_ip"].tolist(),
+        capture["src_port"].tolist(),
+        capture["dst_ip"].tolist(),
+        capture["dst_port"].tolist(),
+        capture["length"].tolist(),
+    ):
+        yield (
+            ts // 1000000,
+            ts % 1000000,
+            socket.inet_ntoa(struct.pack("!I", src_ip)),
+            src_port,
+            socket.inet_ntoa(struct.pack("!I", dst_ip)),
+            dst_port,
+            length,
+        )
+
+
+def write_pcap(path: str, capture: dict):
+    """Write capture as pcap file with Ethernet frames. Captured length of frame is
+    length of packet, so -p input has the same lengths as -c input of write_tcpdump_text.
+
+    Args:
+        path (str): Path of pcap file.
+        capture (dict): Capture from generate_capture.
+    """
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        ethernet = b"\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00"
+        for sec, usec, src_ip, src_port, dst_ip, dst_port, length in iter_capture(capture):
+            ip = struct.pack(
+                "!BBHHHBBH4s4s",
+                0x45,
+                0,
+                length - 14,
+                0,
+                0,
+                64,
+                fm.TCP,
+                0,
+                socket.inet_aton(src_ip),
+                socket.inet_aton(dst_ip),
+            )
+            tcp = struct.pack("!HHIIBBHHH", src_port, dst_port, 0, 0, 0x50, 0x10, 0, 0, 0)
+            f.write(struct.pack("<IIII", sec, usec, length, length))
+            f.write(ethernet + ip + tcp + bytes(length - HEADERS_LENGTH))
+
+
+def write_tcpdump_text(path: str, capture: dict):
+    """Write capture in layout of tcpdump -N -n -q -tt output.
+
+    Args:
+        path (str): Path of text file.
+        capture (dict): Capture from generate_capture.
+    """
+    with open(path, "w") as f:
+        for sec, usec, src_ip, src_port, dst_ip, dst_port, length in iter_capture(capture):
+            f.write(
+                f"{sec}.{usec:06d} IP {src_ip}.{src_port} > {dst_ip}.{dst_port}: tcp {length}\n"
+            )
+
+
+# end-to-end scaling benchmark
+SCALING_MODES = ["p", "c", "t"]
+SCALING_FLOWS = [1000, 4000]
+SCALING_WORKERS = [0, 1, 2, 4]
+CONCURRENCY = 200
+RATE = 2000.0  # packets per second of synthetic capture
+PACKETS_PER_FLOW = 20.0
+FEATURE_MINING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_mining.py")
+
+
+def run_feature_mining(args: list):
+    """Run feature_mining.py with --quiet and get its JSON summary.
+
+    Args:
+        args (list): Arguments of feature_mining.py.
+
+    Returns:
+        dict: Summary of run from the last line of output.
+    """
+    output = subprocess.run(
+        [sys.executable, FEATURE_MINING, *args, "--quiet"],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark_scaling(arg):
+    """Generate synthetic captures and measure modes of feature_mining.py for every
+    number of flows and workers selected by arguments.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+
+    Returns:
+        int: Exit status.
+    """
+    directory = arg.directory if arg.directory != "" else tempfile.mkdtemp()
+    os.makedirs(directory, exist_ok=True)
+    extra = shlex.split(arg.options)
+    modes = arg.modes.split(",")
+    captures = {}
+    results = []
+    print(
+        f"  {'mode':<4} {'flows':>7} {'workers':>7} {'packets/s':>12} {'flows/s':>10} {'speedup':>8} {'main RSS [MB]':>14} {'child RSS [MB]':>15}"
+    )
+    try:
+        for flows in [int(n) for n in arg.flows.split(",")]:
+            capture = generate_capture(
+                flows, arg.concurrency, arg.rate, arg.packets, arg.durations, arg.seed
+            )
+            pcap = os.path.join(directory, f"capture_{flows}.pcap")
+            text = os.path.join(directory, f"capture_{flows}.txt")
+            timeseries = os.path.join(directory, f"capture_{flows}.timeseries.csv")
+            output = os.path.join(directory, "flows.csv")
+            write_pcap(pcap, capture)
+            write_tcpdump_text(text, capture)
+            captures[flows] = {
+                "packets": len(capture["time"]),
+                "seconds": float(capture["time"][-1] - capture["time"][0]),
+                "pcap_bytes": os.path.getsize(pcap),
+                "text_bytes": os.path.getsize(text),
+            }
+            if "t" in modes:
+                run_feature_mining(["-c", text, "--file", timeseries, "--no-cache"])
+            for mode in modes:
+                inputs = {"p": ["-p", pcap], "c": ["-c", text], "t": ["-t", timeseries]}
+                # -t input has no workers of flow assembler
+                workers = [0] if mode == "t" else [int(n) for n in arg.workers.split(",")]
+                base = None
+                for n in workers:
+                    args = [*inputs[mode], "-f", output, "--no-cache", *extra]
+                    if n > 0:
+                        args += ["--workers", str(n)]
+                    summary = run_feature_mining(args)
+                    if base is None:
+                        base = summary["seconds"]
+                    result = {
+                        "mode": mode,
+                        "flows": flows,
+                        "workers": n,
+                        "exported_flows": summary["flows"],
+                        "packets": summary["packets"],
+                        "seconds": summary["seconds"],
+                        "packets_per_second": summary["packets_per_second"],
+                        "flows_per_second": summary["flows_per_second"],
+                        "speedup": base / summary["seconds"] if summary["seconds"] > 0 else None,
+                        # peak RSS of main process and of the largest worker process
+                        "peak_rss": summary["peak_rss"],
+                        "peak_rss_children": summary["peak_rss_children"],
+                    }
+                    results.append(result)
+                    rss = (summary["peak_rss"] or 0) / 2**20
+                    rss_children = (summary["peak_rss_children"] or 0) / 2**20
+                    print(
+                        f"  {mode:<4} {flows:>7} {n:>7} {result['packets_per_second'] or 0:12.0f} {result['flows_per_second'] or 0:10.1f} {result['speedup'] or 0:8.2f} {rss:14.0f} {rss_children:15.0f}",
+                        flush=True,
+                    )
+    finally:
+        if arg.directory == "":
+            shutil.rmtree(directory)
+    report = {
+        "benchmark": "scaling",
+        "environment": {**get_environment(), "cpus": os.cpu_count()},
+        "settings": {
+            "concurrency": arg.concurrency,
+            "rate": arg.rate,
+            "packets": arg.packets,
+            "durations": arg.durations,
+            "seed": arg.seed,
+            "options": arg.options,
+        },
+        "captures": captures,
+        "results": results,
+    }
+    if arg.output != "":
+        with open(arg.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+# differential check of optimized engines against reference
+FLOW_KEY = ["SRC_IP", "SRC_PORT", "DST_IP", "DST_PORT", "TIME_FIRST"]
+DIFFERENTIAL_FLOWS = 500  # flows of synthetic capture when input is not given
+ABSOLUTE_TOLERANCE = 1e-12
+RELATIVE_TOLERANCE = 1e-9
+LISTED_FLOWS = 10  # flows listed for every boolean feature with disagreement
+
+
+def get_flow_keys(columns: dict):
+    """Get keys of flows of columnar output as strings "SRC_IP:SRC_PORT > DST_IP:DST_PORT @ TIME_FIRST"."""
+    return [
+        f"{src_ip}:{src_port} > {dst_ip}:{dst_port} @ {time_first!r}"
+        for src_ip, src_port, dst_ip, dst_port, time_first in zip(
+            *(columns[name].tolist() for name in FLOW_KEY)
+        )
+    ]
+
+
+def compare_columns(
+    reference: dict,
+    candidate: dict,
+    atol: float = ABSOLUTE_TOLERANCE,
+    rtol: float = RELATIVE_TOLERANCE,
+    listed: int = LISTED_FLOWS,
+):
+    """Compare columns of flows computed by reference and by candidate. Flows are
+    matched by FLOW_KEY, so order of flows may differ.
+
+    Args:
+        reference (dict): Columns of reference output from read_columnar_output.
+        candidate (dict): Columns of candidate output from read_columnar_output.
+        atol (float, optional): Absolute tolerance of numeric columns. Defaults to ABSOLUTE_TOLERANCE.
+        rtol (float, optional): Relative tolerance of numeric columns. Defaults to RELATIVE_TOLERANCE.
+        listed (int, optional): Maximal number of listed disagreeing flows. Defaults to LISTED_FLOWS.
+
+    Returns:
+        dict: Matched and unmatched flows and deviations of every common column with
+            status "equal", "within" (tolerance) or "deviates".
+    """
+    reference_keys = get_flow_keys(reference)
+    candidate_keys = get_flow_keys(candidate)
+    candidate_index = {key: i for i, key in enumerate(candidate_keys)}
+    pairs = [(i, candidate_index[key]) for i, key in enumerate(reference_keys) if key in candidate_index]
+    ref_rows = np.array([i for i, _ in pairs], dtype=np.int64)
+    cand_rows = np.array([j for _, j in pairs], dtype=np.int64)
+    keys = [reference_keys[i] for i in ref_rows]
+    columns = {}
+    for name in fm.HEADER:
+        if name not in reference or name not in candidate or name in FLOW_KEY:
+            continue
+        a = np.asarray(reference[name])[ref_rows]
+        b = np.asarray(candidate[name])[cand_rows]
+        if fm.is_boolean_column(name):
+            # booleans are float 0/1 with NaN without value, which must be missing in both outputs
+            a, b = (
+                np.array(
+                    [None if np.isnan(value) else bool(value) for value in c.astype(np.float64)],
+                    dtype=object,
+                )
+                for c in (a, b)
+            )
+        if a.dtype.kind in "bUO":
+            different = np.flatnonzero(a != b)
+            a = a.tolist()
+            b = b.tolist()
+            columns[name] = {
+                "status": "equal" if len(different) == 0 else "deviates",
+                "disagreeing": len(different),
+                "flows": [
+                    {"flow": keys[i], "reference": a[i], "candidate": b[i]}
+                    for i in different[:listed]
+                ],
+            }
+            continue
+        a = a.astype(np.float64)
+        b = b.astype(np.float64)
+        # features without value are NaN, they must be missing in both outputs
+        missing = np.isnan(a) != np.isnan(b)
+        valid = ~np.isnan(a) & ~np.isnan(b)
+        absolute = np.abs(a[valid] - b[valid])
+        scale = np.maximum(np.abs(a[valid]), np.abs(b[valid]))
+        relative = np.divide(absolute, scale, out=np.zeros_like(absolute), where=scale > 0)
+        exceeding = absolute > atol + rtol * scale
+        if missing.any() or exceeding.any():
+            status = "deviates"
+        elif (absolute > 0).any():
+            status = "within"
+        else:
+            status = "equal"
+        columns[name] = {
+            "status": status,
+            "max_absolute": float(absolute.max()) if len(absolute) > 0 else 0.0,
+            "max_relative": float(relative.max()) if len(relative) > 0 else 0.0,
+            "exceeding": int(exceeding.sum()),
+            "missing": int(missing.sum()),
+        }
+    return {
+        "flows": len(pairs),
+        "reference_only": sorted(set(reference_keys) - set(candidate_keys))[:listed],
+        "candidate_only": sorted(set(candidate_keys) - set(reference_keys))[:listed],
+        "unmatched": len(reference_keys) + len(candidate_keys) - 2 * len(pairs),
+        "columns": columns,
+    }
+
+
+def benchmark_differential(arg):
+    """Run feature_mining.py with reference and candidate options on the same input
+    and compare their outputs column by column.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+
+    Returns:
+        int: Exit status, 1 if some column deviates or some flows are unmatched.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        if arg.input != "":
+            inputs = shlex.split(arg.input)
+        else:
+            capture = generate_capture(
+                arg.flows, CONCURRENCY, RATE, PACKETS_PER_FLOW, "exponential", arg.seed
+            )
+            inputs = ["-c", os.path.join(directory, "capture.txt")]
+            write_tcpdump_text(inputs[1], capture)
+        outputs = {}
+        for name, options in [("reference", arg.reference), ("candidate", arg.candidate)]:
+            path = os.path.join(directory, name)
+            run_feature_mining(
+                [*inputs, *shlex.split(options), "-f", path, "--output-format", "npy", "--no-cache"]
+            )
+            outputs[name] = {
+                column: np.array(values)
+                for column, values in fm.read_columnar_output(path, "npy").items()
+            }
+    finally:
+        shutil.rmtree(directory)
+    result = compare_columns(
+        outputs["reference"], outputs["candidate"], arg.atol, arg.rtol, arg.listed
+    )
+    print(f"Reference: {arg.reference or '(default)'}")
+    print(f"Candidate: {arg.candidate}")
+    print(f"Matched flows: {result['flows']}, unmatched flows: {result['unmatched']}")
+    for key in result["reference_only"]:
+        print(f"  ONLY IN REFERENCE {key}")
+    for key in result["candidate_only"]:
+        print(f"  ONLY IN CANDIDATE {key}")
+    print(f"  {'column':<32} {'status':<8} {'max abs':>12} {'max rel':>12} {'exceeding':>9} {'missing':>8}")
+    for name, column in result["columns"].items():
+        if "disagreeing" in column:
+            print(f"  {name:<32} {column['status']:<8} {'':>12} {'':>12} {column['disagreeing']:>9} {'':>8}")
+            for flow in column["flows"]:
+                print(f"      {flow['flow']}: {flow['reference']} -> {flow['candidate']}")
+        else:
+            print(
+                f"  {name:<32} {column['status']:<8} {column['max_absolute']:12.3g} {column['max_relative']:12.3g} {column['exceeding']:>9} {column['missing']:>8}"
+            )
+    deviating = [name for name, column in result["columns"].items() if column["status"] == "deviates"]
+    print(f"{len(deviating)} of {len(result['columns'])} columns deviate: {', '.join(deviating)}")
+    if arg.output != "":
+        report = {
+            "benchmark": "differential",
+            "environment": get_environment(),
+            "settings": {
+                "input": arg.input,
+                "flows": arg.flows if arg.input == "" else None,
+                "seed": arg.seed,
+                "reference": arg.reference,
+                "candidate": arg.candidate,
+                "atol": arg.atol,
+                "rtol": arg.rtol,
+            },
+            "result": result,
+        }
+        with open(arg.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if len(deviating) > 0 or result["unmatched"] > 0 else 0
+
+
+def parse_arguments():
+    """Parse program arguments using the argparse module.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="""Benchmarks of feature_mining.py on synthetic flows.
+
+    Usage:""",
+        formatter_class=RawTextHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    features = subparsers.add_parser(
+        "features",
+        help="Time every feature function of compute_plugin_metrics on synthetic flows.",
+        formatter_class=RawTextHelpFormatter,
+    )
+    features.add_argument(
+        "-o",
+        "--output",
+        help="Specification of JSON file for results (baseline for next runs). Default is disabled.",
+        type=str,
+        metavar="NAME.json",
+        default="",
+    )
+    features.add_argument(
+        "--compare",
+        help="Specification of JSON file with baseline from earlier run, exit status is 1 if some benchmark is slower.",
+        type=str,
+        metavar="NAME.json",
+        default="",
+    )
+    features.add_argument(
+        "--threshold",
+        help=f"Ratio of minimal time to baseline reported as slowdown. Default is {THRESHOLD}.",
+        type=float,
+        metavar="RATIO",
+        default=THRESHOLD,
+    )
+    features.add_argument(
+        "--functions",
+        help=f"Comma separated benchmarks ({', '.join(BENCHMARKS)}). Default is all.",
+        type=str,
+        metavar="NAMES",
+        default="",
+    )
+    features.add_argument(
+        "--kinds",
+        help=f"Comma separated kinds of flows ({', '.join(FLOW_KINDS)}). Default is all.",
+        type=str,
+        metavar="KINDS",
+        default=",".join(FLOW_KINDS),
+    )
+    features.add_argument(
+        "--lengths",
+        help=f"Comma separated numbers of packets of flows, tiny flows have {TINY_LENGTHS}. Default is {','.join(map(str, LENGTHS))}.",
+        type=str,
+        metavar="NUMBERS",
+        default=",".join(map(str, LENGTHS)),
+    )
+    features.add_argument(
+        "--min-time",
+        help=f"Minimal measured time of one benchmark in seconds. Default is {MIN_TIME}.",
+        type=float,
+        metavar="SECONDS",
+        default=MIN_TIME,
+    )
+    features.add_argument(
+        "--seed",
+        help="Seed of random generator of synthetic flows. Default is 0.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    features.add_argument(
+        "--spectral-backend",
+        help="Backend of Lomb-Scargle periodogram, see feature_mining.py. Default is astropy.",
+        type=str,
+        choices=fm.SPECTRAL_BACKENDS,
+        default="astropy",
+    )
+    features.add_argument(
+        "--frequency-grid",
+        help="Frequency grid of periodogram, see feature_mining.py. Default is fixed.",
+        type=str,
+        choices=fm.FREQUENCY_GRIDS,
+        default="fixed",
+    )
+    scaling = subparsers.add_parser(
+        "scaling",
+        help="Measure -p, -c and -t modes of feature_mining.py on synthetic captures.",
+        formatter_class=RawTextHelpFormatter,
+    )
+    scaling.add_argument(
+        "-o",
+        "--output",
+        help="Specification of JSON file for results. Default is disabled.",
+        type=str,
+        metavar="NAME.json",
+        default="",
+    )
+    scaling.add_argument(
+        "--modes",
+        help=f"Comma separated modes of feature_mining.py ({', '.join(SCALING_MODES)}). Default is all.",
+        type=str,
+        metavar="MODES",
+        default=",".join(SCALING_MODES),
+    )
+    scaling.add_argument(
+        "--flows",
+        help=f"Comma separated numbers of flows of captures. Default is {','.join(map(str, SCALING_FLOWS))}.",
+        type=str,
+        metavar="NUMBERS",
+        default=",".join(map(str, SCALING_FLOWS)),
+    )
+    scaling.add_argument(
+        "--workers",
+        help=f"Comma separated numbers of feature workers (--workers of feature_mining.py). Default is {','.join(map(str, SCALING_WORKERS))}.",
+        type=str,
+        metavar="NUMBERS",
+        default=",".join(map(str, SCALING_WORKERS)),
+    )
+    scaling.add_argument(
+        "--concurrency",
+        help=f"Mean number of concurrently active flows. Default is {CONCURRENCY}.",
+        type=float,
+        metavar="NUMBER",
+        default=CONCURRENCY,
+    )
+    scaling.add_argument(
+        "--rate",
+        help=f"Mean number of packets per second. Default is {RATE}.",
+        type=float,
+        metavar="NUMBER",
+        default=RATE,
+    )
+    scaling.add_argument(
+        "--packets",
+        help=f"Mean number of packets of flow. Default is {PACKETS_PER_FLOW}.",
+        type=float,
+        metavar="NUMBER",
+        default=PACKETS_PER_FLOW,
+    )
+    scaling.add_argument(
+        "--durations",
+        help="Distribution of durations of flows, mean is concurrency * packets / rate. Default is exponential.",
+        type=str,
+        choices=DURATIONS,
+        default="exponential",
+    )
+    scaling.add_argument(
+        "--seed",
+        help="Seed of random generator of captures. Default is 0.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    scaling.add_argument(
+        "--options",
+        help='Other options of feature_mining.py, e.g. "-b 64 --feature-set DoS". Default is none.',
+        type=str,
+        metavar="OPTIONS",
+        default="",
+    )
+    scaling.add_argument(
+        "--directory",
+        help="Directory for captures and outputs, they are kept. Default is temporary directory.",
+        type=str,
+        metavar="PATH",
+        default="",
+    )
+    differential = subparsers.add_parser(
+        "differential",
+        help="Compare features of reference and candidate options of feature_mining.py.",
+        formatter_class=RawTextHelpFormatter,
+    )
+    differential.add_argument(
+        "--candidate",
+        help='Options of feature_mining.py of optimized engine, e.g. "-b 64 --spectral-backend fast"\n(options starting with -- are given as --candidate="--incremental").',
+        type=str,
+        metavar="OPTIONS",
+        required=True,
+    )
+    differential.add_argument(
+        "--reference",
+        help="Options of feature_mining.py of reference implementation. Default is none (compute_plugin_metrics with astropy).",
+        type=str,
+        metavar="OPTIONS",
+        default="",
+    )
+    differential.add_argument(
+        "--input",
+        help='Input options of feature_mining.py, e.g. "-c NAME.csv" or "-t NAME.csv". Default is synthetic tcpdump text capture.',
+        type=str,
+        metavar="OPTIONS",
+        default="",
+    )
+    differential.add_argument(
+        "--flows",
+        help=f"Number of flows of synthetic capture. Default is {DIFFERENTIAL_FLOWS}.",
+        type=int,
+        metavar="NUMBER",
+        default=DIFFERENTIAL_FLOWS,
+    )
+    differential.add_argument(
+        "--seed",
+        help="Seed of random generator of synthetic capture. Default is 0.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    differential.add_argument(
+        "--atol",
+        help=f"Absolute tolerance of numeric features. Default is {ABSOLUTE_TOLERANCE}.",
+        type=float,
+        metavar="NUMBER",
+        default=ABSOLUTE_TOLERANCE,
+    )
+    differential.add_argument(
+        "--rtol",
+        help=f"Relative tolerance of numeric features. Default is {RELATIVE_TOLERANCE}.",
+        type=float,
+        metavar="NUMBER",
+        default=RELATIVE_TOLERANCE,
+    )
+    differential.add_argument(
+        "--listed",
+        help=f"Maximal number of listed flows that disagree on boolean feature. Default is {LISTED_FLOWS}.",
+        type=int,
+        metavar="NUMBER",
+        default=LISTED_FLOWS,
+    )
+    differential.add_argument(
+        "-o",
+        "--output",
+        help="Specification of JSON file for report. Default is disabled.",
+        type=str,
+        metavar="NAME.json",
+        default="",
+    )
+    arg = parser.parse_args()
+    if arg.benchmark == "differential":
+        return arg
+    if arg.benchmark == "scaling":
+        for mode in arg.modes.split(","):
+            if mode not in SCALING_MODES:
+                parser.error(f"unknown mode {mode}")
+        return arg
+    for kind in arg.kinds.split(","):
+        if kind not in FLOW_KINDS:
+            parser.error(f"unknown kind of flow {kind}")
+    return arg
+
+
+def main():
+    """Main function of the module."""
+    arg = parse_arguments()
+    if arg.benchmark == "features":
+        sys.exit(benchmark_features(arg))
+    if arg.benchmark == "scaling":
+        sys.exit(benchmark_scaling(arg))
+    if arg.benchmark == "differential":
+        sys.exit(benchmark_differential(arg))
+
+
+if __name__ == "__main__":
+    main()
@@ -35,18 +35,48 @@ from scipy.stats import norm
 from statsmodels.stats.diagnostic import lilliefors
 from scipy.special import gamma
 from astropy.timeseries import LombScargle
-from collections import Counter
+from collections import Counter, OrderedDict, deque
+from array import array
+from functools import lru_cache
+from contextlib import contextmanager
+import socket
+import ipaddress
+import heapq
+import os
+import mmap
+import struct
+import copy
+import shutil
+import hashlib
+import io
+import gzip
+import lzma
+import bz2
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import resource
+except ImportError:
+    resource = None
 
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
-# 4x speeder than scapy
-from pypacker import ppcap
-from pypacker.layer12 import ethernet
-from pypacker.layer3 import ip
-from pypacker.layer4 import tcp
+# Local imports
+import FEATURE_REDUCTED
 
 
 DEFAULT_VALUE = "" # 0
@@ -143,6 +173,8 @@ class TimeSeriesPlugin(object):
         self.SPECTRAL_FLUX = DEFAULT_VALUE
         self.SPECTRAL_BANDWIDTH = DEFAULT_VALUE
         self.PERIODICITY_SCDF = False
+        # flow was exported early by eviction from full flow table
+        self.EVICTED = False
         #extension based on direction
         self.MEAN_0 = DEFAULT_VALUE_DIR
         self.MEDIAN_0 = DEFAULT_VALUE_DIR
@@ -356,7 +388,9 @@ class TimeSeriesPlugin(object):
         self.TIME_1 =             ts_plugin_1.TIME
 
 
-    def export(self):
+    def export(self, header=None):
+        if header is not None:
+            return [getattr(self, name) for name in header]
         return [
             self.DST_IP,
             self.SRC_IP,
@@ -738,6 +772,7 @@ HEADER = [
 
 INACTIVE_TIMEOUT = 65
 ACTIVE_TIMEOUT = 300
+TIMER_TOLERANCE = 1e-6  # timers are checked earlier by rounding error of deadlines, is_expired decides
 
 
 T = 300  # duration of time series in seconds
@@ -750,85 +785,149 @@ N = 5000 # frequency resolution -- This will depend on the desired precision of
 # fmax = 1  # maximum frequency in Hz
 df = (fmax - fmin)/N  # frequency resolution
 FREQUENCY = np.arange(fmin, fmax, df)
+SPECTRAL_BACKENDS = ["astropy", "direct", "fast"]
+SPECTRAL_CHUNK_SIZE = 1000000  # maximal number of datapoint-frequency pairs evaluated at once
+DIRECT_MAX_DATAPOINTS = 16  # fast backend evaluates shorter flows directly
+FAST_OVERSAMPLING = 10  # oversampling of FFT grid of fast backend (astropy default is 5)
+FAST_MFFT = 12  # number of extirpolation points of fast backend (astropy default is 4)
+SPECTRAL_CHECKS = 16  # minimal number of frequencies where fast backend is checked by direct evaluation
+SPECTRAL_CHECK_STRIDE = 8  # fast backend is checked by direct evaluation at every x-th frequency
+SPECTRAL_TOLERANCE = 1e-6  # maximal absolute error of power of fast backend
+FREQUENCY_GRIDS = ["fixed", "adaptive"]
+SAMPLES_PER_PEAK = 5  # adaptive grid resolution, number of frequencies per width of peak 1/duration
+NYQUIST_FACTOR = 5  # adaptive grid maximum, multiple of average Nyquist frequency n/(2*duration)
+GRID_MIN_SIZE = 16  # minimal number of frequencies of adaptive grid
 
 
 
 # statistics features
-def get_basic_stats(data: np.ndarray, plugin: TimeSeriesPlugin):
+def get_moments(data: np.ndarray):
+    """Compute sums and order statistics of integer time series for statistical features.
+
+    Everything is computed in two vectorized passes (sum and sort, then deviations) and
+    sums of powers are exact integers. Results are the same as of the statistics module
+    on numpy integers: mean and variances are truncated to integers, standard deviation
+    is square root of truncated variance computed from exact sums.
+
+    Args:
+        data (np.array): Time series data of integers.
+
+    Returns:
+        dict: Moments of time series.
+    """
+    n = len(data)
+    sorted_data = np.sort(data)
+    sum_data = int(data.sum())
+    sum_squares = int(np.dot(data, data))
+    mean = np.int64(sum_data // n)
+    deviation = data - mean
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = sorted_data[1:] != sorted_data[:-1]
+    run_starts = np.flatnonzero(is_start)
+    run_counts = np.diff(np.append(run_starts, n))
+    if n % 2 == 1:
+        median = sorted_data[n // 2]
+    else:
+        median = (sorted_data[n // 2 - 1] + sorted_data[n // 2]) / 2
+    q1, q3 = np.percentile(sorted_data, (25, 75))
+    cubed_deviation = (deviation**3).astype(np.float64)
+    fourth_deviation = cubed_deviation * deviation
+    # fourth powers above 2**53 are not exact, round them by math.pow as before
+    inexact = np.abs(deviation) > 9741
+    if inexact.any():
+        fourth_deviation[inexact] = [math.pow(d, 4) for d in deviation[inexact]]
+    # sums are accumulated sequentially (np.cumsum) in the same order as in loop over data
+    moments = {
+        "n": n,
+        "sum": sum_data,
+        "sum_squares": sum_squares,
+        "mean": mean,
+        "median": median,
+        "q1": q1,
+        "q3": q3,
+        "min": sorted_data[0],
+        "max": sorted_data[-1],
+        # the most frequent value, the smallest one on tie as np.bincount(data).argmax()
+        "mode": sorted_data[run_starts[run_counts.argmax()]],
+        "below_mean": (deviation < 0).sum(),
+        "above_mean": (deviation > 0).sum(),
+        "sum_squared_deviation": int(np.dot(deviation, deviation)),
+        "sum_absolute_deviation": int(np.abs(deviation).sum()),
+        "skewness_sum": float(np.cumsum(cubed_deviation / n)[-1]),
+        "kurtosis_sum": float(np.cumsum(fourth_deviation)[-1]),
+    }
+    if n > 2:
+        moments["adjusted_skewness_sum"] = float(
+            np.cumsum(cubed_deviation / ((n - 1) * (n - 2)))[-1]
+        )
+    return moments
+
+
+def get_basic_stats(data: np.ndarray, plugin: TimeSeriesPlugin, moments: dict = None):
     """Compute basic statistical features.
 
     Args:
-        data (np.array): Time series data.
+        data (np.array): Time series data, not used when moments are given.
         plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+        moments (dict, optional): Moments of data from get_moments. Defaults to None.
     """
-    plugin.MEAN = statistics.mean(data)
-    plugin.MEDIAN = statistics.median(data)
-    if len(data) == 1:
-        plugin.STDEV = data[0]
-    elif len(data) == 0:
-        plugin.STDEV = 0  # type: ignore
-    else:
-        try:
-            plugin.STDEV = statistics.stdev(data)
-        except:
-            plugin.STDEV = statistics.stdev(data[:1000])
-    if len(data) < 2:
+    if moments is None:
+        moments = get_moments(data)
+    N = moments["n"]
+    plugin.MEAN = moments["mean"]
+    plugin.MEDIAN = moments["median"]
+    if N == 1:
+        plugin.STDEV = moments["min"]
         plugin.VAR = 0
     else:
-        plugin.VAR = statistics.variance(data, xbar=plugin.MEAN)
+        plugin.STDEV = math.sqrt(
+            (N * moments["sum_squares"] - moments["sum"] ** 2) // (N * (N - 1))
+        )
+        plugin.VAR = np.int64(moments["sum_squared_deviation"] // (N - 1))
     plugin.BURSTINESS = (plugin.STDEV - plugin.MEAN) / (plugin.STDEV + plugin.MEAN)
-    plugin.MODE = np.bincount(data).argmax()  # type: ignore
+    plugin.MODE = moments["mode"]  # type: ignore
     # mode is most frequent value of data
-    plugin.Q1 = np.percentile(data, 25)  # type: ignore
-    plugin.Q3 = np.percentile(data, 75)  # type: ignore
+    plugin.Q1, plugin.Q3 = moments["q1"], moments["q3"]  # type: ignore
     if plugin.MEAN == 0:
         plugin.COEFFICIENT_OF_VARIATION = 0
     else:
         plugin.COEFFICIENT_OF_VARIATION = (plugin.STDEV / plugin.MEAN) * 100
-    plugin.MIN = data.min()
-    plugin.MAX = data.max()
+    plugin.MIN = moments["min"]
+    plugin.MAX = moments["max"]
     plugin.MIN_MINUS_MAX = plugin.MAX - plugin.MIN
-    new_data = []
-    for d in data:
-        new_data.append(abs(d - plugin.MEAN))
-    plugin.AVERAGE_DISPERSION = statistics.mean(new_data)
+    plugin.AVERAGE_DISPERSION = np.int64(moments["sum_absolute_deviation"] // N)
     if plugin.MEAN == 0:
         plugin.PERCENT_DEVIATION = 0
     else:
         plugin.PERCENT_DEVIATION = (plugin.AVERAGE_DISPERSION / plugin.MEAN) * 100
-    if len(data) == 0:
-        plugin.ROOT_MEAN_SQUARE = 0
-    else:
-        plugin.ROOT_MEAN_SQUARE = 0  # type: ignore
-        for d in data:
-            plugin.ROOT_MEAN_SQUARE += math.pow(d, 2)  # type: ignore
-        plugin.ROOT_MEAN_SQUARE *= 1 / len(data)  # type: ignore
-        plugin.ROOT_MEAN_SQUARE = math.sqrt(plugin.ROOT_MEAN_SQUARE)  # type: ignore
-    plugin.PERCENT_BELOW_MEAN = (data < plugin.MEAN).sum() / len(data)
-    plugin.PERCENT_ABOVE_MEAN = (data > plugin.MEAN).sum() / len(data)
+    plugin.ROOT_MEAN_SQUARE = math.sqrt(float(moments["sum_squares"]) * (1 / N))
+    plugin.PERCENT_BELOW_MEAN = moments["below_mean"] / N
+    plugin.PERCENT_ABOVE_MEAN = moments["above_mean"] / N
 
 
-def get_entropy(data: np.ndarray, plugin: TimeSeriesPlugin):
+def get_entropy(data: np.ndarray, plugin: TimeSeriesPlugin, hist_data: dict = None):
     """Compute statistical feature called Entropy that is a scientific concept as well as
     a measurable physical property that is most commonly associated with a state of disorder,
     randomness, or uncertainty. And than scaled entropy, that is scaled by maximum entropy
     to be comparable with another results.
 
     Args:
-        data (np.array): Time series data.
+        data (np.array): Time series data, not used when histogram is given.
         plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+        hist_data (dict, optional): Histogram of time series datapoints values. Defaults to None.
     """
-    N = len(data)
+    if hist_data is None:
+        hist_data = {}
+        for d in data:
+            if d not in hist_data:
+                hist_data[d] = 0
+            hist_data[d] += 1
+    N = sum(hist_data.values())
     if N == 0:
         return
-    p = {}
-    for d in data:
-        if d not in p:
-            p[d] = 0
-        p[d] += 1
     plugin.ENTROPY = 0  # type: ignore
-    for d in p:
-        prob = p[d] / N
+    for d in hist_data:
+        prob = hist_data[d] / N
         plugin.ENTROPY += prob * math.log2(prob)
     if plugin.ENTROPY != 0:
         plugin.ENTROPY = -plugin.ENTROPY
@@ -838,14 +937,18 @@ def get_entropy(data: np.ndarray, plugin: TimeSeriesPlugin):
         plugin.SCALED_ENTROPY = plugin.ENTROPY / (-math.log2(1 / N))  # type: ignore
 
 
-def get_skewness(data: np.ndarray, hist_data: dict, plugin: TimeSeriesPlugin):
+def get_skewness(
+    data: np.ndarray, hist_data: dict, plugin: TimeSeriesPlugin, moments: dict = None
+):
     """Compute statistic feature called Skewness that is a measure of the asymmetry of
     the probability distribution of a real-valued random variable about its mean. The
     skewness value can be positive, zero, negative, or undefined.
 
     Args:
-        data (np.array): Time series data.
+        data (np.array): Time series data, not used when moments are given.
+        hist_data (dict): Histogram of time series datapoints values.
         plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+        moments (dict, optional): Moments of data from get_moments. Defaults to None.
     """
     # Pearson's Skewness formula:
     # sk1 = (X_ - Mo) / s, where X_ is mean, Mo is mode and s is standard deviation
@@ -863,8 +966,10 @@ def get_skewness(data: np.ndarray, hist_data: dict, plugin: TimeSeriesPlugin):
     # Fisher's moment coefficient of skewness:
     # mi_3 = E[ ((X - X_)/ s)^3 ], where X is random variable, X_ is mean, s is standard deviation and E is expectation operator
     # mi_3 = E[ ((X - X_)/ s)^3 ] = (E[X^3] - 3*X_*s^2 - X_^3)/(s^3) = (((x1^3)*p1 + (x2^3)*p2 + ... + (xk^3)*pk) - 3*X_*s^2 - X_^3)/(s^3)
+    if moments is None:
+        moments = get_moments(data)
     EX = 0
-    N = len(data)
+    N = moments["n"]
     for d in hist_data:
         EX += math.pow(d, 3) * hist_data[d] / N
     plugin.FISHER_MI_3_SKEWNESS = (
@@ -874,23 +979,13 @@ def get_skewness(data: np.ndarray, hist_data: dict, plugin: TimeSeriesPlugin):
     )
     # Fisher-Pearson skewness coeficient:
     # g1 = (SUM_i_n[(x_i - X_)^3/n]) / s^3
-    sum_g1 = 0
-    for d in data:
-        sum_g1 += math.pow((d - plugin.MEAN), 3) / N
-    plugin.FISHER_PEARSON_g1_SKEWNESS = sum_g1 / math.pow(plugin.STDEV, 3)  # type: ignore
+    plugin.FISHER_PEARSON_g1_SKEWNESS = moments["skewness_sum"] / math.pow(plugin.STDEV, 3)  # type: ignore
     # Adjusted Fisher-Pearson skewness coeficient:
     # G1 = \frac{5}{n\sigma^3}  \sum_{i=1}^{n}\frac{(x_i - \mu)^3}{(n-1)(n-2)} - \frac{3(n-1)}{(n-2)}\left(\frac{\sum_{i=1}^{n}(x_i - \mu)^2}{n\sigma^2}\right)^{\frac{3}{2}} \)
-    if N - 2 == 0:
+    if N <= 2:
         plugin.FISHER_PEARSON_G1_SKEWNESS = 0
     else:
-        sum_G1_1 = 0
-        for d in data:
-            sum_G1_1 += math.pow((d - plugin.MEAN), 3) / ((N-1)*(N-2))
-        
-        sum_G1_2 = 0
-        for d in data:
-            sum_G1_2 += math.pow((d - plugin.MEAN), 2)
-        
+        sum_G1_1 = moments["adjusted_skewness_sum"]
         plugin.FISHER_PEARSON_G1_SKEWNESS =  5 / (N*plugin.STDEV) * sum_G1_1    - ((3*(N-1)) / (N-2)) * math.pow((N*math.pow(plugin.STDEV, 2)), 3/2)
         # ((math.sqrt(N * (N - 1))) / (N - 2)) * plugin.FISHER_PEARSON_g1_SKEWNESS  # type: ignore
     # Galton skewness:
@@ -903,7 +998,7 @@ def get_skewness(data: np.ndarray, hist_data: dict, plugin: TimeSeriesPlugin):
         )
 
 
-def get_kurtosis(data: np.ndarray, plugin: TimeSeriesPlugin):
+def get_kurtosis(data: np.ndarray, plugin: TimeSeriesPlugin, moments: dict = None):
     """Compute statistic feature called Kurtosis that is a measure of the "tailedness"
     of the probability distribution of a real-valued random variable. Like skewness,
     kurtosis describes the shape of a probability distribution and there are different
@@ -912,14 +1007,15 @@ def get_kurtosis(data: np.ndarray, plugin: TimeSeriesPlugin):
     have different interpretations.
 
     Args:
-        data (np.array): Time series data.
+        data (np.array): Time series data, not used when moments are given.
         plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+        moments (dict, optional): Moments of data from get_moments. Defaults to None.
     """
     # kurtosis = ( SUM_i_n (x_i - x_)^4 ) / ( n * s^4 ), where x_ is mean, s is standard deviation
-    numerator = 0
-    for d in data:
-        numerator += math.pow(d - plugin.MEAN, 4)
-    denominator = len(data) * math.pow(plugin.STDEV, 4)  # type: ignore
+    if moments is None:
+        moments = get_moments(data)
+    numerator = moments["kurtosis_sum"]
+    denominator = moments["n"] * math.pow(plugin.STDEV, 4)  # type: ignore
     if denominator == 0:
         plugin.KURTOSIS = 0
     else:
@@ -998,13 +1094,14 @@ def is_benford_law_present(
     In this function we try check if Benford's law is present in our data.
 
     Args:
-        data (np.array): Time series data.
+        data (np.array): Time series data, length is taken from histogram.
+        hist_data (dict): Histogram of time series datapoints values.
         plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
         THRESHOLD (float, optional): Threshold for percentage occurs. Defaults to 0.05.
     """
     tmp = list(hist_data.values())
     tmp.sort(reverse=True)
-    N = len(data)
+    N = sum(tmp)
     plugin.BENFORD_LAW_PRESENTED = False  # type: ignore
     for d, val in zip(np.arange(N) + 1, tmp):
         P = math.log10((d + 1) / d)
@@ -1015,24 +1112,34 @@ def is_benford_law_present(
             break
 
 
+def pad_histogram(hist_data: dict, size: int = 9):
+    """Pad histogram with zero counts of negative values up to size values.
+
+    Args:
+        hist_data (dict): Histogram of time series datapoints values.
+        size (int, optional): Minimal number of values in histogram. Defaults to 9.
+    """
+    tmp = -1
+    while len(hist_data) < size:
+        hist_data[tmp] = 0
+        tmp -= 1
+
+
 def benford_law_probability(
     data: np.ndarray, hist_data: dict, plugin: TimeSeriesPlugin
 ):
     """Compute the probability that the first 9 most occurs values occurs by Benford's law.
 
     Args:
-        data (np.array): Time series data.
+        data (np.array): Time series data, length is taken from histogram.
         hist_data (dict): Histogram of time series datapoints values.
         plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
     """
-    tmp = -1
-    while len(list(hist_data.values())) < 9:
-        hist_data[tmp] = 0
-        tmp -= 1
+    pad_histogram(hist_data)
 
     sorted_vals = list(hist_data.values())
     sorted_vals.sort(reverse=True)
-    N = len(data)
+    N = sum(sorted_vals)
     P_benford = 0
     for d, val in zip(np.arange(9) + 1, sorted_vals):
         P_d = math.log10((d + 1) / d)
@@ -1196,6 +1303,21 @@ def get_time_distribution(time: np.ndarray, plugin: TimeSeriesPlugin):
     norm_t_tmp = 0
     for t in time:
         norm_t_tmp += t - t_0
+    get_time_distribution_from_sum(norm_t_tmp, p, t_0, t_n, plugin)
+
+
+def get_time_distribution_from_sum(
+    norm_t_tmp: float, p: int, t_0: float, t_n: float, plugin: TimeSeriesPlugin
+):
+    """Compute time distribution from sum of normed times of packets accumulated on exporter.
+
+    Args:
+        norm_t_tmp (float): Sum of times of packets from TIME_FIRST.
+        p (int): Number of packets.
+        t_0 (float): TIME_FIRST of flow.
+        t_n (float): TIME_LAST of flow.
+        plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+    """
     norm_mi_t = norm_t_tmp / p
     d_t = t_n - t_0
     if d_t == 0:
@@ -1450,7 +1572,18 @@ def get_switching_metric(data: np.ndarray, plugin: TimeSeriesPlugin):
         elif tmp != d:
             cnt += 1
             tmp = d
-    max_possible_switchs = (data.size - 1) / 2
+    get_switching_metric_from_count(cnt, data.size, plugin)
+
+
+def get_switching_metric_from_count(cnt: int, size: int, plugin: TimeSeriesPlugin):
+    """Compute switching metric from number of changes of value between consecutive datapoints.
+
+    Args:
+        cnt (int): Number of changes of value.
+        size (int): Number of datapoints.
+        plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+    """
+    max_possible_switchs = (size - 1) / 2
     if max_possible_switchs == 0:
         plugin.SWITCHING_METRIC = 0
     else:    
@@ -1575,788 +1708,4989 @@ def is_normal_distribution_present(agg_ts: list, plugin: TimeSeriesPlugin):
         plugin.NORMAL_DISTRIBUTION = 0  # type: ignore
 
 
-def get_dev_and_ports_from_packets(src_ip, src_port, dst_ip, dst_port, flows):
-    direction = True
-    if f"{src_ip}-{dst_ip}" in flows:
-        dev = f"{src_ip}-{dst_ip}"
-        if f"{src_port}-{dst_port}" in flows[dev]:
-            ports = f"{src_port}-{dst_port}"
-        elif f"{dst_port}-{src_port}" in flows[dev]:
-            ports = f"{dst_port}-{src_port}"
-        else:
-            ports = f"{src_port}-{dst_port}"
-    elif f"{dst_ip}-{src_ip}" in flows:
-        direction = False
-        dev = f"{dst_ip}-{src_ip}"
-        if f"{src_port}-{dst_port}" in flows[dev]:
-            ports = f"{src_port}-{dst_port}"
-        elif f"{dst_port}-{src_port}" in flows[dev]:
-            ports = f"{dst_port}-{src_port}"
-        else:
-            ports = f"{src_port}-{dst_port}"
-    else:
-        dev = f"{src_ip}-{dst_ip}"
-        ports = f"{src_port}-{dst_port}"
-    return dev, ports, direction
+# flow keys
+TCP = 6
+UDP = 17
+IPV4_MAPPED = 0xFFFF << 32  # IPv4 address is stored as IPv4-mapped IPv6 address
+ENDPOINT_BITS = 144  # 128 bits of address and 16 bits of port
 
-def scdf_test(
-    power: np.array,
-    sig_level: float = 0.1,
-    per_level: float = 0.995,
-):
-    """Perform the SCDF (Scargles Cumulative Distribution Function) significant test.
+
+@lru_cache(maxsize=65536)
+def get_ip_number(address: str):
+    """Convert IPv4 or IPv6 address to 128-bit number, IPv4 is mapped to IPv6 (::ffff:a.b.c.d).
 
     Args:
-        power (list): List of power of LS periodogram.
-        per_level (float, optional): Percent of power for SCDF. Defaults to 0.9.
-        sig_level (float, optional): Percent of max power for SCDF. Defaults to 0.01.
-        
+        address (str): IP address.
+
     Returns:
-        tuple: First value is if candidate on periodicity is accepted or denied, and seconde value is confidence.
+        int: Address as number.
     """
-    s = power.max()
-    if s == float("inf"):
-        s = sys.float_info.max * sig_level
-    else:
-        s = s * sig_level
-    return 1 - math.exp(-(s) / power.var())
-    # if 1 - math.exp(-(s) / power.var()) < per_level:
-    #     return False
-    # return True
+    if ":" in address:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+    return IPV4_MAPPED | int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
 
 
+def get_ip_string(number: int):
+    """Convert number from get_ip_number back to IP address."""
+    if number >> 32 == 0xFFFF:
+        return str(ipaddress.IPv4Address(number & 0xFFFFFFFF))
+    return str(ipaddress.IPv6Address(number))
 
-def compute_frequency_features(flowtime: np.ndarray, flowdata: np.ndarray, plugin: TimeSeriesPlugin):
-    try:
-        ls = LombScargle(flowtime, flowdata)
-        # frequency, power = ls.autopower() # minimum_frequency=0, maximum_frequency=10)
-        frequency = FREQUENCY
-        power = ls.power(frequency)
-    except:
-        return
-    power = power[power != -np.inf][power != np.inf]
-    if len(power) == 0:
-        return
-    
-    plugin.MAX_POWER = power.max()
-    try:
-        plugin.MAX_POWER_FREQ = frequency[np.asarray(power == plugin.MAX_POWER).nonzero()[0][0]]
-        if math.isnan(plugin.MAX_POWER_FREQ):
-            plugin.MAX_POWER_FREQ = DEFAULT_VALUE
-    except:
-        pass
-    # 
-    plugin.MIN_POWER = np.nanmin(power)
-    try:
-        plugin.MIN_POWER_FREQ = frequency[np.asarray(power == plugin.MIN_POWER).nonzero()[0][0]]
-        if math.isnan(plugin.MIN_POWER_FREQ):
-            plugin.MIN_POWER_FREQ = DEFAULT_VALUE
-    except:
-        pass
-    plugin.POWER_MEAN = power.mean()
-    plugin.POWER_STD = power.std()
-    # np.round(power, 5)
-    plugin.POWER_MODE = Counter((power*100000).astype(int)).most_common(1)[0][0] / 100000
-    # _power = power[power >= 0]
-    # if len(_power) > 0:
-    #     plugin.POWER_MODE = np.bincount((np.round(_power, 5)*100000).astype(int)).argmax() / 100000
-    # else:
-    #     plugin.POWER_MODE = -(np.bincount((np.round(abs(power), 5)*100000).astype(int)).argmax() / 100000)
-    # Spectral Energy: The total energy present at all frequencies in the periodogram
-    try:
-        plugin.SPECTRAL_ENERGY = power.sum()
-        if math.isnan(plugin.SPECTRAL_ENERGY):
-            plugin.SPECTRAL_ENERGY = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Entropy: A measure of the randomness or disorfer in periodogram
-    try:
-        plugin.SPECTRAL_ENTROPY = -np.sum(power * np.log2(power))
-        if math.isnan(plugin.SPECTRAL_ENTROPY):
-            plugin.SPECTRAL_ENTROPY = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Kurtosis (Flatness): A measure of the uniformity of the power spectrum.
-    try:
-        plugin.SPECTRAL_KURTOSIS = np.sum(np.power(power - np.mean(power), 4)) / np.power(np.std(power), 4)
-        if math.isnan(plugin.SPECTRAL_KURTOSIS):
-            plugin.SPECTRAL_KURTOSIS = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Skewness: A measure of the peakedness or flatness of the power spectrum
-    try:
-        plugin.SPECTRAL_SKEWNESS = np.sum(np.power(power - np.mean(power), 3)) / np.power(np.std(power), 3)
-        if math.isnan(plugin.SPECTRAL_SKEWNESS):
-            plugin.SPECTRAL_SKEWNESS = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Rolloff: The frequecny at which the power spectrum falls off significantly
-    try:
-        threshold = 0.85 * power.max()
-        rolloff_idx = np.argmax(power > threshold)
-        plugin.SPECTRAL_ROLLOFF = frequency[rolloff_idx]
-        if math.isnan(plugin.SPECTRAL_ROLLOFF):
-            plugin.SPECTRAL_ROLLOFF = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Centroid: The average frequency of the power spectrum
-    try:
-        plugin.SPECTRAL_CENTROID = np.sum(frequency * power) / np.sum(power)
-        if math.isnan(plugin.SPECTRAL_CENTROID):
-            plugin.SPECTRAL_CENTROID = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Spread: The difference between the highest and lowest frequencies in the power spectrum
-    try:
-        plugin.SPECTRAL_SPREAD = np.sqrt(np.sum((frequency - plugin.SPECTRAL_CENTROID)**2 * power) / np.sum(power))
-        if math.isnan(plugin.SPECTRAL_SPREAD):
-            plugin.SPECTRAL_SPREAD = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Slope: The slope of trend of the power spectrum over a given frequency range
-    try:
-        plugin.SPECTRAL_SLOPE = np.polyfit(np.log(frequency), np.log(power), deg=1)[0]
-        if math.isnan(plugin.SPECTRAL_SLOPE):
-            plugin.SPECTRAL_SLOPE = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Crest: the ratio of the peak spectral magnitude to the average spectral magnitude
-    try:
-        plugin.SPECTRAL_CREST = np.max(power) / np.mean(power)
-        if math.isnan(plugin.SPECTRAL_CREST):
-            plugin.SPECTRAL_CREST = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Flux: the rate of change of the spectral energy over time
-    try:
-        plugin.SPECTRAL_FLUX = np.sum(np.abs(power[1:] - power[:-1]))
-        if math.isnan(plugin.SPECTRAL_FLUX):
-            plugin.SPECTRAL_FLUX = DEFAULT_VALUE
-    except:
-        pass
-    # Spectral Bandwidth: the difference between the upper and lower frequencies at which the spectral energy is half of its maximum value
-    try:
-        plugin.SPECTRAL_BANDWIDTH = frequency[np.argmax(power)] - frequency[np.argmin(power)]
-        if math.isnan(plugin.SPECTRAL_BANDWIDTH):
-            plugin.SPECTRAL_BANDWIDTH = DEFAULT_VALUE
-    except:
-        pass
-    try:
-        plugin.PERIODICITY_SCDF = scdf_test(abs(power), sig_level=0.001, per_level=0.9995)
-    except:
-        pass
-            
-    
 
-# perform computing plugin metrics
-def compute_plugin_metrics(bytes, time, ip1, ip2, port1, port2):
-    if len(bytes) == 0:
-        return None
-    flow_data = np.array(bytes)
-    flow_data += 60
-    flow_time = np.array(time)
-    # get histogram of datapoints
-    hist_data = {}
-    for d in flow_data:
-        if d not in hist_data:
-            hist_data[d] = 0
-        hist_data[d] += 1
-    # create extended flow
-    extended_flow = TimeSeriesPlugin(ip1, ip2, port1, port2)
-    # Get duration
-    extended_flow.DURATION = flow_time[-1] - flow_time[0]
-    # fill time series plugin
-    get_basic_stats(flow_data, extended_flow)
-    get_skewness(flow_data, hist_data, extended_flow)
-    get_kurtosis(flow_data, extended_flow)
-    get_entropy(flow_data, extended_flow)
-    perform_getting_hurst_exponent(flow_data, extended_flow)
-    is_benford_law_present(flow_data, hist_data, extended_flow)
-    benford_law_probability(flow_data, hist_data, extended_flow)
-    get_area_of_value_distribution(hist_data, extended_flow)
-    agg_ts = aggreagation_of_time_series(flow_data, flow_time)
-    is_normal_distribution_present(agg_ts, extended_flow)
-    get_cnt_distribution(agg_ts, extended_flow)
-    get_time_distribution(flow_time, extended_flow)
-    get_mean_scaled_time(flow_time, extended_flow)
-    get_mean_difftimes(flow_time, extended_flow)
-    spaces = perform_spaces_detection(
-        flow_time,
-        space_min_length=0.05,
-        sig_space_threshold=10,
-    )
-    if len(spaces) > 0:
-        extended_flow.SIG_SPACES = True  # type: ignore
-    get_switching_metric(flow_data, extended_flow)
-    has_transient(flow_data, flow_time, extended_flow, spaces)  # type: ignore
-    get_cnt_behavior(agg_ts, extended_flow)
-    has_clear_periodicity(flow_data, flow_time, hist_data, extended_flow)
-    # fill basic plugin info
-    extended_flow.PACKETS = len(bytes)  # type: ignore
-    extended_flow.BYTES = flow_data.sum()
-    extended_flow.TIME_FIRST = flow_time[0]
-    extended_flow.TIME_LAST = flow_time[-1]
-    compute_frequency_features(flow_time, flow_data, extended_flow)
-    return extended_flow
+def get_flow_key(src_ip: int, src_port: int, dst_ip: int, dst_port: int, protocol: int):
+    """Get canonical key of bidirectional flow, that is the same for both directions
+    of flow. Key is one number of lower endpoint, higher endpoint and protocol.
 
+    Args:
+        src_ip (int): Source address from get_ip_number.
+        src_port (int): Source port.
+        dst_ip (int): Destination address from get_ip_number.
+        dst_port (int): Destination port.
+        protocol (int): Protocol number.
 
-def create_new_flow_ts(length, time):
-    return {
-        "bytes": [length],
-        "time": [time],
-        "direction_0": 0,
-        "direction_1": 1,
-        # "bytes_0": [],
-        # "time_0": [],
-        # "bytes_1": [length],
-        # "time_1": [time],
-        "npackets": 1,
-        "npackets_rev": 0,
-        "nbytes": length,
-        "nbytes_rev": 0,
-        "first": True,
-    }
+    Returns:
+        tuple: Key of flow and True if source is the lower endpoint of key.
+    """
+    src = (src_ip << 16) | src_port
+    dst = (dst_ip << 16) | dst_port
+    if src <= dst:
+        return (((src << ENDPOINT_BITS) | dst) << 8) | protocol, True
+    return (((dst << ENDPOINT_BITS) | src) << 8) | protocol, False
 
-def save_timeseries(arg):
-    cnt_flows = 0
-    cnt_packets = 0
-    cnt_except = 0
-    with open(arg.file, "w") as wf:
-        writer = csv.writer(wf, delimiter=";")
-        print("Write header:", end=" ")
-        writer.writerow(["SRC_IP", "SRC_PORT", "DST_IP", "DST_PORT", "bytes", "time"])
-        print("Done")
-        print("Creating extended flows from packets:")
-        print(
-            f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}     Except: {cnt_except}",
-            end="",
-        )
-        flows = {}
-        for _t, buf in ppcap.Reader(filename=arg.pcap):
-            eth = ethernet.Ethernet(buf)
-            if eth[ethernet.Ethernet, ip.IP, tcp.TCP] is not None:
-                try:
-                    src_ip = eth[ip.IP].src_s
-                    src_port = eth[tcp.TCP].sport
-                    dst_ip = eth[ip.IP].dst_s
-                    dst_port = eth[tcp.TCP].dport
-                    length = len(eth)
-                except:
-                    cnt_except += 1
-                    continue
-                cnt_packets += 1
-                dev, ports = get_dev_and_ports_from_packets(
-                    src_ip, src_port, dst_ip, dst_port, flows
-                )
-                t = _t / 1000000000
-                if dev in flows:
-                    if ports in flows[dev]:
-                        if len(flows[dev][ports]["time"]) != 0 and (
-                            (flows[dev][ports]["time"][0] + ACTIVE_TIMEOUT < t)
-                            or (
-                                len(flows[dev][ports]["time"]) > 0
-                                and t - flows[dev][ports]["time"][-1]
-                                >= INACTIVE_TIMEOUT
-                            )
-                        ):
-                            if len(flows[dev][ports]["bytes"]) == 0:
-                                continue
-                            writer.writerow(
-                                [
-                                    src_ip,
-                                    src_port,
-                                    dst_ip,
-                                    dst_port,
-                                    flows[dev][ports]["bytes"],
-                                    flows[dev][ports]["time"],
-                                ]
-                            )
-                            cnt_flows += 1
-                            flows[dev][ports]["bytes"].clear()
-                            flows[dev][ports]["time"].clear()
-                        flows[dev][ports]["bytes"].append(length)
-                        flows[dev][ports]["time"].append(t)
-                    else:
-                        flows[dev][ports] = create_new_flow_ts(length, t)
-                else:
-                    flows[dev] = {ports: create_new_flow_ts(length, t)}
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}     Except: {cnt_except}",
-                    end="",
-                    flush=False,
-                )
-                # if cnt_packets % 1000000 == 0:
-                #     for dev in flows:
-                #         for ports in flows[dev]:
-                #             if (
-                #                 len(flows[dev][ports]["bytes"]) == 0
-                #                 or t - flows[dev][ports]["time"][-1] - 5
-                #                 < INACTIVE_TIMEOUT
-                #             ):
-                #                 continue
-                #             writer.writerow(
-                #                 [
-                #                     dev.split("-")[0],
-                #                     ports.split("-")[0],
-                #                     dev.split("-")[1],
-                #                     ports.split("-")[1],
-                #                     flows[dev][ports]["bytes"],
-                #                     flows[dev][ports]["time"],
-                #                 ]
-                #             )
-                #             cnt_flows += 1
-                #             flows[dev][ports]["bytes"].clear()
-                #             flows[dev][ports]["time"].clear()
-                #             print(
-                #                 f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}     Except: {cnt_except}",
-                #                 end="",
-                #                 flush=False,
-                #             )
-
-        for dev in flows:
-            for ports in flows[dev]:
-                if len(flows[dev][ports]["bytes"]) == 0:
-                    continue
-                writer.writerow(
-                    [
-                        dev.split("-")[0],
-                        ports.split("-")[0],
-                        dev.split("-")[1],
-                        ports.split("-")[1],
-                        flows[dev][ports]["bytes"],
-                        flows[dev][ports]["time"],
-                    ]
-                )
-                cnt_flows += 1
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}     Except: {cnt_except}",
-                    end="",
-                    flush=False,
-                )
 
-        print("")
-    return cnt_flows, cnt_packets
+def get_flow_endpoint_numbers(key: int, low_first: bool = True):
+    """Get addresses as numbers of get_ip_number and ports of flow from key of get_flow_key.
 
+    Args:
+        key (int): Key of flow.
+        low_first (bool, optional): Lower endpoint of key sent the first packet of flow. Defaults to True.
 
-def timeseries_plugin(arg):
-    cnt_flows = 0
-    cnt_packets = 0
-    with open(arg.flows, "w") as w:
-        writer = csv.writer(w)
-        print("Write header:", end=" ")
-        writer.writerow(HEADER)
-        print("Done")
-        print("Creating extended flows from packets:")
-        print(
-            f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-            end="",
-        )
-        flows = {}
+    Returns:
+        tuple: (ip1, ip2, port1, port2), where 1 is endpoint that sent the first packet.
+    """
+    key >>= 8
+    first = key >> ENDPOINT_BITS
+    second = key & ((1 << ENDPOINT_BITS) - 1)
+    if not low_first:
+        first, second = second, first
+    return first >> 16, second >> 16, first & 0xFFFF, second & 0xFFFF
 
-        for _t, buf in ppcap.Reader(filename=arg.pcap):
-            eth = ethernet.Ethernet(buf)
-            if eth[ethernet.Ethernet, ip.IP, tcp.TCP] is not None:
-                try:
-                    src_ip = eth[ip.IP].src_s
-                    src_port = eth[tcp.TCP].sport
-                    dst_ip = eth[ip.IP].dst_s
-                    dst_port = eth[tcp.TCP].dport
-                    length = len(eth)
-                except:
+
+def get_flow_endpoints(key: int, low_first: bool = True):
+    """Get addresses and ports of flow from key of get_flow_key.
+
+    Args:
+        key (int): Key of flow.
+        low_first (bool, optional): Lower endpoint of key sent the first packet of flow. Defaults to True.
+
+    Returns:
+        tuple: (ip1, ip2, port1, port2), where 1 is endpoint that sent the first packet.
+    """
+    ip1, ip2, port1, port2 = get_flow_endpoint_numbers(key, low_first)
+    return get_ip_string(ip1), get_ip_string(ip2), port1, port2
+
+
+def get_shard(key: int, shards: int):
+    """Get shard of flow. Both directions of flow have the same key, so they are
+    processed by the same shard.
+
+    Args:
+        key (int): Key of flow from get_flow_key.
+        shards (int): Number of shards.
+
+    Returns:
+        int: Shard of flow from 0 to shards - 1.
+    """
+    return hash(key) % shards
+
+
+def parse_tcpdump_row(row: list):
+    """Parse packet from row of tcpdump output (tcpdump -r  example.pcap -N -n -q -tt)
+    split by spaces, e.g. ['1662638393.520198', 'IP', '192.168.1.104.8085', '>',
+    '192.168.1.245.45820:', 'tcp', '78'].
+
+    Args:
+        row (list): Row of tcpdump output.
+
+    Returns:
+        tuple: (time, src_ip, src_port, dst_ip, dst_port, protocol, length) with addresses
+            from get_ip_number or None if row is not TCP or UDP packet.
+    """
+    if len(row) < 6:
+        return None
+    try:
+        t = float(row[0])
+    except ValueError:
+        return None
+    if row[5] == "tcp":
+        protocol = TCP
+        length = int(row[6])
+    elif row[5] == "UDP,":
+        protocol = UDP
+        length = int(row[7])
+    else:
+        return None
+    src_ip, src_port = row[2].rsplit(".", 1)
+    dst_ip, dst_port = row[4][:-1].rsplit(".", 1)
+    return (
+        t,
+        get_ip_number(src_ip),
+        int(src_port),
+        get_ip_number(dst_ip),
+        int(dst_port),
+        protocol,
+        length,
+    )
+
+
+# compressed inputs and standard input
+DECOMPRESS_BLOCK = 1 << 22  # bytes of decompressed input in one block
+DECOMPRESS_BACKLOG = 8  # maximum number of decompressed blocks waiting for parser
+STDIN_PATH = "-"  # path of input read from standard input (e.g. tcpdump -w - | ...)
+
+
+def open_stdin(path: str = STDIN_PATH, mode: str = "rb"):
+    """Open standard input for unbuffered reading, read returns data as soon as
+    they are in pipe instead of waiting for whole block."""
+    return io.FileIO(sys.stdin.fileno(), mode, closefd=False)
+
+
+def open_zstd(path: str, mode: str = "rb"):
+    """Open zstandard compressed file for reading of decompressed data."""
+    if zstandard is None:
+        raise ValueError(f"{path} is compressed by zstandard, install zstandard module.")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+# magic bytes of compressed files and functions opening them
+DECOMPRESSORS = {
+    b"\x1f\x8b": gzip.open,
+    b"\xfd7zXZ\x00": lzma.open,
+    b"BZh": bz2.open,
+    b"\x28\xb5\x2f\xfd": open_zstd,
+}
+
+
+def get_decompressor(path: str):
+    """Get function opening compressed file by its magic bytes.
+
+    Args:
+        path (str): Path of input file.
+
+    Returns:
+        function: Function opening file for reading of decompressed data, None if file is not compressed.
+    """
+    if path == STDIN_PATH:
+        return None
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    for prefix, opener in DECOMPRESSORS.items():
+        if magic.startswith(prefix):
+            return opener
+    return None
+
+
+class DecompressedBlocks(object):
+    """Iterator of blocks of compressed file decompressed by background thread. Blocks
+    are passed through bounded queue, so decompression overlaps with parsing and at most
+    DECOMPRESS_BACKLOG blocks are in memory. Standard input is read the same way by
+    open_stdin, so pipe is emptied while packets are processed.
+    """
+
+    def __init__(self, path: str, opener, block: int = DECOMPRESS_BLOCK):
+        """Start decompression thread.
+
+        Args:
+            path (str): Path of compressed file.
+            opener (function): Function opening file from get_decompressor.
+            block (int, optional): Size of block in bytes. Defaults to DECOMPRESS_BLOCK.
+        """
+        self.path = path
+        self.queue = queue.Queue(maxsize=DECOMPRESS_BACKLOG)
+        self.stopped = threading.Event()
+        self.finished = False
+        self.thread = threading.Thread(
+            target=self.decompress, args=(path, opener, block), daemon=True
+        )
+        self.thread.start()
+
+    def decompress(self, path: str, opener, block: int):
+        """Decompress file into queue, runs in decompression thread."""
+        try:
+            with opener(path, "rb") as f:
+                while not self.stopped.is_set():
+                    data = f.read(block)
+                    if len(data) == 0:
+                        break
+                    self.put(data)
+        except Exception as e:
+            self.put(e)
+        self.put(None)
+
+    def put(self, item):
+        """Put item into queue, waits for free space until iterator is closed."""
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.finished:
+            raise StopIteration
+        item = self.queue.get()
+        if item is None:
+            self.finished = True
+            raise StopIteration
+        if isinstance(item, Exception):
+            self.finished = True
+            raise item
+        return item
+
+    def close(self):
+        """Stop decompression thread. Thread reading standard input can wait for data
+        of pipe, so it is not joined, it is daemon thread."""
+        self.stopped.set()
+        if self.path != STDIN_PATH:
+            self.thread.join()
+
+
+class BlockReader(io.RawIOBase):
+    """Readable binary stream of iterator of blocks."""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.block = b""
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.pos >= len(self.block):
+            self.block = next(self.blocks, None)
+            self.pos = 0
+            if self.block is None:
+                self.block = b""
+                return 0
+        size = min(len(b), len(self.block) - self.pos)
+        b[:size] = self.block[self.pos : self.pos + size]
+        self.pos += size
+        return size
+
+
+@contextmanager
+def open_input_buffers(path: str):
+    """Open input file as iterator of buffers. Uncompressed file is one memory mapped
+    buffer, compressed file is decompressed by DecompressedBlocks and standard input
+    is read by DecompressedBlocks in blocks as they arrive.
+
+    Args:
+        path (str): Path of input file or STDIN_PATH.
+
+    Yields:
+        iterator: Buffers of input file.
+    """
+    if path == STDIN_PATH:
+        opener = open_stdin
+    else:
+        opener = get_decompressor(path)
+    if opener is not None:
+        blocks = DecompressedBlocks(path, opener)
+        try:
+            yield blocks
+        finally:
+            blocks.close()
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield iter(())
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield iter((mm,))
+
+
+@contextmanager
+def open_text_input(path: str):
+    """Open input file for reading of text, compressed file is decompressed by
+    DecompressedBlocks.
+
+    Args:
+        path (str): Path of input file or STDIN_PATH.
+
+    Yields:
+        io.TextIOBase: Text stream of input file.
+    """
+    if path == STDIN_PATH:
+        yield sys.stdin
+        return
+    opener = get_decompressor(path)
+    if opener is None:
+        with open(path, "r") as f:
+            yield f
+        return
+    blocks = DecompressedBlocks(path, opener)
+    try:
+        yield io.TextIOWrapper(io.BufferedReader(BlockReader(blocks)))
+    finally:
+        blocks.close()
+
+
+# pcap and pcapng decoder
+PCAP_CHUNK = 65536  # packets in one chunk of read_pcap_chunks
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1000),
+    b"\xa1\xb2\xc3\xd4": (">", 1000),
+    b"\x4d\x3c\xb2\xa1": ("<", 1),
+    b"\xa1\xb2\x3c\x4d": (">", 1),
+}
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 1
+PCAPNG_EPB = 6
+PCAPNG_BYTE_ORDER = 0x1A2B3C4D
+PCAPNG_TSRESOL = 9
+# link types: Ethernet, raw IP, IPv4, IPv6, Linux cooked v1 and v2
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 101, 228, 229)
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8, 0x9100)
+MAX_VLAN_TAGS = 2
+IPV6_EXTENSION_HEADERS = (0, 43, 60)  # hop-by-hop, routing, destination options
+MAX_IPV6_EXTENSION_HEADERS = 3
+
+
+def get_pcapng_tsresol(block, order: str):
+    """Get time resolution of interface from options of pcapng Interface Description Block.
+
+    Args:
+        block (bytes): Body of block without block type and length.
+        order (str): Byte order of section for struct.
+
+    Returns:
+        tuple: Multiplier and divisor converting timestamps of interface to nanoseconds.
+    """
+    pos = 8
+    while pos + 4 <= len(block):
+        code, length = struct.unpack_from(order + "HH", block, pos)
+        if code == 0:
+            break
+        if code == PCAPNG_TSRESOL and length >= 1:
+            value = block[pos + 4]
+            if value & 0x80:
+                return 10**9, 2 ** (value & 0x7F)
+            if value <= 9:
+                return 10 ** (9 - value), 1
+            return 1, 10 ** (value - 9)
+        pos += 4 + (length + 3) // 4 * 4
+    return 1000, 1
+
+
+def extend_buffer(buf, pos: int, size: int, buffers):
+    """Get buffer with at least size bytes from position pos of buf by appending next
+    buffers of input.
+
+    Args:
+        buf (bytes): Current buffer.
+        pos (int): Position in current buffer.
+        size (int): Required number of bytes.
+        buffers (iterator): Next buffers of input.
+
+    Returns:
+        tuple: New buffer and position in it, buffer is None when input ends before size bytes.
+    """
+    rest = bytes(buf[pos:])
+    while len(rest) < size:
+        block = next(buffers, None)
+        if block is None:
+            return None, 0
+        rest += block
+    return rest, 0
+
+
+def read_pcap_records(buffers, chunk: int = PCAP_CHUNK):
+    """Read record headers of pcap or pcapng file.
+
+    Args:
+        buffers (iterable): Buffers of file, memory mapped file or decompressed blocks.
+        chunk (int, optional): Number of records in one yielded chunk. Defaults to PCAP_CHUNK.
+
+    Yields:
+        tuple: Buffer and lists of timestamps in nanoseconds, offsets of frames in buffer,
+            captured lengths and link types of records.
+    """
+    buffers = iter(buffers)
+    ns, offsets, lengths, links = [], [], [], []
+    buf, pos = extend_buffer(b"", 0, 24, buffers)
+    if buf is None:
+        return
+    magic = bytes(buf[:4])
+    if magic in PCAP_MAGIC:
+        order, scale = PCAP_MAGIC[magic]
+        link = struct.unpack_from(order + "I", buf, 20)[0] & 0xFFFF
+        record = struct.Struct(order + "IIII")
+        pos = 24
+    elif struct.unpack_from("<I", buf, 0)[0] == PCAPNG_SHB:
+        order = "<"
+        interfaces = []
+    else:
+        raise ValueError("File is not pcap or pcapng file.")
+    while True:
+        if magic in PCAP_MAGIC:
+            size = 16
+            if pos + size <= len(buf):
+                ts_sec, ts_frac, caplen, _ = record.unpack_from(buf, pos)
+                size += caplen
+        else:
+            size = 12
+            if pos + size <= len(buf):
+                block_type, size = struct.unpack_from(order + "II", buf, pos)
+                if block_type == PCAPNG_SHB:
+                    if struct.unpack_from("<I", buf, pos + 8)[0] == PCAPNG_BYTE_ORDER:
+                        order = "<"
+                    else:
+                        order = ">"
+                    size = struct.unpack_from(order + "I", buf, pos + 4)[0]
+                    interfaces = []
+                if size < 12:
+                    break
+        if pos + size > len(buf):
+            # records of chunk are in current buffer
+            if len(ns) > 0:
+                yield buf, ns, offsets, lengths, links
+                ns, offsets, lengths, links = [], [], [], []
+            buf, pos = extend_buffer(buf, pos, size, buffers)
+            if buf is None:
+                return
+            continue
+        if magic in PCAP_MAGIC:
+            ns.append(ts_sec * 1000000000 + ts_frac * scale)
+            offsets.append(pos + 16)
+            lengths.append(caplen)
+            links.append(link)
+        elif block_type == PCAPNG_IDB:
+            link = struct.unpack_from(order + "H", buf, pos + 8)[0]
+            body = buf[pos + 8 : pos + size - 4]
+            interfaces.append((link, *get_pcapng_tsresol(body, order)))
+        elif block_type == PCAPNG_EPB:
+            interface, ts_high, ts_low, caplen = struct.unpack_from(
+                order + "IIII", buf, pos + 8
+            )
+            link, multiplier, divisor = interfaces[interface]
+            ns.append(((ts_high << 32) | ts_low) * multiplier // divisor)
+            offsets.append(pos + 28)
+            lengths.append(caplen)
+            links.append(link)
+        pos += size
+        if len(ns) == chunk:
+            yield buf, ns, offsets, lengths, links
+            ns, offsets, lengths, links = [], [], [], []
+    if len(ns) > 0:
+        yield buf, ns, offsets, lengths, links
+
+
+def get_packet_field(data: np.ndarray, pos: np.ndarray, size: int):
+    """Get big endian unsigned field of packets.
+
+    Args:
+        data (np.ndarray): Bytes of file.
+        pos (np.ndarray): Offsets of field in packets.
+        size (int): Size of field in bytes (at most 8).
+
+    Returns:
+        np.ndarray: Values of field, fields outside file are undefined.
+    """
+    last = len(data) - 1
+    value = np.zeros(len(pos), dtype=np.uint64)
+    for i in range(size):
+        value = (value << np.uint64(8)) | data[np.minimum(pos + i, last)]
+    return value
+
+
+def decode_packets(data: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, links: np.ndarray):
+    """Decode Ethernet/VLAN/IPv4/IPv6/TCP/UDP headers of packets by offsets of headers.
+
+    Args:
+        data (np.ndarray): Bytes of file.
+        offsets (np.ndarray): Offsets of frames in file.
+        lengths (np.ndarray): Captured lengths of frames.
+        links (np.ndarray): Link types of frames.
+
+    Returns:
+        tuple: Mask of decoded TCP and UDP packets and their source address (high and
+            low 64 bits), destination address, source port, destination port and protocol.
+    """
+    end = offsets + lengths
+    l3 = np.full(len(offsets), -1, dtype=np.int64)
+    ethertype = np.zeros(len(offsets), dtype=np.uint64)
+    # link layer
+    ethernet = links == LINKTYPE_ETHERNET
+    ethertype[ethernet] = get_packet_field(data, offsets[ethernet] + 12, 2)
+    l3[ethernet] = offsets[ethernet] + 14
+    for _ in range(MAX_VLAN_TAGS):
+        vlan = np.isin(ethertype, ETHERTYPE_VLAN) & ethernet
+        ethertype[vlan] = get_packet_field(data, l3[vlan] + 2, 2)
+        l3[vlan] += 4
+    sll = links == LINKTYPE_LINUX_SLL
+    ethertype[sll] = get_packet_field(data, offsets[sll] + 14, 2)
+    l3[sll] = offsets[sll] + 16
+    sll2 = links == LINKTYPE_LINUX_SLL2
+    ethertype[sll2] = get_packet_field(data, offsets[sll2], 2)
+    l3[sll2] = offsets[sll2] + 20
+    raw = np.isin(links, LINKTYPE_RAW)
+    l3[raw] = offsets[raw]
+    version = get_packet_field(data, l3, 1) >> np.uint64(4)
+    ethertype[raw & (version == 4)] = ETHERTYPE_IPV4
+    ethertype[raw & (version == 6)] = ETHERTYPE_IPV6
+    # network layer
+    ipv4 = (ethertype == ETHERTYPE_IPV4) & (version == 4) & (l3 >= 0) & (l3 + 20 <= end)
+    ipv6 = (ethertype == ETHERTYPE_IPV6) & (version == 6) & (l3 >= 0) & (l3 + 40 <= end)
+    protocol = np.zeros(len(offsets), dtype=np.uint64)
+    src_high = np.zeros(len(offsets), dtype=np.uint64)
+    src_low = np.zeros(len(offsets), dtype=np.uint64)
+    dst_high = np.zeros(len(offsets), dtype=np.uint64)
+    dst_low = np.zeros(len(offsets), dtype=np.uint64)
+    l4 = np.full(len(offsets), -1, dtype=np.int64)
+    pos = l3[ipv4]
+    # non-first fragments do not have ports
+    fragment = get_packet_field(data, pos + 6, 2) & np.uint64(0x1FFF)
+    ipv4[ipv4] = fragment == 0
+    pos = l3[ipv4]
+    protocol[ipv4] = get_packet_field(data, pos + 9, 1)
+    src_low[ipv4] = get_packet_field(data, pos + 12, 4) | np.uint64(IPV4_MAPPED)
+    dst_low[ipv4] = get_packet_field(data, pos + 16, 4) | np.uint64(IPV4_MAPPED)
+    l4[ipv4] = pos + (
+        (get_packet_field(data, pos, 1) & np.uint64(0x0F)) * np.uint64(4)
+    ).astype(np.int64)
+    pos = l3[ipv6]
+    protocol[ipv6] = get_packet_field(data, pos + 6, 1)
+    src_high[ipv6] = get_packet_field(data, pos + 8, 8)
+    src_low[ipv6] = get_packet_field(data, pos + 16, 8)
+    dst_high[ipv6] = get_packet_field(data, pos + 24, 8)
+    dst_low[ipv6] = get_packet_field(data, pos + 32, 8)
+    l4[ipv6] = pos + 40
+    for _ in range(MAX_IPV6_EXTENSION_HEADERS):
+        extension = ipv6 & np.isin(protocol, IPV6_EXTENSION_HEADERS) & (l4 + 8 <= end)
+        pos = l4[extension]
+        protocol[extension] = get_packet_field(data, pos, 1)
+        l4[extension] = pos + (
+            (get_packet_field(data, pos + 1, 1) + np.uint64(1)) * np.uint64(8)
+        ).astype(np.int64)
+    # transport layer
+    valid = (ipv4 | ipv6) & ((protocol == TCP) | (protocol == UDP)) & (l4 + 4 <= end)
+    pos = l4[valid]
+    src_port = get_packet_field(data, pos, 2)
+    dst_port = get_packet_field(data, pos + 2, 2)
+    return (
+        valid,
+        src_high[valid],
+        src_low[valid],
+        dst_high[valid],
+        dst_low[valid],
+        src_port.astype(np.uint16),
+        dst_port.astype(np.uint16),
+        protocol[valid].astype(np.uint8),
+    )
+
+
+def read_pcap_chunks(path: str, chunk: int = PCAP_CHUNK):
+    """Read TCP and UDP packets of pcap or pcapng file by memory map (compressed file
+    by DecompressedBlocks) and decode them from struct offsets of headers.
+
+    Args:
+        path (str): Path of pcap or pcapng file.
+        chunk (int, optional): Number of records in one chunk. Defaults to PCAP_CHUNK.
+
+    Yields:
+        dict: Columns of packets of chunk in format of get_packet_chunk.
+    """
+    with open_input_buffers(path) as buffers:
+        for buf, ns, offsets, lengths, links in read_pcap_records(buffers, chunk):
+            data = np.frombuffer(buf, dtype=np.uint8)
+            offsets = np.array(offsets, dtype=np.int64)
+            lengths = np.array(lengths, dtype=np.int64)
+            (
+                valid,
+                src_high,
+                src_low,
+                dst_high,
+                dst_low,
+                src_port,
+                dst_port,
+                protocol,
+            ) = decode_packets(data, offsets, lengths, np.array(links, dtype=np.int64))
+            # memory map can be closed only without views of it
+            del data
+            # the same rounding of time as division of integer nanoseconds
+            time = [
+                timestamp / 1000000000
+                for timestamp in np.array(ns, dtype=np.int64)[valid].tolist()
+            ]
+            yield {
+                "time": np.array(time, dtype=np.float64),
+                "src_high": src_high,
+                "src_low": src_low,
+                "dst_high": dst_high,
+                "dst_low": dst_low,
+                "src_port": src_port,
+                "dst_port": dst_port,
+                "protocol": protocol,
+                "length": lengths[valid].astype(np.uint32),
+            }
+
+
+def get_packet_chunk(packets: list):
+    """Create columnar chunk of packets.
+
+    Args:
+        packets (list): Packets in format of parse_tcpdump_row.
+
+    Returns:
+        dict: Columns of packets as numpy arrays (time, src_high, src_low, dst_high,
+            dst_low, src_port, dst_port, protocol, length), address is 128-bit number
+            from get_ip_number split to high and low 64 bits.
+    """
+    if len(packets) > 0:
+        time, src_ip, src_port, dst_ip, dst_port, protocol, length = zip(*packets)
+    else:
+        time, src_ip, src_port, dst_ip, dst_port, protocol, length = [()] * 7
+    return {
+        "time": np.array(time, dtype=np.float64),
+        "src_high": np.array([ip >> 64 for ip in src_ip], dtype=np.uint64),
+        "src_low": np.array([ip & 0xFFFFFFFFFFFFFFFF for ip in src_ip], dtype=np.uint64),
+        "dst_high": np.array([ip >> 64 for ip in dst_ip], dtype=np.uint64),
+        "dst_low": np.array([ip & 0xFFFFFFFFFFFFFFFF for ip in dst_ip], dtype=np.uint64),
+        "src_port": np.array(src_port, dtype=np.uint16),
+        "dst_port": np.array(dst_port, dtype=np.uint16),
+        "protocol": np.array(protocol, dtype=np.uint8),
+        "length": np.array(length, dtype=np.uint32),
+    }
+
+
+def iter_chunk_packets(chunks):
+    """Iterate packets of columnar chunks.
+
+    Args:
+        chunks (iterable): Chunks in format of get_packet_chunk.
+
+    Yields:
+        tuple: (time, src_ip, src_port, dst_ip, dst_port, protocol, length) in the same
+            format as parse_tcpdump_row.
+    """
+    for chunk in chunks:
+        for (
+            t,
+            src_high,
+            src_low,
+            src_port,
+            dst_high,
+            dst_low,
+            dst_port,
+            protocol,
+            length,
+        ) in zip(
+            chunk["time"].tolist(),
+            chunk["src_high"].tolist(),
+            chunk["src_low"].tolist(),
+            chunk["src_port"].tolist(),
+            chunk["dst_high"].tolist(),
+            chunk["dst_low"].tolist(),
+            chunk["dst_port"].tolist(),
+            chunk["protocol"].tolist(),
+            chunk["length"].tolist(),
+        ):
+            yield (
+                t,
+                (src_high << 64) | src_low,
+                src_port,
+                (dst_high << 64) | dst_low,
+                dst_port,
+                protocol,
+                length,
+            )
+
+
+# parser of tcpdump output
+TCPDUMP_CHUNK = 1 << 24  # bytes of tcpdump output in one chunk
+TCPDUMP_BACKLOG = 2  # maximum number of parsed chunks per parser waiting for assembler
+
+
+def get_text_chunks(path: str, size: int = TCPDUMP_CHUNK):
+    """Split text file into chunks of about size bytes at newline boundaries.
+
+    Args:
+        path (str): Path of file.
+        size (int, optional): Size of chunk in bytes. Defaults to TCPDUMP_CHUNK.
+
+    Returns:
+        list: Chunks as tuples (start, end) of byte offsets.
+    """
+    chunks = []
+    with open(path, "rb") as f:
+        end_of_file = os.fstat(f.fileno()).st_size
+        start = 0
+        while start < end_of_file:
+            f.seek(min(start + size, end_of_file))
+            f.readline()
+            end = min(f.tell(), end_of_file)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def get_text_blocks(path: str, size: int = TCPDUMP_CHUNK):
+    """Split compressed text file or standard input into chunks of about size bytes
+    at newline boundaries.
+
+    Args:
+        path (str): Path of compressed file or STDIN_PATH.
+        size (int, optional): Size of chunk in bytes, 0 yields lines of every block
+            as soon as it is read. Defaults to TCPDUMP_CHUNK.
+
+    Yields:
+        bytes: Chunks of decompressed text.
+    """
+    rest = bytearray()
+    with open_input_buffers(path) as blocks:
+        for block in blocks:
+            rest += block
+            if len(rest) < size:
+                continue
+            end = rest.rfind(b"\n") + 1
+            if end > 0:
+                yield bytes(rest[:end])
+                del rest[:end]
+    if len(rest) > 0:
+        yield bytes(rest)
+
+
+def parse_tcpdump_text(text: bytes):
+    """Parse TCP and UDP packets of chunk of tcpdump output. Runs in parser process.
+
+    Args:
+        text (bytes): Whole lines of tcpdump output.
+
+    Returns:
+        dict: Columns of packets of chunk in format of get_packet_chunk.
+    """
+    packets = []
+    for line in text.decode(errors="replace").splitlines():
+        packet = parse_tcpdump_row(line.split(" "))
+        if packet is not None:
+            packets.append(packet)
+    return get_packet_chunk(packets)
+
+
+def parse_tcpdump_chunk(path: str, start: int, end: int):
+    """Parse TCP and UDP packets of chunk of tcpdump output file. Runs in parser process.
+
+    Args:
+        path (str): Path of tcpdump output.
+        start (int): Byte offset of first line of chunk.
+        end (int): Byte offset after last line of chunk.
+
+    Returns:
+        dict: Columns of packets of chunk in format of get_packet_chunk.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        return parse_tcpdump_text(f.read(end - start))
+
+
+def read_tcpdump_chunks(path: str, parsers: int = 0, size: int = TCPDUMP_CHUNK):
+    """Parse tcpdump output (tcpdump -r  example.pcap -N -n -q -tt) by chunks, in
+    parallel if parsers are given. Chunks are yielded in order of file. Chunks of
+    compressed file are read from DecompressedBlocks and passed to parsers as text,
+    lines of standard input are passed as soon as they arrive.
+
+    Args:
+        path (str): Path of tcpdump output.
+        parsers (int, optional): Number of parser processes, 0 parses in this process. Defaults to 0.
+        size (int, optional): Size of chunk in bytes. Defaults to TCPDUMP_CHUNK.
+
+    Yields:
+        dict: Columns of packets of chunk in format of get_packet_chunk.
+    """
+    if path == STDIN_PATH:
+        tasks = ((parse_tcpdump_text, text) for text in get_text_blocks(path, 0))
+    elif get_decompressor(path) is None:
+        tasks = (
+            (parse_tcpdump_chunk, path, start, end)
+            for start, end in get_text_chunks(path, size)
+        )
+    else:
+        tasks = ((parse_tcpdump_text, text) for text in get_text_blocks(path, size))
+    if parsers <= 0:
+        for function, *args in tasks:
+            yield function(*args)
+        return
+    with ProcessPoolExecutor(max_workers=parsers) as executor:
+        futures = deque()
+        for function, *args in tasks:
+            futures.append(executor.submit(function, *args))
+            while len(futures) > parsers * TCPDUMP_BACKLOG:
+                yield futures.popleft().result()
+        while len(futures) > 0:
+            yield futures.popleft().result()
+
+
+# binary columnar cache of parsed packets
+PACKET_CACHE_VERSION = 1
+PACKET_CACHE_SUFFIX = ".packets"
+PACKET_CACHE_SAMPLE = 1 << 16  # bytes of input hashed at start, middle and end
+PACKET_COLUMNS = {
+    "time": np.float64,
+    "src_high": np.uint64,
+    "src_low": np.uint64,
+    "dst_high": np.uint64,
+    "dst_low": np.uint64,
+    "src_port": np.uint16,
+    "dst_port": np.uint16,
+    "protocol": np.uint8,
+    "length": np.uint32,
+}
+
+
+def get_input_signature(path: str):
+    """Get signature of input file validating its packet cache: size, modification
+    time and hash of samples from start, middle and end of file.
+
+    Args:
+        path (str): Path of input file.
+
+    Returns:
+        dict: Signature of input file.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for offset in (0, stat.st_size // 2, stat.st_size - PACKET_CACHE_SAMPLE):
+            f.seek(max(offset, 0))
+            digest.update(f.read(PACKET_CACHE_SAMPLE))
+    return {
+        "version": PACKET_CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest.hexdigest(),
+    }
+
+
+def load_packet_cache(path: str):
+    """Load packet cache of input file if it is valid.
+
+    Args:
+        path (str): Path of input file.
+
+    Returns:
+        dict: Memory mapped columns of all packets, None if cache does not exist or
+            input file was changed.
+    """
+    cache = path + PACKET_CACHE_SUFFIX
+    try:
+        with open(os.path.join(cache, "meta.json"), "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("signature") != get_input_signature(path):
+        return None
+    columns = {}
+    for name, dtype in PACKET_COLUMNS.items():
+        if meta["packets"] == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(
+                os.path.join(cache, name + ".bin"),
+                dtype=dtype,
+                mode="r",
+                shape=(meta["packets"],),
+            )
+    return columns
+
+
+def read_cached_chunks(columns: dict, chunk: int = PCAP_CHUNK):
+    """Read chunks of packets from columns of packet cache.
+
+    Args:
+        columns (dict): Columns from load_packet_cache.
+        chunk (int, optional): Number of packets in one chunk. Defaults to PCAP_CHUNK.
+
+    Yields:
+        dict: Columns of packets of chunk in format of get_packet_chunk.
+    """
+    packets = len(columns["time"])
+    for start in range(0, packets, chunk):
+        yield {name: column[start : start + chunk] for name, column in columns.items()}
+
+
+def write_packet_cache(path: str, chunks):
+    """Pass chunks of parsed packets through and write them to packet cache of input
+    file. Cache is valid only when all chunks were read.
+
+    Args:
+        path (str): Path of input file.
+        chunks (iterable): Chunks in format of get_packet_chunk.
+
+    Yields:
+        dict: Chunks of packets.
+    """
+    cache = path + PACKET_CACHE_SUFFIX
+    tmp = f"{cache}.tmp{os.getpid()}"
+    signature = get_input_signature(path)
+    try:
+        os.makedirs(tmp, exist_ok=True)
+        files = {
+            name: open(os.path.join(tmp, name + ".bin"), "wb") for name in PACKET_COLUMNS
+        }
+    except OSError as e:
+        print(f"WARNING: Packet cache {cache} cannot be written: {e}")
+        yield from chunks
+        return
+    packets = 0
+    try:
+        for packet_chunk in chunks:
+            for name, dtype in PACKET_COLUMNS.items():
+                column = np.ascontiguousarray(packet_chunk[name], dtype=dtype)
+                files[name].write(column.tobytes())
+            packets += len(packet_chunk["time"])
+            yield packet_chunk
+        for f in files.values():
+            f.close()
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"signature": signature, "packets": packets}, f)
+        if os.path.isdir(cache):
+            shutil.rmtree(cache)
+        os.replace(tmp, cache)
+    finally:
+        for f in files.values():
+            f.close()
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+
+
+def read_packet_chunks(arg):
+    """Read chunks of packets of -p or -c input selected by arguments. Packets are
+    read from packet cache next to input if it is valid, otherwise input is parsed
+    and cache is written (unless disabled, only one shard is processed or input is
+    standard input).
+
+    Args:
+        arg (Namespace): Parsed arguments.
+
+    Returns:
+        iterable: Chunks in format of get_packet_chunk.
+    """
+    path = arg.pcap if arg.pcap != "" else arg.csv
+    if arg.no_cache or path == STDIN_PATH:
+        columns = None
+    else:
+        columns = load_packet_cache(path)
+    if columns is not None:
+        if not arg.quiet:
+            print(f"      Reading packets from cache {path + PACKET_CACHE_SUFFIX}")
+        return read_cached_chunks(columns)
+    if arg.pcap != "":
+        chunks = read_pcap_chunks(path)
+    else:
+        chunks = read_tcpdump_chunks(path, arg.parsers)
+    if arg.no_cache or arg.shards > 1 or path == STDIN_PATH:
+        return chunks
+    return write_packet_cache(path, chunks)
+
+
+def scdf_test(
+    power: np.array,
+    sig_level: float = 0.1,
+    per_level: float = 0.995,
+):
+    """Perform the SCDF (Scargles Cumulative Distribution Function) significant test.
+
+    Args:
+        power (list): List of power of LS periodogram.
+        per_level (float, optional): Percent of power for SCDF. Defaults to 0.9.
+        sig_level (float, optional): Percent of max power for SCDF. Defaults to 0.01.
+        
+    Returns:
+        tuple: First value is if candidate on periodicity is accepted or denied, and seconde value is confidence.
+    """
+    s = power.max()
+    if s == float("inf"):
+        s = sys.float_info.max * sig_level
+    else:
+        s = s * sig_level
+    return 1 - math.exp(-(s) / power.var())
+    # if 1 - math.exp(-(s) / power.var()) < per_level:
+    #     return False
+    # return True
+
+
+
+def get_direct_power(flowtime: np.ndarray, flowdata: np.ndarray, frequency: np.ndarray):
+    """Compute Lomb-Scargle periodogram by direct evaluation of its definition.
+
+    The result is the same as of LombScargle(flowtime, flowdata).power(frequency) with
+    exact methods of astropy (standard normalization, fitted mean, time shift tau).
+    Frequencies are evaluated in chunks, so memory is bounded by SPECTRAL_CHUNK_SIZE values.
+
+    Args:
+        flowtime (np.ndarray): Times of datapoints.
+        flowdata (np.ndarray): Values of datapoints.
+        frequency (np.ndarray): Frequencies of periodogram.
+
+    Returns:
+        np.ndarray: Power of periodogram for each frequency.
+    """
+    t = np.asarray(flowtime, dtype=np.float64)
+    t = t - t[0]
+    y = np.asarray(flowdata, dtype=np.float64)
+    y = y - y.mean()
+    n = len(y)
+    power = np.empty(len(frequency))
+    chunk = max(1, SPECTRAL_CHUNK_SIZE // n)
+    for i in range(0, len(frequency), chunk):
+        phase = (2 * np.pi * frequency[i : i + chunk])[:, None] * t
+        cos = np.cos(phase)
+        sin = np.sin(phase)
+        S = sin.mean(axis=1)
+        C = cos.mean(axis=1)
+        Sh = sin @ y / n
+        Ch = cos @ y / n
+        S2 = 2 * (sin * cos).mean(axis=1)
+        C2 = 1 - 2 * (sin * sin).mean(axis=1)
+        power[i : i + chunk] = get_power_from_sums(S, C, S2, C2, Sh, Ch, np.dot(y, y) / n)
+    return power
+
+
+def get_power_from_sums(S, C, S2, C2, Sh, Ch, YY):
+    """Compute normalized Lomb-Scargle power from trigonometric sums as astropy does.
+
+    Follows Zechmeister & Kurster with time shift tau computed by trigonometric
+    identities as in astropy fast method, so degenerated flows behave the same way.
+
+    Args:
+        S (np.ndarray): Mean of sin(wt) for each frequency.
+        C (np.ndarray): Mean of cos(wt) for each frequency.
+        S2 (np.ndarray): Mean of sin(2wt) for each frequency.
+        C2 (np.ndarray): Mean of cos(2wt) for each frequency.
+        Sh (np.ndarray): Mean of y * sin(wt) for centered y.
+        Ch (np.ndarray): Mean of y * cos(wt) for centered y.
+        YY (float): Mean of y * y for centered y.
+
+    Returns:
+        np.ndarray: Power for each frequency.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tan_2omega_tau = (S2 - 2 * S * C) / (C2 - (C * C - S * S))
+        S2w = tan_2omega_tau / np.sqrt(1 + tan_2omega_tau * tan_2omega_tau)
+        C2w = 1 / np.sqrt(1 + tan_2omega_tau * tan_2omega_tau)
+        Cw = np.sqrt(0.5) * np.sqrt(1 + C2w)
+        Sw = np.sqrt(0.5) * np.sign(S2w) * np.sqrt(1 - C2w)
+        YC = Ch * Cw + Sh * Sw
+        YS = Sh * Cw - Ch * Sw
+        CC = 0.5 * (1 + C2 * C2w + S2 * S2w) - (C * Cw + S * Sw) ** 2
+        SS = 0.5 * (1 - C2 * C2w - S2 * S2w) - (S * Cw - C * Sw) ** 2
+        return (YC * YC / CC + YS * YS / SS) / YY
+
+
+def get_fast_power(flowtime: np.ndarray, flowdata: np.ndarray, frequency: np.ndarray):
+    """Compute Lomb-Scargle periodogram by O(n log n) extirpolation and FFT.
+
+    Short flows are evaluated directly, because it is cheaper than FFT over the whole
+    frequency grid. For longer flows astropy fast method (Press & Rybicki) is used with
+    finer extirpolation than astropy default (FAST_OVERSAMPLING, FAST_MFFT), which keeps
+    its error around 1e-9 of power. The power is checked against direct evaluation at
+    every SPECTRAL_CHECK_STRIDE-th frequency (at least SPECTRAL_CHECKS frequencies), so
+    the checked part of grid does not shrink for larger grids, and at the extremes of
+    power. If any of them differs by more than SPECTRAL_TOLERANCE, or power has no
+    finite value, the whole periodogram is evaluated directly. The check costs
+    1 / SPECTRAL_CHECK_STRIDE of direct evaluation.
+
+    Args:
+        flowtime (np.ndarray): Times of datapoints, frequency must be regular grid.
+        flowdata (np.ndarray): Values of datapoints.
+        frequency (np.ndarray): Frequencies of periodogram.
+
+    Returns:
+        np.ndarray: Power of periodogram for each frequency.
+    """
+    if len(flowtime) <= DIRECT_MAX_DATAPOINTS:
+        return get_direct_power(flowtime, flowdata, frequency)
+    ls = LombScargle(flowtime, flowdata)
+    trig_sum_kwds = {"oversampling": FAST_OVERSAMPLING, "Mfft": FAST_MFFT}
+    try:
+        power = ls.power(
+            frequency,
+            method="fast",
+            method_kwds={"algorithm": "fasper", "trig_sum_kwds": trig_sum_kwds},
+        )
+    except TypeError:
+        # astropy before version 8 has only fasper algorithm
+        power = ls.power(
+            frequency, method="fast", method_kwds={"trig_sum_kwds": trig_sum_kwds}
+        )
+    if not np.isfinite(power).any():
+        # constant values (e.g. packets of the same length) have no finite power,
+        # direct evaluation gives the same result as exact backends
+        return get_direct_power(flowtime, flowdata, frequency)
+    checks = np.unique(
+        np.concatenate(
+            (
+                np.arange(0, len(frequency), SPECTRAL_CHECK_STRIDE),
+                np.linspace(0, len(frequency) - 1, SPECTRAL_CHECKS).astype(int),
+                [np.nanargmax(power), np.nanargmin(power)],
+            )
+        )
+    )
+    exact = get_direct_power(flowtime, flowdata, frequency[checks])
+    if not np.all(np.abs(power[checks] - exact) <= SPECTRAL_TOLERANCE):
+        return get_direct_power(flowtime, flowdata, frequency)
+    return power
+
+
+def get_periodogram(
+    flowtime: np.ndarray, flowdata: np.ndarray, frequency: np.ndarray, backend: str = "astropy"
+):
+    """Compute Lomb-Scargle periodogram by selected backend.
+
+    Args:
+        flowtime (np.ndarray): Times of datapoints.
+        flowdata (np.ndarray): Values of datapoints.
+        frequency (np.ndarray): Frequencies of periodogram.
+        backend (str, optional): One of SPECTRAL_BACKENDS. Defaults to "astropy".
+
+    Returns:
+        np.ndarray: Power of periodogram for each frequency.
+    """
+    if backend == "direct":
+        return get_direct_power(flowtime, flowdata, frequency)
+    if backend == "fast":
+        return get_fast_power(flowtime, flowdata, frequency)
+    ls = LombScargle(flowtime, flowdata)
+    # frequency, power = ls.autopower() # minimum_frequency=0, maximum_frequency=10)
+    return ls.power(frequency)
+
+
+@lru_cache(maxsize=None)
+def get_class_frequency_grid(duration: float, n: int):
+    """Create adaptive frequency grid for size class of flows.
+
+    Frequencies stay in bounds of FREQUENCY, the maximum is further limited by
+    NYQUIST_FACTOR times average Nyquist frequency of the flow, but it is never below
+    fmin + GRID_MIN_SIZE * df, so the grid ascends from fmin also for long flows with few
+    datapoints. The step is 1 / (SAMPLES_PER_PEAK * duration), but never finer than
+    step of FREQUENCY.
+
+    Args:
+        duration (float): Upper bound of duration of flows in class.
+        n (int): Upper bound of number of datapoints of flows in class.
+
+    Returns:
+        np.ndarray: Regular read-only frequency grid.
+    """
+    upper = min(fmax, NYQUIST_FACTOR * n / (2 * duration))
+    # long flows with few datapoints have Nyquist limit below fmin
+    upper = max(upper, fmin + GRID_MIN_SIZE * df)
+    step = max(df, 1 / (SAMPLES_PER_PEAK * duration))
+    if (upper - fmin) / step < GRID_MIN_SIZE:
+        step = (upper - fmin) / GRID_MIN_SIZE
+    frequency = fmin + step * np.arange(math.ceil((upper - fmin) / step))
+    frequency.flags.writeable = False
+    return frequency
+
+
+def get_frequency_grid(flowtime: np.ndarray, grid: str = "fixed"):
+    """Get frequency grid of periodogram of flow.
+
+    Adaptive grid is sized to the duration and number of datapoints of the flow, both
+    rounded up to power of two, so flows of the same size class share cached grid.
+
+    Args:
+        flowtime (np.ndarray): Times of datapoints.
+        grid (str, optional): Grid policy from FREQUENCY_GRIDS. Defaults to "fixed".
+
+    Returns:
+        np.ndarray: Frequency grid.
+    """
+    duration = flowtime[-1] - flowtime[0]
+    if grid == "fixed" or duration <= 0:
+        return FREQUENCY
+    return get_class_frequency_grid(
+        2.0 ** math.ceil(math.log2(duration)), 2 ** math.ceil(math.log2(len(flowtime)))
+    )
+
+
+def compute_frequency_features(
+    flowtime: np.ndarray,
+    flowdata: np.ndarray,
+    plugin: TimeSeriesPlugin,
+    backend: str = "astropy",
+    grid: str = "fixed",
+):
+    try:
+        frequency = get_frequency_grid(flowtime, grid)
+        power = get_periodogram(flowtime, flowdata, frequency, backend)
+    except:
+        return
+    get_frequency_features(frequency, power, plugin)
+
+
+def get_frequency_features(frequency: np.ndarray, power: np.ndarray, plugin: TimeSeriesPlugin):
+    """Compute spectral features from periodogram of flow.
+
+    Args:
+        frequency (np.ndarray): Frequencies of periodogram.
+        power (np.ndarray): Power of periodogram for each frequency.
+        plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+    """
+    power = power[power != -np.inf][power != np.inf]
+    if len(power) == 0:
+        return
+    
+    plugin.MAX_POWER = power.max()
+    try:
+        plugin.MAX_POWER_FREQ = frequency[np.asarray(power == plugin.MAX_POWER).nonzero()[0][0]]
+        if math.isnan(plugin.MAX_POWER_FREQ):
+            plugin.MAX_POWER_FREQ = DEFAULT_VALUE
+    except:
+        pass
+    # 
+    plugin.MIN_POWER = np.nanmin(power)
+    try:
+        plugin.MIN_POWER_FREQ = frequency[np.asarray(power == plugin.MIN_POWER).nonzero()[0][0]]
+        if math.isnan(plugin.MIN_POWER_FREQ):
+            plugin.MIN_POWER_FREQ = DEFAULT_VALUE
+    except:
+        pass
+    plugin.POWER_MEAN = power.mean()
+    plugin.POWER_STD = power.std()
+    # np.round(power, 5)
+    plugin.POWER_MODE = Counter((power*100000).astype(int)).most_common(1)[0][0] / 100000
+    # _power = power[power >= 0]
+    # if len(_power) > 0:
+    #     plugin.POWER_MODE = np.bincount((np.round(_power, 5)*100000).astype(int)).argmax() / 100000
+    # else:
+    #     plugin.POWER_MODE = -(np.bincount((np.round(abs(power), 5)*100000).astype(int)).argmax() / 100000)
+    # Spectral Energy: The total energy present at all frequencies in the periodogram
+    try:
+        plugin.SPECTRAL_ENERGY = power.sum()
+        if math.isnan(plugin.SPECTRAL_ENERGY):
+            plugin.SPECTRAL_ENERGY = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Entropy: A measure of the randomness or disorfer in periodogram
+    try:
+        plugin.SPECTRAL_ENTROPY = -np.sum(power * np.log2(power))
+        if math.isnan(plugin.SPECTRAL_ENTROPY):
+            plugin.SPECTRAL_ENTROPY = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Kurtosis (Flatness): A measure of the uniformity of the power spectrum.
+    try:
+        plugin.SPECTRAL_KURTOSIS = np.sum(np.power(power - np.mean(power), 4)) / np.power(np.std(power), 4)
+        if math.isnan(plugin.SPECTRAL_KURTOSIS):
+            plugin.SPECTRAL_KURTOSIS = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Skewness: A measure of the peakedness or flatness of the power spectrum
+    try:
+        plugin.SPECTRAL_SKEWNESS = np.sum(np.power(power - np.mean(power), 3)) / np.power(np.std(power), 3)
+        if math.isnan(plugin.SPECTRAL_SKEWNESS):
+            plugin.SPECTRAL_SKEWNESS = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Rolloff: The frequecny at which the power spectrum falls off significantly
+    try:
+        threshold = 0.85 * power.max()
+        rolloff_idx = np.argmax(power > threshold)
+        plugin.SPECTRAL_ROLLOFF = frequency[rolloff_idx]
+        if math.isnan(plugin.SPECTRAL_ROLLOFF):
+            plugin.SPECTRAL_ROLLOFF = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Centroid: The average frequency of the power spectrum
+    try:
+        plugin.SPECTRAL_CENTROID = np.sum(frequency * power) / np.sum(power)
+        if math.isnan(plugin.SPECTRAL_CENTROID):
+            plugin.SPECTRAL_CENTROID = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Spread: The difference between the highest and lowest frequencies in the power spectrum
+    try:
+        plugin.SPECTRAL_SPREAD = np.sqrt(np.sum((frequency - plugin.SPECTRAL_CENTROID)**2 * power) / np.sum(power))
+        if math.isnan(plugin.SPECTRAL_SPREAD):
+            plugin.SPECTRAL_SPREAD = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Slope: The slope of trend of the power spectrum over a given frequency range
+    try:
+        plugin.SPECTRAL_SLOPE = np.polyfit(np.log(frequency), np.log(power), deg=1)[0]
+        if math.isnan(plugin.SPECTRAL_SLOPE):
+            plugin.SPECTRAL_SLOPE = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Crest: the ratio of the peak spectral magnitude to the average spectral magnitude
+    try:
+        plugin.SPECTRAL_CREST = np.max(power) / np.mean(power)
+        if math.isnan(plugin.SPECTRAL_CREST):
+            plugin.SPECTRAL_CREST = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Flux: the rate of change of the spectral energy over time
+    try:
+        plugin.SPECTRAL_FLUX = np.sum(np.abs(power[1:] - power[:-1]))
+        if math.isnan(plugin.SPECTRAL_FLUX):
+            plugin.SPECTRAL_FLUX = DEFAULT_VALUE
+    except:
+        pass
+    # Spectral Bandwidth: the difference between the upper and lower frequencies at which the spectral energy is half of its maximum value
+    try:
+        plugin.SPECTRAL_BANDWIDTH = frequency[np.argmax(power)] - frequency[np.argmin(power)]
+        if math.isnan(plugin.SPECTRAL_BANDWIDTH):
+            plugin.SPECTRAL_BANDWIDTH = DEFAULT_VALUE
+    except:
+        pass
+    try:
+        plugin.PERIODICITY_SCDF = scdf_test(abs(power), sig_level=0.001, per_level=0.9995)
+    except:
+        pass
+            
+    
+
+# steps of computing plugin metrics and steps they need
+FEATURE_STEPS = {
+    "hist_data": [],
+    "basic_stats": [],
+    "skewness": ["basic_stats", "hist_data"],
+    "kurtosis": ["basic_stats"],
+    "entropy": [],
+    "hurst_exponent": [],
+    "benford_law": ["hist_data"],
+    "benford_probability": ["hist_data"],
+    "area_values_distribution": ["hist_data"],
+    "aggregated_ts": [],
+    "normal_distribution": ["aggregated_ts"],
+    "cnt_distribution": ["aggregated_ts"],
+    "time_distribution": [],
+    "scaled_time": [],
+    "difftimes": [],
+    "spaces": [],
+    "switching_metric": [],
+    "transients": ["basic_stats", "spaces"],
+    "cnt_behavior": ["aggregated_ts"],
+    "periodicity": ["hist_data"],
+    "periodogram": [],
+}
+ALL_STEPS = frozenset(FEATURE_STEPS)
+# features of HEADER with step that computes them, flow fields are computed always
+FEATURE_STEP = {name: None for name in HEADER}
+FEATURE_STEP.update(
+    {name: "basic_stats" for name in HEADER[HEADER.index("MEAN") : HEADER.index("PEARSON_SK1_SKEWNESS")]}
+)
+FEATURE_STEP.update(
+    {name: "skewness" for name in HEADER[HEADER.index("PEARSON_SK1_SKEWNESS") : HEADER.index("KURTOSIS")]}
+)
+FEATURE_STEP.update(
+    {name: "periodogram" for name in HEADER[HEADER.index("MIN_POWER") :]}
+)
+FEATURE_STEP.update(
+    {
+        "KURTOSIS": "kurtosis",
+        "ENTROPY": "entropy",
+        "SCALED_ENTROPY": "entropy",
+        "HURST_EXPONENT": "hurst_exponent",
+        "BENFORD_LAW_PRESENTED": "benford_law",
+        "P_BENFORD": "benford_probability",
+        "NORMAL_DISTRIBUTION": "normal_distribution",
+        "CNT_DISTRIBUTION": "cnt_distribution",
+        "TIME_DISTRIBUTION": "time_distribution",
+        "AREA_VALUES_DISTRIBUTION": "area_values_distribution",
+        "MEAN_SCALED_TIME": "scaled_time",
+        "MEDIAN_SCALED_TIME": "scaled_time",
+        "Q1_SCALED_TIME": "scaled_time",
+        "Q3_SCALED_TIME": "scaled_time",
+        "MEAN_DIFFTIMES": "difftimes",
+        "MEDIAN_DIFFTIMES": "difftimes",
+        "MIN_DIFFTIMES": "difftimes",
+        "MAX_DIFFTIMES": "difftimes",
+        "MEAN_SCALED_DIFFTIMES": "difftimes",
+        "SIG_SPACES": "spaces",
+        "SWITCHING_METRIC": "switching_metric",
+        "TRANSIENTS": "transients",
+        "CNT_ZEROS": "cnt_behavior",
+        "CNT_NZ_DISTRIBUTION": "cnt_behavior",
+        "BIGGEST_CNT_1_SEC": "cnt_behavior",
+        "PERIODICITY": "periodicity",
+        "VAL": "periodicity",
+        "TIME": "periodicity",
+    }
+)
+# fields of flow that are exported with every feature set
+FLOW_FIELDS = HEADER[:10]
+
+
+def get_feature_set(name: str):
+    """Get list of features from name of feature set.
+
+    Args:
+        name (str): Name of feature set from FEATURE_REDUCTED.FEATURES (e.g. DoS), name of
+            list in FEATURE_REDUCTED (e.g. dos_best_features) or comma separated features.
+
+    Returns:
+        list: Features of feature set.
+    """
+    if name in FEATURE_REDUCTED.FEATURES:
+        return FEATURE_REDUCTED.FEATURES[name]
+    if isinstance(getattr(FEATURE_REDUCTED, name, None), list):
+        return getattr(FEATURE_REDUCTED, name)
+    return [feature.strip() for feature in name.split(",") if feature.strip() != ""]
+
+
+def resolve_feature_steps(features: list):
+    """Resolve features into steps of compute_plugin_metrics that are needed for them.
+
+    Args:
+        features (list): Names of features from HEADER.
+
+    Raises:
+        ValueError: If some feature is not in HEADER.
+
+    Returns:
+        frozenset: Names of steps from FEATURE_STEPS.
+    """
+    stack = []
+    for feature in features:
+        if feature not in FEATURE_STEP:
+            raise ValueError(f"Unknown feature {feature}.")
+        if FEATURE_STEP[feature] is not None:
+            stack.append(FEATURE_STEP[feature])
+    steps = set()
+    while len(stack) > 0:
+        step = stack.pop()
+        if step not in steps:
+            steps.add(step)
+            stack.extend(FEATURE_STEPS[step])
+    return frozenset(steps)
+
+
+def get_feature_header(features: list):
+    """Get exported header for features, flow fields are always exported.
+
+    Args:
+        features (list): Names of features from HEADER.
+
+    Returns:
+        list: Exported columns in order of HEADER.
+    """
+    return [name for name in HEADER if name in FLOW_FIELDS or name in features]
+
+
+def get_export_settings(arg):
+    """Get steps of compute_plugin_metrics and exported header from program arguments.
+    Flows from limited flow table have EVICTED column after the header.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+
+    Returns:
+        tuple: Steps (None for all steps) and exported header.
+    """
+    if arg.feature_set == "":
+        steps, header = None, HEADER
+    else:
+        features = get_feature_set(arg.feature_set)
+        steps, header = resolve_feature_steps(features), get_feature_header(features)
+    if arg.timeseries_csv == "" and (
+        arg.max_memory > 0 or arg.max_flows > 0 or arg.max_buffered_packets > 0
+    ):
+        header = header + ["EVICTED"]
+    return steps, header
+
+
+# perform computing plugin metrics
+def compute_plugin_metrics(
+    bytes, time, ip1, ip2, port1, port2, steps=None, backend="astropy", grid="fixed"
+):
+    if len(bytes) == 0:
+        return None
+    if steps is None:
+        steps = ALL_STEPS
+    flow_data = np.array(bytes, dtype=np.int64)
+    flow_data += 60
+    flow_time = np.asarray(time, dtype=np.float64)
+    # get histogram of datapoints
+    if "hist_data" in steps:
+        hist_data = {}
+        for d in flow_data:
+            if d not in hist_data:
+                hist_data[d] = 0
+            hist_data[d] += 1
+    # create extended flow
+    extended_flow = TimeSeriesPlugin(ip1, ip2, port1, port2)
+    # Get duration
+    extended_flow.DURATION = flow_time[-1] - flow_time[0]
+    # fill time series plugin
+    if "basic_stats" in steps:
+        moments = get_moments(flow_data)
+        get_basic_stats(flow_data, extended_flow, moments)
+    if "skewness" in steps:
+        get_skewness(flow_data, hist_data, extended_flow, moments)
+    if "kurtosis" in steps:
+        get_kurtosis(flow_data, extended_flow, moments)
+    if "entropy" in steps:
+        get_entropy(flow_data, extended_flow)
+    if "hurst_exponent" in steps:
+        perform_getting_hurst_exponent(flow_data, extended_flow)
+    if "benford_law" in steps:
+        is_benford_law_present(flow_data, hist_data, extended_flow)
+    if "benford_probability" in steps:
+        benford_law_probability(flow_data, hist_data, extended_flow)
+    if "area_values_distribution" in steps:
+        # area is computed from histogram padded by benford_law_probability
+        pad_histogram(hist_data)
+        get_area_of_value_distribution(hist_data, extended_flow)
+    if "aggregated_ts" in steps:
+        agg_ts = aggreagation_of_time_series(flow_data, flow_time)
+    if "normal_distribution" in steps:
+        is_normal_distribution_present(agg_ts, extended_flow)
+    if "cnt_distribution" in steps:
+        get_cnt_distribution(agg_ts, extended_flow)
+    if "time_distribution" in steps:
+        get_time_distribution(flow_time, extended_flow)
+    if "scaled_time" in steps:
+        get_mean_scaled_time(flow_time, extended_flow)
+    if "difftimes" in steps:
+        get_mean_difftimes(flow_time, extended_flow)
+    if "spaces" in steps:
+        spaces = perform_spaces_detection(
+            flow_time,
+            space_min_length=0.05,
+            sig_space_threshold=10,
+        )
+        if len(spaces) > 0:
+            extended_flow.SIG_SPACES = True  # type: ignore
+    if "switching_metric" in steps:
+        get_switching_metric(flow_data, extended_flow)
+    if "transients" in steps:
+        has_transient(flow_data, flow_time, extended_flow, spaces)  # type: ignore
+    if "cnt_behavior" in steps:
+        get_cnt_behavior(agg_ts, extended_flow)
+    if "periodicity" in steps:
+        has_clear_periodicity(flow_data, flow_time, hist_data, extended_flow)
+    # fill basic plugin info
+    extended_flow.PACKETS = len(bytes)  # type: ignore
+    extended_flow.BYTES = flow_data.sum()
+    extended_flow.TIME_FIRST = flow_time[0]
+    extended_flow.TIME_LAST = flow_time[-1]
+    if "periodogram" in steps:
+        compute_frequency_features(flow_time, flow_data, extended_flow, backend, grid)
+    return extended_flow
+
+
+# batched computing of plugin metrics
+BATCH_HEADER = HEADER[2:8] + HEADER[10:]
+BATCH_COLUMNS = {name: i for i, name in enumerate(BATCH_HEADER)}
+BATCH_DEFAULTS = {
+    name: getattr(TimeSeriesPlugin(None, None, None, None), name) for name in BATCH_HEADER
+}
+BOOLEAN_FEATURES = ["BENFORD_LAW_PRESENTED", "SIG_SPACES", "TRANSIENTS", "PERIODICITY"]
+INTEGER_FEATURES = [
+    "PACKETS",
+    "PACKETS_REV",
+    "BYTES",
+    "BYTES_REV",
+    "MEAN",
+    "VAR",
+    "MIN",
+    "MAX",
+    "MIN_MINUS_MAX",
+    "MODE",
+    "AVERAGE_DISPERSION",
+    "BIGGEST_CNT_1_SEC",
+    "VAL",
+]
+# features computed flow by flow in batched engine, because they are not reductions of datapoints
+SEQUENTIAL_FEATURES = [
+    "HURST_EXPONENT",
+    "AREA_VALUES_DISTRIBUTION",
+    "NORMAL_DISTRIBUTION",
+    "SIG_SPACES",
+    "TRANSIENTS",
+    "PERIODICITY",
+    "VAL",
+    "TIME",
+    "MIN_POWER",
+    "MAX_POWER",
+    "MIN_POWER_FREQ",
+    "MAX_POWER_FREQ",
+    "POWER_MEAN",
+    "POWER_STD",
+    "POWER_MODE",
+    "SPECTRAL_ENERGY",
+    "SPECTRAL_ENTROPY",
+    "SPECTRAL_KURTOSIS",
+    "SPECTRAL_SKEWNESS",
+    "SPECTRAL_ROLLOFF",
+    "SPECTRAL_CENTROID",
+    "SPECTRAL_SPREAD",
+    "SPECTRAL_SLOPE",
+    "SPECTRAL_CREST",
+    "SPECTRAL_FLUX",
+    "SPECTRAL_BANDWIDTH",
+    "PERIODICITY_SCDF",
+]
+FREQUENCY_FEATURES = HEADER[HEADER.index("MIN_POWER") :]
+# spectral features that get_frequency_features keeps NaN, other ones are DEFAULT_VALUE then
+NAN_FREQUENCY_FEATURES = [
+    "MIN_POWER",
+    "MAX_POWER",
+    "POWER_MEAN",
+    "POWER_STD",
+    "POWER_MODE",
+    "PERIODICITY_SCDF",
+]
+PERIODOGRAM_MEMORY = 256 * 2**20  # memory budget in bytes of batched periodogram
+PERIODOGRAM_ITEM_SIZE = 64  # bytes of temporary arrays per datapoint and frequency
+PERIODOGRAM_BLOCK = 128  # minimal number of frequencies evaluated at once for batch of flows
+SEQUENTIAL_STEPS = frozenset(
+    [
+        "hurst_exponent",
+        "area_values_distribution",
+        "normal_distribution",
+        "spaces",
+        "transients",
+        "periodicity",
+        "periodogram",
+    ]
+)
+
+
+def get_segment_ids(offsets: np.ndarray):
+    """Get index of flow for each datapoint of concatenated flows.
+
+    Args:
+        offsets (np.ndarray): Start of each flow in concatenated array, followed by length of the array.
+
+    Returns:
+        np.ndarray: Index of flow for each datapoint.
+    """
+    return np.repeat(np.arange(offsets.size - 1), np.diff(offsets))
+
+
+def get_segment_runs(sorted_data: np.ndarray, segment_ids: np.ndarray):
+    """Find runs of equal values in concatenated flows, where datapoints of each flow are sorted.
+
+    Args:
+        sorted_data (np.ndarray): Concatenated flows with sorted datapoints.
+        segment_ids (np.ndarray): Index of flow for each datapoint.
+
+    Returns:
+        tuple: Positions where runs start, number of datapoints in runs and index of flow of runs.
+    """
+    is_start = np.ones(sorted_data.size, dtype=bool)
+    is_start[1:] = (sorted_data[1:] != sorted_data[:-1]) | (
+        segment_ids[1:] != segment_ids[:-1]
+    )
+    run_starts = np.flatnonzero(is_start)
+    run_counts = np.diff(np.append(run_starts, sorted_data.size))
+    return run_starts, run_counts, segment_ids[run_starts]
+
+
+def get_segment_first(mask: np.ndarray, segment_ids: np.ndarray, n_segments: int):
+    """Get position of first True value of mask in each flow.
+
+    Args:
+        mask (np.ndarray): Boolean mask over concatenated flows.
+        segment_ids (np.ndarray): Index of flow for each item of mask, must be non-decreasing.
+        n_segments (int): Number of flows.
+
+    Returns:
+        np.ndarray: Position of first True value of each flow, -1 if flow has none.
+    """
+    positions = np.flatnonzero(mask)
+    first = np.full(n_segments, -1, dtype=np.int64)
+    # assignment with repeated indexes keeps the last one, so assign in reversed order
+    first[segment_ids[positions][::-1]] = positions[::-1]
+    return first
+
+
+def get_segment_percentile(
+    sorted_data: np.ndarray, starts: np.ndarray, lengths: np.ndarray, q: float
+):
+    """Compute percentile of each flow by linear interpolation in the same way as np.percentile.
+
+    Args:
+        sorted_data (np.ndarray): Concatenated flows with sorted datapoints.
+        starts (np.ndarray): Start of each flow.
+        lengths (np.ndarray): Length of each flow.
+        q (float): Percentile to compute, between 0 and 100.
+
+    Returns:
+        np.ndarray: Percentile of each flow.
+    """
+    virtual = (lengths - 1) * (q / 100)
+    previous = np.floor(virtual).astype(np.int64)
+    following = np.minimum(previous + 1, lengths - 1)
+    gamma = virtual - previous
+    a = sorted_data[starts + previous]
+    b = sorted_data[starts + following]
+    return np.where(gamma >= 0.5, b - (b - a) * (1 - gamma), a + (b - a) * gamma)
+
+
+def get_plugin_value(value):
+    """Convert value of TimeSeriesPlugin record into float for batched engine."""
+    if isinstance(value, str):
+        return np.nan
+    return float(value)
+
+
+def get_plugin_values(plugin: TimeSeriesPlugin, names: list):
+    """Get values of TimeSeriesPlugin records for batched engine.
+
+    Args:
+        plugin (TimeSeriesPlugin): Computed records of flow.
+        names (list): Names of records.
+
+    Returns:
+        tuple: Values as floats and mask of records without value (DEFAULT_VALUE).
+    """
+    values = [getattr(plugin, name) for name in names]
+    return (
+        [get_plugin_value(value) for value in values],
+        [isinstance(value, str) for value in values],
+    )
+
+
+def get_batch_power(
+    flowtime: np.ndarray, flowdata: np.ndarray, offsets: np.ndarray, frequency: np.ndarray
+):
+    """Compute Lomb-Scargle periodograms of many flows on shared regular frequency grid.
+
+    Frequencies are evaluated in blocks. Trigonometric table exp(2j*pi*k*df*t) of one block
+    is computed once for all datapoints and every block reuses it, shifted by multiplication
+    with exp(2j*pi*f*t) of the first frequency of the block. Sums over datapoints are then
+    segmented reductions over flows. Power is computed by the same formula as
+    get_direct_power.
+
+    Args:
+        flowtime (np.ndarray): Concatenated times of datapoints.
+        flowdata (np.ndarray): Concatenated values of datapoints.
+        offsets (np.ndarray): Start of each flow, followed by the number of all datapoints.
+        frequency (np.ndarray): Regular frequency grid.
+
+    Returns:
+        np.ndarray: Power of shape (number of flows, len(frequency)).
+    """
+    lengths = np.diff(offsets)
+    starts = offsets[:-1]
+    seg = get_segment_ids(offsets)
+    t = flowtime - flowtime[starts][seg]
+    y = flowdata - (np.add.reduceat(flowdata, starts) / lengths)[seg]
+    YY = np.add.reduceat(y * y, starts) / lengths
+    n_freq = len(frequency)
+    step = frequency[1] - frequency[0] if n_freq > 1 else 0.0
+    block = max(1, min(n_freq, PERIODOGRAM_MEMORY // (PERIODOGRAM_ITEM_SIZE * t.size)))
+    table = np.exp(2j * np.pi * step * np.arange(block)[:, None] * t)
+    power = np.empty((lengths.size, n_freq))
+    for i in range(0, n_freq, block):
+        m = min(block, n_freq - i)
+        E = table[:m] * np.exp(2j * np.pi * frequency[i] * t)
+        Z = np.add.reduceat(E, starts, axis=1) / lengths
+        Zy = np.add.reduceat(E * y, starts, axis=1) / lengths
+        E *= E
+        Z2 = np.add.reduceat(E, starts, axis=1) / lengths
+        power[:, i : i + m] = get_power_from_sums(
+            Z.imag, Z.real, Z2.imag, Z2.real, Zy.imag, Zy.real, YY
+        ).T
+    return power
+
+
+def get_batch_frequency_features(frequency: np.ndarray, power: np.ndarray):
+    """Compute spectral features of many flows as row-wise reductions of their periodograms.
+
+    Rows with infinite or NaN power are computed by get_frequency_features one by one,
+    because it drops infinite values and keeps NaN values in its own way.
+
+    Args:
+        frequency (np.ndarray): Frequencies of periodograms.
+        power (np.ndarray): Periodograms of shape (number of flows, len(frequency)).
+
+    Returns:
+        tuple: Features of shape (number of flows, len(FREQUENCY_FEATURES)) and mask of
+            the same shape of features without value, their features are NaN.
+    """
+    res = np.full((power.shape[0], len(FREQUENCY_FEATURES)), np.nan)
+    missing = np.ones(res.shape, dtype=bool)
+    finite = np.isfinite(power).all(axis=1)
+    for i in np.flatnonzero(~finite):
+        plugin = TimeSeriesPlugin(None, None, None, None)
+        get_frequency_features(frequency, power[i], plugin)
+        res[i], missing[i] = get_plugin_values(plugin, FREQUENCY_FEATURES)
+    power = power[finite]
+    rows, n_freq = power.shape
+    if rows == 0:
+        return res, missing
+    columns = {}
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        max_power = power.max(axis=1)
+        min_power = power.min(axis=1)
+        argmax = power.argmax(axis=1)
+        argmin = power.argmin(axis=1)
+        mean = power.mean(axis=1)
+        std = power.std(axis=1)
+        energy = power.sum(axis=1)
+        columns["MIN_POWER"] = min_power
+        columns["MAX_POWER"] = max_power
+        columns["MIN_POWER_FREQ"] = frequency[argmin]
+        columns["MAX_POWER_FREQ"] = frequency[argmax]
+        columns["POWER_MEAN"] = mean
+        columns["POWER_STD"] = std
+        # most common value rounded down to 5 decimals, the first one on tie as Counter
+        quantized = (power * 100000).astype(int)
+        order = np.argsort(quantized, axis=1, kind="stable")
+        sorted_quantized = np.take_along_axis(quantized, order, axis=1).ravel()
+        run_starts, run_counts, run_rows = get_segment_runs(
+            sorted_quantized, np.repeat(np.arange(rows), n_freq)
+        )
+        run_keys = run_counts * (n_freq + 1) - order.ravel()[run_starts] % n_freq
+        best_keys = np.full(rows, np.iinfo(np.int64).min)
+        np.maximum.at(best_keys, run_rows, run_keys)
+        best_runs = run_starts[run_keys == best_keys[run_rows]]
+        columns["POWER_MODE"] = sorted_quantized[best_runs] / 100000
+        columns["SPECTRAL_ENERGY"] = energy
+        columns["SPECTRAL_ENTROPY"] = -np.sum(power * np.log2(power), axis=1)
+        centered = power - mean[:, None]
+        columns["SPECTRAL_KURTOSIS"] = np.sum(np.power(centered, 4), axis=1) / np.power(std, 4)
+        columns["SPECTRAL_SKEWNESS"] = np.sum(np.power(centered, 3), axis=1) / np.power(std, 3)
+        columns["SPECTRAL_ROLLOFF"] = frequency[
+            np.argmax(power > 0.85 * max_power[:, None], axis=1)
+        ]
+        centroid = np.sum(frequency * power, axis=1) / energy
+        columns["SPECTRAL_CENTROID"] = centroid
+        columns["SPECTRAL_SPREAD"] = np.sqrt(
+            np.sum((frequency - centroid[:, None]) ** 2 * power, axis=1) / energy
+        )
+        # least squares slope of log power on log frequency, as np.polyfit(deg=1)
+        log_frequency = np.log(frequency)
+        log_frequency -= log_frequency.mean()
+        columns["SPECTRAL_SLOPE"] = np.where(
+            (power > 0).all(axis=1),
+            np.log(np.where(power > 0, power, 1)) @ log_frequency
+            / (log_frequency @ log_frequency),
+            np.nan,
+        )
+        columns["SPECTRAL_CREST"] = max_power / mean
+        columns["SPECTRAL_FLUX"] = np.sum(np.abs(np.diff(power, axis=1)), axis=1)
+        columns["SPECTRAL_BANDWIDTH"] = frequency[argmax] - frequency[argmin]
+        abs_power = np.abs(power)
+        columns["PERIODICITY_SCDF"] = 1 - np.exp(
+            -(abs_power.max(axis=1) * 0.001) / abs_power.var(axis=1)
+        )
+    res[finite] = np.column_stack([columns[name] for name in FREQUENCY_FEATURES])
+    # get_frequency_features replaces NaN by DEFAULT_VALUE except NAN_FREQUENCY_FEATURES
+    missing[finite] = np.isnan(res[finite]) & ~np.isin(
+        FREQUENCY_FEATURES, NAN_FREQUENCY_FEATURES
+    )
+    return res, missing
+
+
+def compute_batch_frequency_features(
+    flowtime: np.ndarray, flowdata: np.ndarray, offsets: np.ndarray, frequency: np.ndarray
+):
+    """Compute spectral features of many flows on shared frequency grid.
+
+    Flows are processed in chunks, so trigonometric tables and periodograms of one
+    chunk fit into PERIODOGRAM_MEMORY.
+
+    Args:
+        flowtime (np.ndarray): Concatenated times of datapoints.
+        flowdata (np.ndarray): Concatenated values of datapoints.
+        offsets (np.ndarray): Start of each flow, followed by the number of all datapoints.
+        frequency (np.ndarray): Regular frequency grid.
+
+    Returns:
+        tuple: Features of shape (number of flows, len(FREQUENCY_FEATURES)) and mask of
+            the same shape of features without value, their features are NaN.
+    """
+    n_flows = offsets.size - 1
+    res = np.empty((n_flows, len(FREQUENCY_FEATURES)))
+    missing = np.empty(res.shape, dtype=bool)
+    max_points = PERIODOGRAM_MEMORY // (PERIODOGRAM_ITEM_SIZE * PERIODOGRAM_BLOCK)
+    max_flows = max(1, PERIODOGRAM_MEMORY // (PERIODOGRAM_ITEM_SIZE * len(frequency)))
+    first = 0
+    while first < n_flows:
+        last = np.searchsorted(offsets, offsets[first] + max_points, side="right") - 1
+        last = max(first + 1, min(last, first + max_flows))
+        start, end = offsets[first], offsets[last]
+        power = get_batch_power(
+            flowtime[start:end],
+            flowdata[start:end],
+            offsets[first : last + 1] - start,
+            frequency,
+        )
+        res[first:last], missing[first:last] = get_batch_frequency_features(
+            frequency, power
+        )
+        first = last
+    return res, missing
+
+
+def compute_batch_metrics(
+    values, times, offsets, steps=None, backend="astropy", grid="fixed"
+):
+    """Compute plugin metrics of many flows at once.
+
+    Flows are passed as ragged arrays: lengths and times of packets of all flows are
+    concatenated and offsets contains start of each flow followed by the total number
+    of packets, so flow i is values[offsets[i]:offsets[i + 1]]. Features that are
+    reductions over datapoints (statistics, histogram, time and aggregation based
+    features) are computed for all flows together by segmented reductions, so the
+    per-call overhead is paid once per batch and not once per flow. The sequential
+    features (SEQUENTIAL_FEATURES) are computed flow by flow by the same functions
+    as compute_plugin_metrics uses.
+
+    Args:
+        values (np.ndarray): Concatenated lengths of packets.
+        times (np.ndarray): Concatenated times of packets.
+        offsets (np.ndarray): Start of each flow, followed by the number of all packets.
+        steps (frozenset, optional): Steps from FEATURE_STEPS to compute, features of other
+            steps can be left NaN. Defaults to None (all steps).
+        backend (str, optional): Spectral backend from SPECTRAL_BACKENDS. Defaults to "astropy".
+        grid (str, optional): Frequency grid policy from FREQUENCY_GRIDS. Defaults to "fixed".
+
+    Returns:
+        tuple: Array of shape (number of flows, len(BATCH_HEADER)) with columns in order
+            of BATCH_HEADER and boolean mask of the same shape of values without value
+            (DEFAULT_VALUE). Values without value are NaN, NaN values computed as by
+            compute_plugin_metrics are not in the mask. Boolean features are 0 or 1.
+    """
+    if steps is None:
+        steps = ALL_STEPS
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    if (lengths <= 0).any():
+        raise ValueError("Every flow in batch must contain at least one packet.")
+    flow_data = np.asarray(values, dtype=np.int64) + 60
+    flow_time = np.asarray(times, dtype=np.float64)
+    n_flows = lengths.size
+    starts = offsets[:-1]
+    lasts = offsets[1:] - 1
+    seg = get_segment_ids(offsets)
+    same_flow = seg[1:] == seg[:-1]
+    res = np.full((n_flows, len(BATCH_HEADER)), np.nan)
+    missing = np.ones(res.shape, dtype=bool)
+
+    def put(name, column):
+        res[:, BATCH_COLUMNS[name]] = column
+        missing[:, BATCH_COLUMNS[name]] = False
+
+    # basic plugin info
+    sum_data = np.add.reduceat(flow_data, starts)
+    put("PACKETS", lengths)
+    put("PACKETS_REV", 0)
+    put("BYTES", sum_data)
+    put("BYTES_REV", 0)
+    put("TIME_FIRST", flow_time[starts])
+    put("TIME_LAST", flow_time[lasts])
+    # basic statistics, mean and variance are integers for integer data as in statistics module
+    mean = sum_data // lengths
+    deviation = flow_data - mean[seg]
+    sum_squares = np.add.reduceat(flow_data * flow_data, starts)
+    stdev = np.array(
+        [
+            math.sqrt((n * s2 - s1 * s1) // (n * (n - 1))) if n > 1 else float(first)
+            for n, s1, s2, first in zip(
+                lengths.tolist(),
+                sum_data.tolist(),
+                sum_squares.tolist(),
+                flow_data[starts].tolist(),
+            )
+        ]
+    )
+    squared_deviation = np.add.reduceat(deviation * deviation, starts)
+    var = np.where(lengths > 1, squared_deviation // np.maximum(lengths - 1, 1), 0)
+    order = np.lexsort((flow_data, seg))
+    sorted_data = flow_data[order]
+    middle = starts + lengths // 2
+    median = np.where(
+        lengths % 2 == 0,
+        (sorted_data[middle - 1] + sorted_data[middle]) / 2,
+        sorted_data[middle],
+    )
+    q1 = get_segment_percentile(sorted_data, starts, lengths, 25)
+    q3 = get_segment_percentile(sorted_data, starts, lengths, 75)
+    run_starts, run_counts, run_seg = get_segment_runs(sorted_data, seg)
+    run_values = sorted_data[run_starts]
+    # mode is the smallest of the most frequent values as np.bincount(data).argmax()
+    max_counts = np.zeros(n_flows, dtype=np.int64)
+    np.maximum.at(max_counts, run_seg, run_counts)
+    mode_runs = get_segment_first(run_counts == max_counts[run_seg], run_seg, n_flows)
+    mode = run_values[mode_runs]
+    average_dispersion = np.add.reduceat(np.abs(deviation), starts) // lengths
+    put("MEAN", mean)
+    put("MEDIAN", median)
+    put("STDEV", stdev)
+    put("VAR", var)
+    put("BURSTINESS", (stdev - mean) / (stdev + mean))
+    put("Q1", q1)
+    put("Q3", q3)
+    put("MIN", sorted_data[starts])
+    put("MAX", sorted_data[lasts])
+    put("MIN_MINUS_MAX", sorted_data[lasts] - sorted_data[starts])
+    put("MODE", mode)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        put("COEFFICIENT_OF_VARIATION", np.where(mean == 0, 0, stdev / mean * 100))
+        put("AVERAGE_DISPERSION", average_dispersion)
+        put(
+            "PERCENT_DEVIATION",
+            np.where(mean == 0, 0, average_dispersion / mean * 100),
+        )
+    put("ROOT_MEAN_SQUARE", np.sqrt(sum_squares * (1 / lengths)))
+    put("PERCENT_BELOW_MEAN", np.bincount(seg, deviation < 0, n_flows) / lengths)
+    put("PERCENT_ABOVE_MEAN", np.bincount(seg, deviation > 0, n_flows) / lengths)
+    # skewness and kurtosis
+    float_deviation = deviation.astype(np.float64)
+    cubed_deviation = np.bincount(seg, float_deviation**3, n_flows)
+    fourth_deviation = np.bincount(seg, float_deviation**4, n_flows)
+    third_moment = np.bincount(
+        run_seg, run_values.astype(np.float64) ** 3 * run_counts / lengths[run_seg], n_flows
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nonzero = stdev != 0
+        many = lengths > 2
+        put("PEARSON_SK1_SKEWNESS", np.where(nonzero, (mean - mode) / stdev, 0))
+        put("PEARSON_SK2_SKEWNESS", np.where(nonzero, (3 * mean - median) / stdev, 0))
+        put(
+            "FISHER_MI_3_SKEWNESS",
+            np.where(
+                nonzero,
+                (third_moment - 3 * mean * stdev**2 - mean.astype(np.float64) ** 3)
+                / stdev**3,
+                0,
+            ),
+        )
+        put(
+            "FISHER_PEARSON_g1_SKEWNESS",
+            np.where(nonzero, cubed_deviation / lengths / stdev**3, 0),
+        )
+        put(
+            "FISHER_PEARSON_G1_SKEWNESS",
+            np.where(
+                nonzero & many,
+                5 / (lengths * stdev) * cubed_deviation / ((lengths - 1) * (lengths - 2))
+                - ((3 * (lengths - 1)) / (lengths - 2)) * (lengths * stdev**2) ** 1.5,
+                0,
+            ),
+        )
+        put(
+            "GALTON_SKEWNESS",
+            np.where(nonzero & (q3 != q1), (q1 + q3 - 2 * mean) / (q3 - q1), 0),
+        )
+        kurtosis_denominator = lengths * stdev**4
+        put(
+            "KURTOSIS",
+            np.where(
+                kurtosis_denominator == 0, 0, fourth_deviation / kurtosis_denominator
+            ),
+        )
+    # entropy
+    probability = run_counts / lengths[run_seg]
+    entropy = np.bincount(run_seg, probability * np.log2(probability), n_flows)
+    entropy = np.where(entropy == 0, 0.0, -entropy)
+    put("ENTROPY", entropy)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        put("SCALED_ENTROPY", np.where(lengths == 1, 0, entropy / np.log2(lengths)))
+    # Benford's law over histogram counts sorted from the most frequent value
+    runs_per_flow = np.bincount(run_seg, minlength=n_flows)
+    run_offsets = np.concatenate(([0], np.cumsum(runs_per_flow)))
+    count_order = np.lexsort((-run_counts, run_seg))
+    sorted_counts = run_counts[count_order]
+    rank = np.arange(sorted_counts.size) - run_offsets[run_seg[count_order]] + 1
+    benford_deviation = np.abs(
+        np.log10((rank + 1) / rank) - sorted_counts / lengths[run_seg[count_order]]
+    )
+    put(
+        "BENFORD_LAW_PRESENTED",
+        np.bincount(run_seg[count_order], benford_deviation >= 0.05, n_flows) == 0,
+    )
+    benford_p = np.log10((np.arange(9) + 2) / (np.arange(9) + 1))
+    # missing values of histogram are counted as zeros in benford_law_probability
+    missing_benford = np.append(np.cumsum(benford_p[::-1])[::-1], 0)
+    p_benford = np.bincount(
+        run_seg[count_order], np.where(rank <= 9, benford_deviation, 0), n_flows
+    ) + missing_benford[np.minimum(runs_per_flow, 9)]
+    put("P_BENFORD", 1 - p_benford / 2)
+    time_first = flow_time[starts]
+    # aggregation of time series into 60 seconds windows
+    if "aggregated_ts" in steps:
+        window_first = time_first - (time_first % 60)
+        windows = np.maximum(
+            np.floor((flow_time - window_first[seg]) / 60).astype(np.int64), 0
+        )
+        # windows never decrease inside of flow as in aggreagation_of_time_series
+        shift = seg * (windows.max() + 1)
+        windows = np.maximum.accumulate(windows + shift) - shift
+        agg_lengths = windows[lasts] + 1
+        agg_offsets = np.concatenate(([0], np.cumsum(agg_lengths)))
+        agg_ts = np.bincount(
+            agg_offsets[:-1][seg] + windows, weights=flow_data, minlength=agg_offsets[-1]
+        )
+        agg_seg = get_segment_ids(agg_offsets)
+        agg_mean = np.add.reduceat(agg_ts, agg_offsets[:-1]) / agg_lengths
+        agg_spread = np.bincount(agg_seg, np.abs(agg_mean[agg_seg] - agg_ts), n_flows)
+        agg_scale = np.maximum.reduceat(agg_ts, agg_offsets[:-1]) - np.minimum.reduceat(
+            agg_ts, agg_offsets[:-1]
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            put(
+                "CNT_DISTRIBUTION",
+                np.where(
+                    agg_scale == 0,
+                    agg_spread / agg_lengths,
+                    (agg_spread / agg_lengths) / (agg_scale / 2),
+                ),
+            )
+        agg_zero = agg_ts == 0
+        put("CNT_ZEROS", np.bincount(agg_seg, agg_zero, n_flows) / agg_lengths)
+        put("BIGGEST_CNT_1_SEC", np.maximum.reduceat(agg_ts, agg_offsets[:-1]))
+        nz_lengths = agg_lengths - np.bincount(agg_seg, agg_zero, n_flows)
+        nz_mean = np.add.reduceat(agg_ts, agg_offsets[:-1]) / nz_lengths
+        nz_spread = np.bincount(
+            agg_seg, np.where(agg_zero, 0, np.abs(nz_mean[agg_seg] - agg_ts)), n_flows
+        )
+        nz_scale = np.maximum.reduceat(agg_ts, agg_offsets[:-1]) - np.minimum.reduceat(
+            np.where(agg_zero, np.inf, agg_ts), agg_offsets[:-1]
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            put(
+                "CNT_NZ_DISTRIBUTION",
+                np.where(
+                    nz_scale == 0,
+                    nz_spread / nz_lengths,
+                    (nz_spread / nz_lengths) / (nz_scale / 2),
+                ),
+            )
+    # time features
+    relative_time = flow_time - time_first[seg]
+    sum_relative_time = np.bincount(seg, relative_time, n_flows)
+    duration = relative_time[lasts]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        time_distribution = np.where(
+            duration == 0,
+            sum_relative_time / lengths,
+            sum_relative_time / lengths / duration,
+        )
+    put("TIME_DISTRIBUTION", np.where(lengths < 2, np.nan, time_distribution))
+    missing[lengths < 2, BATCH_COLUMNS["TIME_DISTRIBUTION"]] = True
+    put("MEAN_SCALED_TIME", sum_relative_time / lengths)
+    put("MEDIAN_SCALED_TIME", relative_time[starts + lengths // 2])
+    put("Q1_SCALED_TIME", relative_time[starts + lengths // 4])
+    put("Q3_SCALED_TIME", relative_time[starts + (3 * lengths) // 4])
+    put("DURATION", duration)
+    multi = lengths > 1
+    if "difftimes" in steps and multi.any():
+        difftimes = np.diff(flow_time)[same_flow]
+        diff_seg = seg[1:][same_flow]
+        diff_lengths = lengths - 1
+        diff_starts = np.concatenate(([0], np.cumsum(diff_lengths)))[:-1][multi]
+        diff_lengths = diff_lengths[multi]
+        sorted_difftimes = difftimes[np.lexsort((difftimes, diff_seg))]
+        middle = diff_starts + diff_lengths // 2
+        max_difftimes = np.maximum.reduceat(difftimes, diff_starts)
+        mean_difftimes = np.bincount(diff_seg, difftimes, n_flows)[multi] / diff_lengths
+        res[multi, BATCH_COLUMNS["MEAN_DIFFTIMES"]] = mean_difftimes
+        res[multi, BATCH_COLUMNS["MEDIAN_DIFFTIMES"]] = np.where(
+            diff_lengths % 2 == 0,
+            (sorted_difftimes[middle - 1] + sorted_difftimes[middle]) / 2,
+            sorted_difftimes[middle],
+        )
+        res[multi, BATCH_COLUMNS["MIN_DIFFTIMES"]] = np.minimum.reduceat(
+            difftimes, diff_starts
+        )
+        res[multi, BATCH_COLUMNS["MAX_DIFFTIMES"]] = max_difftimes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            res[multi, BATCH_COLUMNS["MEAN_SCALED_DIFFTIMES"]] = (
+                mean_difftimes / max_difftimes
+            )
+        for name in ["MEAN_DIFFTIMES", "MEDIAN_DIFFTIMES", "MIN_DIFFTIMES", "MAX_DIFFTIMES"]:
+            missing[multi, BATCH_COLUMNS[name]] = False
+        missing[multi, BATCH_COLUMNS["MEAN_SCALED_DIFFTIMES"]] = False
+    # behavior features
+    switches = np.bincount(
+        seg[1:], same_flow & (flow_data[1:] != flow_data[:-1]), n_flows
+    )
+    max_possible_switchs = (lengths - 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        put(
+            "SWITCHING_METRIC",
+            np.where(max_possible_switchs == 0, 0, switches / max_possible_switchs),
+        )
+    # histograms in order of first occurrence of values for sequential features
+    first_positions = order[run_starts]
+    insertion_order = np.argsort(first_positions, kind="stable")
+    hist_values = run_values[insertion_order].tolist()
+    hist_counts = run_counts[insertion_order].tolist()
+    sorted_counts = sorted_counts.tolist()
+    sequential_steps = steps & SEQUENTIAL_STEPS
+    # exact periodograms of flows sharing frequency grid are computed together
+    if "periodogram" in steps and backend == "direct":
+        sequential_steps = sequential_steps - {"periodogram"}
+        grids = {}
+        for i in range(n_flows):
+            frequency = get_frequency_grid(flow_time[starts[i] : offsets[i + 1]], grid)
+            grids.setdefault(id(frequency), (frequency, []))[1].append(i)
+        for frequency, flows in grids.values():
+            flows = np.array(flows)
+            if flows.size == n_flows:
+                positions = slice(None)
+            else:
+                positions = np.isin(seg, flows)
+            (
+                res[flows, BATCH_COLUMNS["MIN_POWER"] :],
+                missing[flows, BATCH_COLUMNS["MIN_POWER"] :],
+            ) = compute_batch_frequency_features(
+                flow_time[positions],
+                flow_data[positions].astype(np.float64),
+                np.concatenate(([0], np.cumsum(lengths[flows]))),
+                frequency,
+            )
+    for i in range(n_flows if len(sequential_steps) > 0 else 0):
+        start, end = starts[i], offsets[i + 1]
+        data = flow_data[start:end]
+        flowtime = flow_time[start:end]
+        runs = slice(run_offsets[i], run_offsets[i + 1])
+        plugin = TimeSeriesPlugin(None, None, None, None)
+        plugin.MEAN = mean[i]
+        if "hurst_exponent" in steps:
+            perform_getting_hurst_exponent(data, plugin)
+        if "area_values_distribution" in steps:
+            padded_counts = sorted_counts[runs]
+            padded_counts += [0] * (9 - len(padded_counts))
+            get_area_of_value_distribution(dict(enumerate(padded_counts)), plugin)
+        if "normal_distribution" in steps:
+            is_normal_distribution_present(
+                agg_ts[agg_offsets[i] : agg_offsets[i + 1]], plugin
+            )
+        if "spaces" in steps:
+            spaces = perform_spaces_detection(
+                flowtime,
+                space_min_length=0.05,
+                sig_space_threshold=10,
+            )
+            if len(spaces) > 0:
+                plugin.SIG_SPACES = True  # type: ignore
+        if "transients" in steps:
+            has_transient(data, flowtime, plugin, spaces)  # type: ignore
+        if "periodicity" in steps:
+            hist_data = dict(zip(hist_values[runs], hist_counts[runs]))
+            has_clear_periodicity(data, flowtime, hist_data, plugin)
+        if "periodogram" in sequential_steps:
+            compute_frequency_features(flowtime, data, plugin, backend, grid)
+        for name in SEQUENTIAL_FEATURES:
+            if name not in FREQUENCY_FEATURES or "periodogram" in sequential_steps:
+                value = getattr(plugin, name)
+                res[i, BATCH_COLUMNS[name]] = get_plugin_value(value)
+                missing[i, BATCH_COLUMNS[name]] = isinstance(value, str)
+    return res, missing
+
+
+def export_batch_row(
+    row, missing, ip1, ip2, port1, port2, overrides=None, header=HEADER
+):
+    """Create exported flow from row of compute_batch_metrics result. Values without
+    value get default of TimeSeriesPlugin, other NaN values are exported as NaN as by
+    compute_plugin_metrics.
+
+    Args:
+        row (np.ndarray): Row of compute_batch_metrics result.
+        missing (np.ndarray): Row of mask of values without value from compute_batch_metrics.
+        ip1 (str): Source IP address.
+        ip2 (str): Destination IP address.
+        port1 (str): Source port.
+        port2 (str): Destination port.
+        overrides (dict, optional): Values of header fields that replace computed ones. Defaults to None.
+        header (list, optional): Exported columns. Defaults to HEADER.
+
+    Returns:
+        list: Flow in the same format as TimeSeriesPlugin.export.
+    """
+    record = {"DST_IP": ip2, "SRC_IP": ip1, "DST_PORT": port2, "SRC_PORT": port1}
+    for name, value, is_missing in zip(BATCH_HEADER, row.tolist(), missing.tolist()):
+        if is_missing:
+            value = BATCH_DEFAULTS[name]
+        elif math.isnan(value):
+            pass
+        elif name in BOOLEAN_FEATURES:
+            value = bool(value)
+        elif name in INTEGER_FEATURES:
+            value = int(value)
+        record[name] = value
+    if overrides is not None:
+        record.update(overrides)
+    return [record[name] for name in header]
+
+
+def export_flows_batch(
+    pending: list, writer, steps=None, header=HEADER, backend="astropy", grid="fixed"
+):
+    """Compute plugin metrics of pending flows by batched engine and write them.
+
+    Args:
+        pending (list): Flows as tuples (bytes, time, ip1, ip2, port1, port2, overrides).
+        writer (csv.writer): Writer of extended flows.
+        steps (frozenset, optional): Steps from FEATURE_STEPS to compute. Defaults to None (all steps).
+        header (list, optional): Exported columns. Defaults to HEADER.
+        backend (str, optional): Spectral backend from SPECTRAL_BACKENDS. Defaults to "astropy".
+        grid (str, optional): Frequency grid policy from FREQUENCY_GRIDS. Defaults to "fixed".
+
+    Returns:
+        int: Number of exported flows.
+    """
+    if len(pending) == 0:
+        return 0
+    lengths = [len(flow[0]) for flow in pending]
+    offsets = np.zeros(len(pending) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.concatenate([np.asarray(flow[0], dtype=np.int64) for flow in pending])
+    times = np.concatenate([np.asarray(flow[1], dtype=np.float64) for flow in pending])
+    res, missing = compute_batch_metrics(values, times, offsets, steps, backend, grid)
+    for row, row_missing, (_, _, ip1, ip2, port1, port2, overrides) in zip(
+        res, missing, pending
+    ):
+        writer.writerow(
+            export_batch_row(row, row_missing, ip1, ip2, port1, port2, overrides, header)
+        )
+    return len(pending)
+
+
+# incremental computing of plugin metrics
+SERIES_STEPS = frozenset(
+    [
+        "scaled_time",
+        "difftimes",
+        "hurst_exponent",
+        "spaces",
+        "transients",
+        "periodicity",
+        "periodogram",
+    ]
+)
+# features of SERIES_STEPS that are accumulated without series
+ACCUMULATED_FEATURES = [
+    "MEAN_SCALED_TIME",
+    "MEAN_DIFFTIMES",
+    "MIN_DIFFTIMES",
+    "MAX_DIFFTIMES",
+    "MEAN_SCALED_DIFFTIMES",
+]
+AGGREGATION_INTERVAL = 60
+
+
+class FlowAccumulator(object):
+    """Accumulators of flow updated at packet arrival, so statistical and time features
+    are exported in O(1) (O(number of distinct values) for histogram features) without
+    storing time series of flow. Time series is buffered only when series is True,
+    that is when order statistic of times, hurst exponent, spaces, transients,
+    periodicity or spectral features are exported.
+    """
+
+    def __init__(self, skip: int = 0, series: bool = False):
+        """Init accumulators of empty flow.
+
+        Args:
+            skip (int, optional): Number of packets removed from beginning of flow. Defaults to 0.
+            series (bool, optional): Buffer time series of flow. Defaults to False.
+        """
+        self.skip = skip
+        self.series = series
+        # all packets of flow record including skipped
+        self.packets = 0
+        self.start_time = None
+        self.last_time = None
+        # accumulators of datapoints (length + 60) of time series
+        self.n = 0
+        self.sum = 0
+        self.sum_squares = 0
+        self.sum_cubes = 0
+        self.sum_fourth = 0
+        self.hist = {}
+        self.switches = 0
+        self.last_value = None
+        self.time_first = None
+        self.time_last = None
+        self.time_sum = 0
+        self.difftime_sum = 0
+        self.difftime_min = None
+        self.difftime_max = None
+        self.agg_start = None
+        self.agg = 0
+        self.agg_ts = []
+        self.bytes = []
+        self.time = []
+
+    def add(self, length: int, time: float):
+        """Update accumulators by packet.
+
+        Args:
+            length (int): Length of packet.
+            time (float): Time of packet.
+        """
+        self.packets += 1
+        if self.start_time is None:
+            self.start_time = time
+        self.last_time = time
+        if self.packets <= self.skip:
+            return
+        d = length + 60
+        self.n += 1
+        self.sum += d
+        square = d * d
+        self.sum_squares += square
+        self.sum_cubes += square * d
+        self.sum_fourth += square * square
+        if d not in self.hist:
+            self.hist[d] = 0
+        self.hist[d] += 1
+        if self.last_value is not None and self.last_value != d:
+            self.switches += 1
+        self.last_value = d
+        if self.time_first is None:
+            self.time_first = time
+            self.agg_start = time - (time % AGGREGATION_INTERVAL)
+        else:
+            difftime = time - self.time_last
+            self.difftime_sum += difftime
+            if self.difftime_min is None or difftime < self.difftime_min:
+                self.difftime_min = difftime
+            if self.difftime_max is None or difftime > self.difftime_max:
+                self.difftime_max = difftime
+        self.time_last = time
+        self.time_sum += time - self.time_first
+        # the same windows as aggreagation_of_time_series
+        if time < self.agg_start + AGGREGATION_INTERVAL:
+            self.agg += d
+        else:
+            self.agg_ts.append(self.agg)
+            self.agg_start += AGGREGATION_INTERVAL
+            while time > self.agg_start + AGGREGATION_INTERVAL:
+                self.agg_start += AGGREGATION_INTERVAL
+                self.agg_ts.append(0)
+            self.agg = d
+        if self.series:
+            self.bytes.append(d)
+            self.time.append(time)
+
+    def is_buffered(self):
+        """Check if the last added packet was buffered in time series."""
+        return self.series and self.packets > self.skip
+
+    def get_moments(self):
+        """Compute moments of time series from power sums and histogram.
+
+        Central sums are computed exactly from integer power sums, so skewness and
+        kurtosis can differ from get_moments in the last digits.
+
+        Returns:
+            dict: Moments of time series in format of get_moments.
+        """
+        n = self.n
+        values = np.array(sorted(self.hist), dtype=np.int64)
+        counts = np.array([self.hist[v] for v in values.tolist()], dtype=np.int64)
+        cumulative = np.cumsum(counts)
+
+        def get_rank(k):
+            return values[np.searchsorted(cumulative, k, side="right")]
+
+        def get_percentile(q):
+            # linear interpolation in the same way as np.percentile
+            virtual = (n - 1) * (q / 100)
+            previous = math.floor(virtual)
+            gamma = virtual - previous
+            a = get_rank(previous)
+            b = get_rank(min(previous + 1, n - 1))
+            if gamma >= 0.5:
+                return b - (b - a) * (1 - gamma)
+            return a + (b - a) * gamma
+
+        mean = np.int64(self.sum // n)
+        m = int(mean)
+        if n % 2 == 1:
+            median = get_rank(n // 2)
+        else:
+            median = (get_rank(n // 2 - 1) + get_rank(n // 2)) / 2
+        cubed_deviation = (
+            self.sum_cubes
+            - 3 * m * self.sum_squares
+            + 3 * m * m * self.sum
+            - n * m**3
+        )
+        fourth_deviation = (
+            self.sum_fourth
+            - 4 * m * self.sum_cubes
+            + 6 * m * m * self.sum_squares
+            - 4 * m**3 * self.sum
+            + n * m**4
+        )
+        moments = {
+            "n": n,
+            "sum": self.sum,
+            "sum_squares": self.sum_squares,
+            "mean": mean,
+            "median": median,
+            "q1": get_percentile(25),
+            "q3": get_percentile(75),
+            "min": values[0],
+            "max": values[-1],
+            "mode": values[counts.argmax()],
+            "below_mean": counts[values < mean].sum(),
+            "above_mean": counts[values > mean].sum(),
+            "sum_squared_deviation": self.sum_squares - 2 * m * self.sum + n * m * m,
+            "sum_absolute_deviation": int(np.dot(counts, np.abs(values - mean))),
+            "skewness_sum": cubed_deviation / n,
+            "kurtosis_sum": float(fourth_deviation),
+        }
+        if n > 2:
+            moments["adjusted_skewness_sum"] = cubed_deviation / ((n - 1) * (n - 2))
+        return moments
+
+    def get_aggregated_ts(self):
+        """Get aggregated time series in the same way as aggreagation_of_time_series.
+
+        Returns:
+            np.ndarray: Aggregated time series.
+        """
+        if self.agg > 0:
+            return np.array(self.agg_ts + [self.agg])
+        return np.array(self.agg_ts)
+
+
+def is_series_needed(features: list):
+    """Check if time series of flows must be buffered to export features incrementally.
+
+    Args:
+        features (list): Exported features.
+
+    Returns:
+        bool: True if some feature is computed from time series.
+    """
+    for name in features:
+        if FEATURE_STEP.get(name) in SERIES_STEPS and name not in ACCUMULATED_FEATURES:
+            return True
+    return False
+
+
+def get_accumulated_times(accumulator: FlowAccumulator, plugin: TimeSeriesPlugin):
+    """Compute mean scaled time and difftimes features from accumulators of flow.
+
+    Args:
+        accumulator (FlowAccumulator): Accumulators of flow.
+        plugin (TimeSeriesPlugin): Class TimeSeriesPlugin that contains records for save plugin export items.
+    """
+    plugin.MEAN_SCALED_TIME = accumulator.time_sum / accumulator.n
+    if accumulator.n < 2:
+        return
+    plugin.MEAN_DIFFTIMES = accumulator.difftime_sum / (accumulator.n - 1)
+    plugin.MIN_DIFFTIMES = accumulator.difftime_min
+    plugin.MAX_DIFFTIMES = accumulator.difftime_max
+    if accumulator.difftime_max == 0:
+        # packets with the same time, get_mean_difftimes divides numpy zeros into NaN
+        plugin.MEAN_SCALED_DIFFTIMES = math.nan
+    else:
+        plugin.MEAN_SCALED_DIFFTIMES = plugin.MEAN_DIFFTIMES / accumulator.difftime_max
+
+
+def compute_accumulated_metrics(
+    accumulator: FlowAccumulator,
+    ip1,
+    ip2,
+    port1,
+    port2,
+    steps=None,
+    backend="astropy",
+    grid="fixed",
+):
+    """Compute features of flow from accumulators updated at packet arrival. Features
+    computed from time series (SERIES_STEPS) use buffered series of accumulator if any.
+
+    Args:
+        accumulator (FlowAccumulator): Accumulators of flow.
+        ip1 (str): IP address of flow.
+        ip2 (str): IP address of flow.
+        port1 (str): Port of flow.
+        port2 (str): Port of flow.
+        steps (frozenset, optional): Steps of computation from resolve_feature_steps. Defaults to all steps.
+        backend (str, optional): Backend of periodogram. Defaults to "astropy".
+        grid (str, optional): Frequency grid of periodogram. Defaults to "fixed".
+
+    Returns:
+        TimeSeriesPlugin: Extended flow or None for flow without packets.
+    """
+    if accumulator.n == 0:
+        return None
+    if steps is None:
+        steps = ALL_STEPS
+    hist_data = dict(accumulator.hist)
+    # create extended flow
+    extended_flow = TimeSeriesPlugin(ip1, ip2, port1, port2)
+    extended_flow.DURATION = accumulator.time_last - accumulator.time_first
+    if "basic_stats" in steps:
+        moments = accumulator.get_moments()
+        get_basic_stats(None, extended_flow, moments)
+    if "skewness" in steps:
+        get_skewness(None, hist_data, extended_flow, moments)
+    if "kurtosis" in steps:
+        get_kurtosis(None, extended_flow, moments)
+    if "entropy" in steps:
+        get_entropy(None, extended_flow, hist_data)
+    if "benford_law" in steps:
+        is_benford_law_present(None, hist_data, extended_flow)
+    if "benford_probability" in steps:
+        benford_law_probability(None, hist_data, extended_flow)
+    if "area_values_distribution" in steps:
+        pad_histogram(hist_data)
+        get_area_of_value_distribution(hist_data, extended_flow)
+    if "aggregated_ts" in steps:
+        agg_ts = accumulator.get_aggregated_ts()
+    if "normal_distribution" in steps:
+        is_normal_distribution_present(agg_ts, extended_flow)
+    if "cnt_distribution" in steps:
+        get_cnt_distribution(agg_ts, extended_flow)
+    if "time_distribution" in steps and accumulator.n >= 2:
+        get_time_distribution_from_sum(
+            accumulator.time_sum,
+            accumulator.n,
+            accumulator.time_first,
+            accumulator.time_last,
+            extended_flow,
+        )
+    if "scaled_time" in steps or "difftimes" in steps:
+        get_accumulated_times(accumulator, extended_flow)
+    if "switching_metric" in steps:
+        get_switching_metric_from_count(
+            accumulator.switches, accumulator.n, extended_flow
+        )
+    if "cnt_behavior" in steps:
+        get_cnt_behavior(agg_ts, extended_flow)
+    if accumulator.series:
+        flow_data = np.array(accumulator.bytes)
+        flow_time = np.array(accumulator.time)
+        if "scaled_time" in steps:
+            get_mean_scaled_time(flow_time, extended_flow)
+        if "difftimes" in steps:
+            get_mean_difftimes(flow_time, extended_flow)
+        if "hurst_exponent" in steps:
+            perform_getting_hurst_exponent(flow_data, extended_flow)
+        if "spaces" in steps:
+            spaces = perform_spaces_detection(
+                flow_time,
+                space_min_length=0.05,
+                sig_space_threshold=10,
+            )
+            if len(spaces) > 0:
+                extended_flow.SIG_SPACES = True  # type: ignore
+        if "transients" in steps:
+            has_transient(flow_data, flow_time, extended_flow, spaces)  # type: ignore
+        if "periodicity" in steps:
+            has_clear_periodicity(flow_data, flow_time, hist_data, extended_flow)
+        if "periodogram" in steps:
+            compute_frequency_features(
+                flow_time, flow_data, extended_flow, backend, grid
+            )
+    # fill basic plugin info
+    extended_flow.PACKETS = accumulator.n  # type: ignore
+    extended_flow.BYTES = accumulator.sum
+    extended_flow.TIME_FIRST = accumulator.time_first
+    extended_flow.TIME_LAST = accumulator.time_last
+    return extended_flow
+
+
+class FlowRecord(object):
+    """Record of flow table. Time series of flow is stored in typed arrays (8 bytes
+    per time and 2 bytes per length) and passed to computation as numpy views without
+    copy. With accumulator, packets are added to FlowAccumulator instead.
+    """
+
+    __slots__ = (
+        "bytes",
+        "time",
+        "accumulator",
+        "direction_0",
+        "direction_1",
+        "npackets",
+        "npackets_rev",
+        "nbytes",
+        "nbytes_rev",
+        "first",
+        "low_first",
+        "evicted",
+    )
+
+    def __init__(
+        self,
+        length: int,
+        time: float,
+        accumulator: FlowAccumulator = None,
+        low_first: bool = True,
+        first: bool = True,
+    ):
+        """Create record of flow from its first packet.
+
+        Args:
+            length (int): Length of packet.
+            time (float): Time of packet.
+            accumulator (FlowAccumulator, optional): Accumulators of flow for incremental export. Defaults to None.
+            low_first (bool, optional): First packet was sent by lower endpoint of key from get_flow_key. Defaults to True.
+            first (bool, optional): Record is the first record of flow, not a record after timeout. Defaults to True.
+        """
+        self.bytes = array("H")
+        self.time = array("d")
+        self.accumulator = accumulator
+        self.direction_0 = 0
+        self.direction_1 = 1
+        self.npackets = 1
+        self.npackets_rev = 0
+        self.nbytes = length
+        self.nbytes_rev = 0
+        self.first = first
+        self.low_first = low_first
+        self.evicted = False
+        self.append(length, time)
+
+    def append(self, length: int, time: float):
+        """Add packet to time series or accumulators of flow."""
+        if self.accumulator is not None:
+            self.accumulator.add(length, time)
+            return
+        try:
+            self.bytes.append(length)
+        except OverflowError:
+            # lengths above 65535 (e.g. offloaded segments) need wider buffer
+            self.bytes = array("I", self.bytes)
+            self.bytes.append(length)
+        self.time.append(time)
+
+    def clear(self):
+        """Remove time series of exported flow. Buffers are replaced instead of
+        resized, because numpy views of exported series can still exist."""
+        if self.accumulator is not None:
+            self.accumulator = FlowAccumulator(0, self.accumulator.series)
+            return
+        self.bytes = array("H")
+        self.time = array("d")
+
+    def get_bytes(self, skip: int = 0):
+        """Get lengths of packets without first skip packets as numpy view."""
+        return np.frombuffer(self.bytes, dtype=self.bytes.typecode)[skip:]
+
+    def get_time(self, skip: int = 0):
+        """Get times of packets without first skip packets as numpy view."""
+        return np.frombuffer(self.time, dtype=np.float64)[skip:]
+
+    def get_size(self):
+        """Get number of packets of flow."""
+        if self.accumulator is not None:
+            return self.accumulator.packets
+        return len(self.bytes)
+
+    def get_buffered(self):
+        """Get number of packets buffered in time series of flow."""
+        if self.accumulator is not None:
+            return len(self.accumulator.bytes)
+        return len(self.bytes)
+
+    def get_last_time(self):
+        """Get time of the last packet of flow."""
+        if self.accumulator is not None:
+            return self.accumulator.last_time
+        return self.time[-1]
+
+    def is_expired(self, t: float):
+        """Check active and inactive timeout of flow at time t."""
+        if self.accumulator is not None:
+            start_time = self.accumulator.start_time
+            last_time = self.accumulator.last_time
+        else:
+            start_time = self.time[0]
+            last_time = self.time[-1]
+        return start_time + ACTIVE_TIMEOUT < t or t - last_time >= INACTIVE_TIMEOUT
+
+    def get_deadline(self):
+        """Get time when active or inactive timeout of flow is reached."""
+        if self.accumulator is not None:
+            start_time = self.accumulator.start_time
+            last_time = self.accumulator.last_time
+        else:
+            start_time = self.time[0]
+            last_time = self.time[-1]
+        return min(start_time + ACTIVE_TIMEOUT, last_time + INACTIVE_TIMEOUT)
+
+
+def insert_flow(flows: dict, timers: list, key: int, flow: FlowRecord):
+    """Insert new record into flow table and schedule its timeout.
+
+    Args:
+        flows (dict): Flow table.
+        timers (list): Heap of (deadline, key) of flows in flow table.
+        key (int): Key of flow from get_flow_key.
+        flow (FlowRecord): New record of flow.
+    """
+    flows[key] = flow
+    heapq.heappush(timers, (flow.get_deadline(), key))
+
+
+def pop_expired_flows(
+    flows: dict, timers: list, t: float, memory: "FlowTableMemory" = None
+):
+    """Remove flows that reached active or inactive timeout at time t from flow table.
+
+    Every flow has one entry in heap of timers. Entry of flow that got packets after
+    it was scheduled is moved to the new deadline, so expiration costs O(log n)
+    per timeout instead of scanning the whole table.
+
+    Args:
+        flows (dict): Flow table.
+        timers (list): Heap of (deadline, key) of flows in flow table.
+        t (float): Time of current packet.
+        memory (FlowTableMemory, optional): Memory of flow table. Defaults to None.
+
+    Returns:
+        list: Expired flows as tuples (key, FlowRecord) in order of deadlines.
+    """
+    expired = []
+    postponed = []
+    while len(timers) > 0 and timers[0][0] <= t + TIMER_TOLERANCE:
+        _, key = heapq.heappop(timers)
+        if key not in flows:
+            # timer of flow evicted by lru or largest policy
+            continue
+        if flows[key].is_expired(t):
+            expired.append((key, flows.pop(key)))
+        else:
+            postponed.append((flows[key].get_deadline(), key))
+    for timer in postponed:
+        heapq.heappush(timers, timer)
+    if memory is not None:
+        for key, flow in expired:
+            memory.remove(key, flow)
+    return expired
+
+
+# estimated memory of flow table
+FLOW_RECORD_MEMORY = 512  # bytes of FlowRecord with its arrays, key and timer
+FLOW_ACCUMULATOR_MEMORY = 1536  # bytes of FlowRecord with FlowAccumulator
+PACKET_MEMORY = 10  # bytes of time and length of packet in time series of flow
+LRU_MEMORY = 100  # bytes of entry of flow in order of updates of lru policy
+IDLE_MEMORY = 100  # bytes of entry of flow in heap of last packets of idle policy
+EXPIRED_KEY_MEMORY = 200  # bytes of key of expired flow in ExpiredKeys with its timer
+# policies of eviction: flows with the oldest last packet (the longest idle) first,
+# least recently updated first, flows with the most buffered packets first
+EVICTION_POLICIES = ["idle", "lru", "largest"]
+# largest policy sorts flow table, so it evicts flows until table is below this part
+# of limits and sorting is amortized over next flows
+EVICTION_WATERMARK = 0.9
+# removed flows kept in heap of idle policy before it is rebuilt
+EVICTION_SLACK = 1024
+
+
+class FlowTableMemory(object):
+    """Accounting of flow table: number of flows, buffered packets and estimate of
+    memory from them, so it is kept in O(1) per packet. Packets are counted when they
+    are buffered in time series of flow (not for accumulators without time series)
+    and removed together with their flow. Limits of flow table, number of evicted
+    flows and order of flows for eviction policy are kept here too.
+    """
+
+    def __init__(
+        self,
+        limit: int = 0,
+        incremental: bool = False,
+        max_flows: int = 0,
+        max_packets: int = 0,
+        policy: str = "idle",
+    ):
+        """Init memory of empty flow table.
+
+        Args:
+            limit (int, optional): Ceiling of memory in bytes, 0 is unlimited. Defaults to 0.
+            incremental (bool, optional): Flows have FlowAccumulator. Defaults to False.
+            max_flows (int, optional): Ceiling of number of flows, 0 is unlimited. Defaults to 0.
+            max_packets (int, optional): Ceiling of buffered packets, 0 is unlimited. Defaults to 0.
+            policy (str, optional): Policy of eviction from EVICTION_POLICIES. Defaults to "idle".
+        """
+        self.limit = limit
+        self.max_flows = max_flows
+        self.max_packets = max_packets
+        self.policy = policy
+        if incremental:
+            self.flow_memory = FLOW_ACCUMULATOR_MEMORY
+        else:
+            self.flow_memory = FLOW_RECORD_MEMORY
+        self.packets = 0
+        self.evicted = 0
+        # keys of expired flows remembered by ExpiredKeys
+        self.keys = 0
+        # keys of flows from least to most recently updated for lru policy
+        if policy == "lru":
+            self.recent = OrderedDict()
+            self.flow_memory += LRU_MEMORY
+        else:
+            self.recent = None
+        # heap of (last_time, key) of flows for idle policy, entries are pushed for new
+        # records and moved to later packets lazily when they are popped
+        if policy == "idle" and self.is_limited():
+            self.idle = []
+            self.flow_memory += IDLE_MEMORY
+        else:
+            self.idle = None
+
+    def add(self, key: int, flow: FlowRecord):
+        """Count packet added to flow with key in flow table."""
+        if flow.accumulator is None or flow.accumulator.is_buffered():
+            self.packets += 1
+        if self.recent is not None:
+            self.recent[key] = None
+            self.recent.move_to_end(key)
+        if self.idle is not None and flow.get_size() == 1:
+            heapq.heappush(self.idle, (flow.get_last_time(), key))
+
+    def remove(self, key: int, flow: FlowRecord):
+        """Uncount packets of flow removed from flow table."""
+        self.packets -= flow.get_buffered()
+        if self.recent is not None:
+            self.recent.pop(key, None)
+
+    def compact(self, flows: dict):
+        """Rebuild heap of idle policy without entries of removed flows when they are
+        the majority of it, so heap stays proportional to flow table.
+
+        Args:
+            flows (dict): Flow table.
+        """
+        if self.idle is None or len(self.idle) <= 2 * len(flows) + EVICTION_SLACK:
+            return
+        self.idle = [(flow.get_last_time(), key) for key, flow in flows.items()]
+        heapq.heapify(self.idle)
+
+    def get_usage(self, size: int):
+        """Get estimated memory in bytes of flow table with size flows."""
+        return (
+            size * self.flow_memory
+            + self.packets * PACKET_MEMORY
+            + self.keys * EXPIRED_KEY_MEMORY
+        )
+
+    def is_limited(self):
+        """Check if flow table has some limit."""
+        return self.limit > 0 or self.max_flows > 0 or self.max_packets > 0
+
+    def is_exceeded(self, flows: dict, part: float = 1.0):
+        """Check if flow table is above some limit.
+
+        Args:
+            flows (dict): Flow table.
+            part (float, optional): Part of limits that is checked. Defaults to 1.0.
+
+        Returns:
+            bool: True if some limit is exceeded.
+        """
+        return (
+            (self.limit > 0 and self.get_usage(len(flows)) > self.limit * part)
+            or (self.max_flows > 0 and len(flows) > self.max_flows * part)
+            or (self.max_packets > 0 and self.packets > self.max_packets * part)
+        )
+
+
+def get_flow_table_memory(arg, incremental: bool = False):
+    """Create accounting of flow table with limits from program arguments.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+        incremental (bool, optional): Flows have FlowAccumulator. Defaults to False.
+
+    Returns:
+        FlowTableMemory: Accounting of empty flow table.
+    """
+    return FlowTableMemory(
+        arg.max_memory * 2**20,
+        incremental,
+        arg.max_flows,
+        arg.max_buffered_packets,
+        arg.eviction_policy,
+    )
+
+
+class ExpiredKeys(object):
+    """Keys of recently expired flows, next records of them are not the first records
+    of flow. Key is remembered until inactive timeout passes after deadline of its
+    expired record, later packets start new flow, so only keys of flows that can still
+    continue are kept.
+    """
+
+    def __init__(self, memory: FlowTableMemory = None):
+        """Init empty keys.
+
+        Args:
+            memory (FlowTableMemory, optional): Accounting of flow table that counts keys. Defaults to None.
+        """
+        self.memory = memory
+        self.ends = {}
+        # heap of (end, key), entries of keys expired again later are skipped
+        self.timers = []
+
+    def __contains__(self, key: int):
+        return key in self.ends
+
+    def __len__(self):
+        return len(self.ends)
+
+    def add(self, key: int, deadline: float):
+        """Remember key of flow which record expired at deadline."""
+        end = deadline + INACTIVE_TIMEOUT
+        self.ends[key] = end
+        heapq.heappush(self.timers, (end, key))
+        if self.memory is not None:
+            self.memory.keys = len(self.ends)
+
+    def prune(self, t: float):
+        """Forget keys which inactive timeout passed before time t."""
+        while len(self.timers) > 0 and self.timers[0][0] < t:
+            end, key = heapq.heappop(self.timers)
+            if self.ends.get(key) == end:
+                del self.ends[key]
+        if self.memory is not None:
+            self.memory.keys = len(self.ends)
+
+
+def iter_eviction_candidates(flows: dict, memory: FlowTableMemory):
+    """Iterate keys of flows in order of eviction policy of memory.
+
+    Args:
+        flows (dict): Flow table.
+        memory (FlowTableMemory): Accounting of flow table.
+
+    Yields:
+        int: Key of flow in flow table.
+    """
+    if memory.policy == "lru":
+        while len(memory.recent) > 0:
+            yield next(iter(memory.recent))
+    elif memory.policy == "largest":
+        yield from sorted(flows, key=lambda key: flows[key].get_size(), reverse=True)
+    else:
+        while len(memory.idle) > 0:
+            last_time, key = heapq.heappop(memory.idle)
+            if key not in flows:
+                continue
+            if flows[key].get_last_time() > last_time:
+                # entry of flow with packets after it was pushed
+                heapq.heappush(memory.idle, (flows[key].get_last_time(), key))
+                continue
+            yield key
+
+
+def pop_evicted_flows(flows: dict, timers: list, memory: FlowTableMemory):
+    """Remove flows from flow table in order of eviction policy until it is below its
+    limits. Evicted flows are exported as if they expired with EVICTED flag, next
+    packets of them start new record. Timers of evicted flows stay in heap and are
+    skipped by pop_expired_flows.
+
+    Args:
+        flows (dict): Flow table.
+        timers (list): Heap of (deadline, key) of flows in flow table.
+        memory (FlowTableMemory): Accounting of flow table.
+
+    Returns:
+        list: Evicted flows as tuples (key, FlowRecord) in order of eviction.
+    """
+    evicted = []
+    memory.compact(flows)
+    if not memory.is_exceeded(flows):
+        return evicted
+    part = EVICTION_WATERMARK if memory.policy == "largest" else 1.0
+    for key in iter_eviction_candidates(flows, memory):
+        flow = flows.pop(key)
+        memory.remove(key, flow)
+        flow.evicted = True
+        evicted.append((key, flow))
+        if not memory.is_exceeded(flows, part):
+            break
+    memory.evicted += len(evicted)
+    return evicted
+
+
+def get_pending_flow(flow: FlowRecord, key: int, tmp_i: int):
+    """Create pending flow for export_flows_batch from record of flow table.
+
+    Args:
+        flow (FlowRecord): Record of flow table.
+        key (int): Key of flow table from get_flow_key.
+        tmp_i (int): Number of packets removed from beginning of flow.
+
+    Returns:
+        tuple: Pending flow.
+    """
+    return (
+        flow.get_bytes(tmp_i),
+        flow.get_time(tmp_i),
+        *get_flow_endpoints(key, flow.low_first),
+        get_flow_overrides(flow),
+    )
+
+
+def get_flow_overrides(flow: FlowRecord):
+    """Get exported counters of flow from record of flow table.
+
+    Args:
+        flow (FlowRecord): Record of flow table.
+
+    Returns:
+        dict: Values of header fields that replace computed ones.
+    """
+    return {
+        "DIRECTIONS": flow.direction_1 / (flow.direction_1 + flow.direction_0),
+        "PACKETS": flow.npackets,
+        "PACKETS_REV": flow.npackets_rev,
+        "BYTES": flow.nbytes,
+        "BYTES_REV": flow.nbytes_rev,
+        "EVICTED": flow.evicted,
+    }
+
+
+# single flow time series file
+TIMESERIES_FORMATS = ["csv", "binary"]
+TIMESERIES_HEADER = ["SRC_IP", "SRC_PORT", "DST_IP", "DST_PORT", "bytes", "time"]
+TIMESERIES_VERSION = 1
+TIMESERIES_CHUNK = 4096  # flows in one chunk of BinaryTimeSeries.iter_chunks
+FLOW_TABLE_DTYPE = np.dtype(
+    [
+        ("src_high", "<u8"),
+        ("src_low", "<u8"),
+        ("dst_high", "<u8"),
+        ("dst_low", "<u8"),
+        ("src_port", "<u2"),
+        ("dst_port", "<u2"),
+    ]
+)
+
+
+class BinaryTimeSeriesWriter(object):
+    """Writer of single flow time series in binary format. Format is directory with
+    flat arrays of all flows (values.bin uint32, times.bin float64), index of flows
+    (offsets.bin int64, flow i is offsets[i]:offsets[i + 1]), table of flow keys
+    (flows.bin FLOW_TABLE_DTYPE) and meta.json. Interface is the same as
+    CsvTimeSeriesWriter.
+    """
+
+    def __init__(self, path: str):
+        """Create temporary directory of file, it is renamed to path by close.
+
+        Args:
+            path (str): Path of binary time series.
+        """
+        self.path = path
+        self.tmp = f"{path}.tmp{os.getpid()}"
+        os.makedirs(self.tmp, exist_ok=True)
+        self.files = {
+            name: open(os.path.join(self.tmp, name + ".bin"), "wb")
+            for name in ("values", "times", "offsets", "flows")
+        }
+        self.flows = 0
+        self.values = 0
+        self.files["offsets"].write(np.zeros(1, dtype="<i8").tobytes())
+
+    def write_flow(self, key: int, flow: FlowRecord):
+        """Write time series of flow.
+
+        Args:
+            key (int): Key of flow from get_flow_key.
+            flow (FlowRecord): Record of flow with time series.
+        """
+        src_ip, dst_ip, src_port, dst_port = get_flow_endpoint_numbers(key, flow.low_first)
+        row = np.array(
+            [
+                (
+                    src_ip >> 64,
+                    src_ip & 0xFFFFFFFFFFFFFFFF,
+                    dst_ip >> 64,
+                    dst_ip & 0xFFFFFFFFFFFFFFFF,
+                    src_port,
+                    dst_port,
+                )
+            ],
+            dtype=FLOW_TABLE_DTYPE,
+        )
+        self.files["values"].write(np.asarray(flow.get_bytes(), dtype="<u4").tobytes())
+        self.files["times"].write(np.asarray(flow.get_time(), dtype="<f8").tobytes())
+        self.values += len(flow.bytes)
+        self.flows += 1
+        self.files["offsets"].write(np.array([self.values], dtype="<i8").tobytes())
+        self.files["flows"].write(row.tobytes())
+
+    def close(self):
+        """Write meta.json and move file to its path."""
+        for f in self.files.values():
+            f.close()
+        with open(os.path.join(self.tmp, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "format": "timeseries",
+                    "version": TIMESERIES_VERSION,
+                    "flows": self.flows,
+                    "values": self.values,
+                },
+                f,
+            )
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        """Close and remove temporary directory of unfinished file."""
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class CsvTimeSeriesWriter(object):
+    """Writer of single flow time series in CSV format TIMESERIES_HEADER, lengths and
+    times of packets are JSON lists."""
+
+    def __init__(self, f):
+        """Create writer and write header.
+
+        Args:
+            f (file): Opened text file.
+        """
+        self.writer = csv.writer(f, delimiter=";")
+        self.writer.writerow(TIMESERIES_HEADER)
+
+    def write_flow(self, key: int, flow: FlowRecord):
+        """Write time series of flow.
+
+        Args:
+            key (int): Key of flow from get_flow_key.
+            flow (FlowRecord): Record of flow with time series.
+        """
+        ip1, ip2, port1, port2 = get_flow_endpoints(key, flow.low_first)
+        self.writer.writerow([ip1, port1, ip2, port2, list(flow.bytes), list(flow.time)])
+
+
+class BinaryTimeSeries(object):
+    """Memory mapped single flow time series in format of BinaryTimeSeriesWriter."""
+
+    def __init__(self, path: str):
+        """Map arrays of binary time series.
+
+        Args:
+            path (str): Path of binary time series.
+        """
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta.get("format") != "timeseries" or meta.get("version") != TIMESERIES_VERSION:
+            raise ValueError(f"{path} is not binary time series.")
+        self.values = self.map_array(path, "values", "<u4", meta["values"])
+        self.times = self.map_array(path, "times", "<f8", meta["values"])
+        self.offsets = self.map_array(path, "offsets", "<i8", meta["flows"] + 1)
+        self.flows = self.map_array(path, "flows", FLOW_TABLE_DTYPE, meta["flows"])
+
+    @staticmethod
+    def map_array(path: str, name: str, dtype, size: int):
+        """Map array of binary time series, empty arrays are not mapped."""
+        if size == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(
+            os.path.join(path, name + ".bin"), dtype=dtype, mode="r", shape=(size,)
+        )
+
+    def __len__(self):
+        return len(self.flows)
+
+    def get_endpoints(self, i: int):
+        """Get addresses and ports of flow i.
+
+        Args:
+            i (int): Index of flow.
+
+        Returns:
+            tuple: (ip1, ip2, port1, port2) as in get_flow_endpoints.
+        """
+        key = self.flows[i]
+        return (
+            get_ip_string((int(key["src_high"]) << 64) | int(key["src_low"])),
+            get_ip_string((int(key["dst_high"]) << 64) | int(key["dst_low"])),
+            int(key["src_port"]),
+            int(key["dst_port"]),
+        )
+
+    def get_flow(self, i: int):
+        """Get time series of flow i without copy.
+
+        Args:
+            i (int): Index of flow.
+
+        Returns:
+            tuple: Values and times of flow.
+        """
+        return (
+            self.values[self.offsets[i] : self.offsets[i + 1]],
+            self.times[self.offsets[i] : self.offsets[i + 1]],
+        )
+
+    def iter_chunks(self, chunk: int = TIMESERIES_CHUNK):
+        """Iterate flows in chunks.
+
+        Args:
+            chunk (int, optional): Number of flows in chunk. Defaults to TIMESERIES_CHUNK.
+
+        Yields:
+            tuple: Index of first flow of chunk, values and times of chunk and offsets
+                of flows relative to chunk (length is number of flows + 1).
+        """
+        for start in range(0, len(self), chunk):
+            end = min(start + chunk, len(self))
+            first = self.offsets[start]
+            last = self.offsets[end]
+            yield (
+                start,
+                self.values[first:last],
+                self.times[first:last],
+                self.offsets[start : end + 1] - first,
+            )
+
+
+def is_binary_timeseries(path: str):
+    """Check if path is single flow time series in binary format.
+
+    Args:
+        path (str): Path of single flow time series.
+
+    Returns:
+        bool: Path is binary time series.
+    """
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+@contextmanager
+def open_timeseries_writer(path: str, file_format: str = "csv"):
+    """Open writer of single flow time series, for csv with written header.
+
+    Args:
+        path (str): Path of single flow time series.
+        file_format (str, optional): Format from TIMESERIES_FORMATS. Defaults to "csv".
+
+    Yields:
+        CsvTimeSeriesWriter or BinaryTimeSeriesWriter: Writer of flows of save_all_to_file.
+    """
+    if file_format == "binary":
+        writer = BinaryTimeSeriesWriter(path)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+    else:
+        with open(path, "w") as wf:
+            yield CsvTimeSeriesWriter(wf)
+
+
+def merge_binary_timeseries(paths: list, path: str):
+    """Merge binary time series into one.
+
+    Args:
+        paths (list): Paths of merged binary time series.
+        path (str): Path of result.
+    """
+    writer = BinaryTimeSeriesWriter(path)
+    for part in paths:
+        timeseries = BinaryTimeSeries(part)
+        writer.files["values"].write(np.asarray(timeseries.values).tobytes())
+        writer.files["times"].write(np.asarray(timeseries.times).tobytes())
+        offsets = np.asarray(timeseries.offsets[1:], dtype="<i8") + writer.values
+        writer.files["offsets"].write(offsets.tobytes())
+        writer.files["flows"].write(np.asarray(timeseries.flows).tobytes())
+        writer.values += len(timeseries.values)
+        writer.flows += len(timeseries)
+        del timeseries
+    writer.close()
+
+
+# output of extended flows
+OUTPUT_FORMATS = ["csv", "npy", "parquet"]
+OUTPUT_BATCH = 65536  # flows buffered by ColumnarWriter before they are written
+NPY_HEADER_SIZE = 128  # fixed size of .npy header, shape is rewritten when file is closed
+STRING_COLUMNS = {"DST_IP": "<U39", "SRC_IP": "<U39"}
+INTEGER_COLUMNS = {
+    "PACKETS": "<i8",
+    "PACKETS_REV": "<i8",
+    "BYTES": "<i8",
+    "BYTES_REV": "<i8",
+    "DST_PORT": "<u2",
+    "SRC_PORT": "<u2",
+}
+
+
+def is_boolean_column(name: str):
+    """Check if exported column is boolean. Boolean columns are stored as float 0/1
+    with NaN for features without value in .npy files and as nullable bool in Parquet.
+
+    Args:
+        name (str): Name of column from HEADER.
+
+    Returns:
+        bool: True if column is boolean.
+    """
+    return name in BOOLEAN_FEATURES or name == "EVICTED"
+
+
+def get_column_dtype(name: str):
+    """Get type of exported column in columnar output. Features without value are
+    NaN in float columns, including boolean columns (see is_boolean_column).
+
+    Args:
+        name (str): Name of column from HEADER.
+
+    Returns:
+        np.dtype: Type of column.
+    """
+    if name in STRING_COLUMNS:
+        return np.dtype(STRING_COLUMNS[name])
+    if name in INTEGER_COLUMNS:
+        return np.dtype(INTEGER_COLUMNS[name])
+    return np.dtype("<f8")
+
+
+def get_boolean_value(value):
+    """Convert exported value of boolean column to float 0/1, NaN if it has no value.
+
+    Args:
+        value: Value from TimeSeriesPlugin.export.
+
+    Returns:
+        float: 1.0, 0.0 or NaN.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return np.nan
+    if isinstance(value, str):
+        if value == DEFAULT_VALUE:
+            return np.nan
+        return float(value.strip().lower() in ("true", "1", "1.0"))
+    return float(bool(value))
+
+
+def get_typed_column(values: list, dtype: np.dtype, boolean: bool = False):
+    """Convert exported values of column to typed array.
+
+    Args:
+        values (list): Values of column from TimeSeriesPlugin.export.
+        dtype (np.dtype): Type of column from get_column_dtype.
+        boolean (bool, optional): Column is boolean (see is_boolean_column). Defaults to False.
+
+    Returns:
+        np.ndarray: Typed column.
+    """
+    if boolean:
+        return np.array([get_boolean_value(value) for value in values], dtype=dtype)
+    if dtype.kind == "f":
+        return np.array(
+            [
+                (np.nan if value == DEFAULT_VALUE else float(value))
+                if isinstance(value, str)
+                else value
+                for value in values
+            ],
+            dtype=dtype,
+        )
+    if dtype.kind in "iu":
+        return np.array([int(value) for value in values], dtype=dtype)
+    return np.array([str(value) for value in values], dtype=dtype)
+
+
+def get_npy_header(dtype: np.dtype, rows: int):
+    """Create header of .npy file of one dimensional array with fixed size NPY_HEADER_SIZE.
+
+    Args:
+        dtype (np.dtype): Type of array.
+        rows (int): Length of array.
+
+    Returns:
+        bytes: Header of .npy file.
+    """
+    header = repr(
+        {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)}
+    )
+    header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class ColumnarWriter(object):
+    """Writer of extended flows into typed columns. Flows are buffered and written in
+    batches of OUTPUT_BATCH flows as .npy file per column with schema.json in output
+    directory, or as row groups of Parquet file. Output is written to temporary path
+    and renamed to its path by close. Interface is the same as csv.writer with rows
+    of TimeSeriesPlugin.export.
+    """
+
+    def __init__(self, path: str, header: list, output_format: str = "npy"):
+        """Create output.
+
+        Args:
+            path (str): Path of output directory (npy) or file (parquet).
+            header (list): Exported columns.
+            output_format (str, optional): Format from OUTPUT_FORMATS except csv. Defaults to "npy".
+        """
+        self.path = path
+        self.tmp = f"{path}.tmp{os.getpid()}"
+        self.header = header
+        self.output_format = output_format
+        self.dtypes = [get_column_dtype(name) for name in header]
+        self.booleans = [is_boolean_column(name) for name in header]
+        self.rows = []
+        self.cnt_rows = 0
+        if output_format == "parquet":
+            schema = pyarrow.schema(
+                [
+                    (
+                        name,
+                        pyarrow.bool_()
+                        if boolean
+                        else pyarrow.from_numpy_dtype(dtype if dtype.kind != "U" else np.str_),
+                    )
+                    for name, dtype, boolean in zip(header, self.dtypes, self.booleans)
+                ]
+            )
+            self.parquet = pyarrow.parquet.ParquetWriter(self.tmp, schema)
+        else:
+            os.makedirs(self.tmp, exist_ok=True)
+            self.files = []
+            for name, dtype in zip(header, self.dtypes):
+                f = open(os.path.join(self.tmp, name + ".npy"), "wb")
+                f.write(get_npy_header(dtype, 0))
+                self.files.append(f)
+
+    def writerow(self, row: list):
+        """Buffer flow and write batch when it is full.
+
+        Args:
+            row (list): Flow from TimeSeriesPlugin.export(header).
+        """
+        self.rows.append(row)
+        if len(self.rows) >= OUTPUT_BATCH:
+            self.flush()
+
+    def writerows(self, rows: list):
+        """Buffer flows and write batch when it is full.
+
+        Args:
+            rows (list): Flows from TimeSeriesPlugin.export(header).
+        """
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        """Convert buffered flows to typed columns and write them."""
+        if len(self.rows) == 0:
+            return
+        columns = [
+            get_typed_column(values, dtype, boolean)
+            for values, dtype, boolean in zip(zip(*self.rows), self.dtypes, self.booleans)
+        ]
+        self.write_columns(columns)
+        self.rows = []
+
+    def write_columns(self, columns: list):
+        """Write typed columns of flows.
+
+        Args:
+            columns (list): Typed columns in order of header, boolean columns as float 0/1/NaN.
+        """
+        if self.output_format == "parquet":
+            self.parquet.write_table(
+                pyarrow.Table.from_arrays(
+                    [
+                        pyarrow.array(column == 1, mask=np.isnan(column), type=pyarrow.bool_())
+                        if boolean
+                        else pyarrow.array(column)
+                        for column, boolean in zip(columns, self.booleans)
+                    ],
+                    names=self.header,
+                )
+            )
+        else:
+            for f, column in zip(self.files, columns):
+                f.write(np.ascontiguousarray(column).tobytes())
+        self.cnt_rows += len(columns[0])
+
+    def close(self):
+        """Write remaining flows, shapes of .npy files and schema and move output to its path."""
+        self.flush()
+        if self.output_format == "parquet":
+            self.parquet.close()
+            os.replace(self.tmp, self.path)
+            return
+        for f, dtype in zip(self.files, self.dtypes):
+            f.seek(0)
+            f.write(get_npy_header(dtype, self.cnt_rows))
+            f.close()
+        with open(os.path.join(self.tmp, "schema.json"), "w") as f:
+            json.dump(
+                {
+                    "rows": self.cnt_rows,
+                    "columns": [
+                        {
+                            "name": name,
+                            "dtype": np.lib.format.dtype_to_descr(dtype),
+                            "boolean": boolean,
+                            "missing": "NaN" if dtype.kind == "f" else None,
+                        }
+                        for name, dtype, boolean in zip(self.header, self.dtypes, self.booleans)
+                    ],
+                },
+                f,
+                indent=1,
+            )
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        """Close and remove temporary output of unfinished writer."""
+        if self.output_format == "parquet":
+            self.parquet.close()
+            if os.path.exists(self.tmp):
+                os.remove(self.tmp)
+            return
+        for f in self.files:
+            f.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def read_columnar_output(path: str, output_format: str = "npy"):
+    """Read columnar output of extended flows.
+
+    Args:
+        path (str): Path of output directory (npy) or file (parquet).
+        output_format (str, optional): Format from OUTPUT_FORMATS except csv. Defaults to "npy".
+
+    Returns:
+        dict: Columns of flows as numpy arrays (memory mapped for npy), boolean columns
+            as float 0/1/NaN in both formats.
+    """
+    if output_format == "parquet":
+        table = pyarrow.parquet.read_table(path)
+        return {
+            name: (
+                table.column(name).cast(pyarrow.float64()).to_numpy(zero_copy_only=False)
+                if is_boolean_column(name)
+                else table.column(name).to_numpy(zero_copy_only=False)
+            )
+            for name in table.column_names
+        }
+    with open(os.path.join(path, "schema.json"), "r") as f:
+        schema = json.load(f)
+    return {
+        column["name"]: np.load(
+            os.path.join(path, column["name"] + ".npy"), mmap_mode="r"
+        )
+        for column in schema["columns"]
+    }
+
+
+@contextmanager
+def open_flow_writer(path: str, header: list, output_format: str = "csv"):
+    """Open writer of extended flows, for csv with written header.
+
+    Args:
+        path (str): Path of output.
+        header (list): Exported columns.
+        output_format (str, optional): Format from OUTPUT_FORMATS. Defaults to "csv".
+
+    Yields:
+        csv.writer or ColumnarWriter: Writer of rows of TimeSeriesPlugin.export.
+    """
+    if output_format == "csv":
+        with open(path, "w") as w:
+            writer = csv.writer(w)
+            writer.writerow(header)
+            yield writer
+    else:
+        writer = ColumnarWriter(path, header, output_format)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+
+# progress of pipelines
+PROGRESS_INTERVAL = 1.0  # seconds of wall-clock time between updates of progress line
+
+
+def get_rss(peak: bool = False):
+    """Get resident set size of process from /proc (Linux).
+
+    Args:
+        peak (bool, optional): Get peak resident set size instead of current. Defaults to False.
+
+    Returns:
+        int: Resident set size in bytes, None if it is not available.
+    """
+    field = b"VmHWM:" if peak else b"VmRSS:"
+    try:
+        with open("/proc/self/status", "rb") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def get_children_rss():
+    """Get peak resident set size of the largest terminated child process (worker
+    processes of --workers and shard processes of --shards) from getrusage (Unix).
+
+    Returns:
+        int: Resident set size in bytes, None if it is not available.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+
+
+class ProgressReporter(object):
+    """Progress line of pipeline. Pipeline passes its counters at every packet or
+    flow, but line is printed at most once per interval of wall-clock time, so it
+    costs one read of clock instead of formatting and flushing of line. Rates are
+    computed from snapshot of counters at previous update.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        quiet: bool = False,
+        packets: bool = True,
+        interval: float = PROGRESS_INTERVAL,
+    ):
+        """Print title and start measuring of time.
+
+        Args:
+            title (str): Title of progress line.
+            quiet (bool, optional): Print nothing. Defaults to False.
+            packets (bool, optional): Pipeline parses packets into flow table. Defaults to True.
+            interval (float, optional): Seconds between updates. Defaults to PROGRESS_INTERVAL.
+        """
+        self.quiet = quiet
+        self.packets = packets
+        self.interval = interval
+        self.snapshot = (time.perf_counter(), 0, 0)
+        if quiet:
+            self.next_update = math.inf
+            return
+        self.next_update = self.snapshot[0] + interval
+        print(title)
+
+    def update(
+        self,
+        flows: int,
+        packets: int = 0,
+        table: int = 0,
+        backlog: int = 0,
+        memory: FlowTableMemory = None,
+    ):
+        """Print progress line if interval passed since previous update.
+
+        Args:
+            flows (int): Number of exported flows.
+            packets (int, optional): Number of parsed packets. Defaults to 0.
+            table (int, optional): Number of flows in flow table. Defaults to 0.
+            backlog (int, optional): Number of expired flows waiting for export. Defaults to 0.
+            memory (FlowTableMemory, optional): Accounting of flow table. Defaults to None.
+        """
+        if time.perf_counter() < self.next_update:
+            return
+        self.report(flows, packets, table, backlog, memory)
+
+    def report(
+        self,
+        flows: int,
+        packets: int = 0,
+        table: int = 0,
+        backlog: int = 0,
+        memory: FlowTableMemory = None,
+    ):
+        """Print progress line with rates since previous update."""
+        now = time.perf_counter()
+        start, last_flows, last_packets = self.snapshot
+        elapsed = max(now - start, 1e-9)
+        line = f"\r      Flows: {flows} ({(flows - last_flows) / elapsed:.0f}/s)"
+        if self.packets:
+            line += f"      Packets: {packets} ({(packets - last_packets) / elapsed:.0f}/s)"
+            line += f"      Flow table: {table}"
+            if memory is not None:
+                line += f" ({memory.packets} packets, {memory.get_usage(table) / 2**20:.0f} MB)"
+                if memory.is_limited():
+                    line += f"      Evicted: {memory.evicted}"
+        line += f"      Backlog: {backlog}"
+        rss = get_rss()
+        if rss is not None:
+            line += f"      RSS: {rss / 2**20:.0f} MB"
+        print(line + "      ", end="", flush=True)
+        self.snapshot = (now, flows, packets)
+        self.next_update = now + self.interval
+
+    def close(self, flows: int, packets: int = 0):
+        """Print final progress line."""
+        if self.quiet:
+            return
+        self.report(flows, packets)
+        print("")
+
+
+def get_summary(arg, cnt_flows: int, cnt_packets: int, seconds: float):
+    """Create machine-readable summary of run.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+        cnt_flows (int): Number of exported flows.
+        cnt_packets (int): Number of parsed packets.
+        seconds (float): Wall-clock time of run.
+
+    Returns:
+        dict: Summary of run.
+    """
+    return {
+        "input": arg.pcap or arg.csv or arg.timeseries_csv,
+        "output": arg.file or arg.flows,
+        "flows": cnt_flows,
+        "packets": cnt_packets,
+        "seconds": round(seconds, 4),
+        "flows_per_second": round(cnt_flows / seconds, 1) if seconds > 0 else None,
+        "packets_per_second": round(cnt_packets / seconds, 1) if seconds > 0 else None,
+        "peak_rss": get_rss(peak=True),
+        "peak_rss_children": get_children_rss(),
+    }
+
+
+# profiling of pipeline stages and feature functions
+PROFILE_STAGES = ["parse", "assemble", "features", "write"]
+# functions of feature engines, their time is features stage and their flows set bucket
+PROFILED_ENGINES = [
+    "compute_plugin_metrics",
+    "compute_batch_metrics",
+    "compute_accumulated_metrics",
+]
+PROFILED_FEATURES = [
+    "get_moments",
+    "get_basic_stats",
+    "get_skewness",
+    "get_kurtosis",
+    "get_entropy",
+    "perform_getting_hurst_exponent",
+    "is_benford_law_present",
+    "benford_law_probability",
+    "pad_histogram",
+    "get_area_of_value_distribution",
+    "aggreagation_of_time_series",
+    "is_normal_distribution_present",
+    "get_cnt_distribution",
+    "get_time_distribution",
+    "get_mean_scaled_time",
+    "get_mean_difftimes",
+    "perform_spaces_detection",
+    "get_switching_metric",
+    "has_transient",
+    "get_cnt_behavior",
+    "has_clear_periodicity",
+    "compute_frequency_features",
+]
+PROFILED_WRITERS = ["open_flow_writer", "open_timeseries_writer"]
+PROFILE_BINS_PER_OCTAVE = 16  # resolution of histogram of durations (about 4 %)
+PROFILE_PERCENTILES = [50, 90, 99]
+
+
+def get_length_bucket(n: int):
+    """Get bucket of flow length by powers of two (1, 2-3, 4-7, ...)."""
+    if n <= 1:
+        return str(max(n, 0))
+    low = 1 << (n.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+class ProfiledWriter(object):
+    """Writer of rows that measures time of writing as write stage of Profiler."""
+
+    def __init__(self, writer, profiler: "Profiler"):
+        self.writer = writer
+        self.profiler = profiler
+
+    def writerow(self, row):
+        start = time.perf_counter()
+        self.writer.writerow(row)
+        self.profiler.stages["write"] += time.perf_counter() - start
+
+    def writerows(self, rows):
+        start = time.perf_counter()
+        self.writer.writerows(rows)
+        self.profiler.stages["write"] += time.perf_counter() - start
+
+    def write_flow(self, key, flow):
+        start = time.perf_counter()
+        self.writer.write_flow(key, flow)
+        self.profiler.stages["write"] += time.perf_counter() - start
+
+
+class Profiler(object):
+    """Profiler of pipeline stages (parse, assemble, features, write) and feature
+    functions. Functions of PROFILED_ENGINES and PROFILED_FEATURES, read_packet_chunks
+    and writers are replaced in module by timed wrappers while profiler is enabled,
+    so disabled profiling costs nothing. Time of function is exclusive (without
+    profiled functions it calls), so times of all functions sum to features stage.
+    Durations are kept in histograms with PROFILE_BINS_PER_OCTAVE bins per octave
+    for every function and bucket of flow length (get_length_bucket), so memory
+    does not grow with number of flows.
+    """
+
+    def __init__(self):
+        self.stages = {stage: 0.0 for stage in PROFILE_STAGES}
+        # (function, bucket) -> [calls, seconds, Counter of bins of durations]
+        self.functions = {}
+        self.bucket = "0"
+        self.children = 0.0
+        self.originals = {}
+
+    def add(self, name: str, seconds: float):
+        """Add duration of one call of function to current bucket."""
+        key = (name, self.bucket)
+        if key not in self.functions:
+            self.functions[key] = [0, 0.0, Counter()]
+        record = self.functions[key]
+        record[0] += 1
+        record[1] += seconds
+        if seconds > 0:
+            record[2][int(math.log2(seconds * 1e9) * PROFILE_BINS_PER_OCTAVE)] += 1
+        else:
+            record[2][0] += 1
+
+    def wrap_function(self, name: str, function):
+        """Create timed wrapper of function."""
+        engine = name in PROFILED_ENGINES
+
+        def wrapper(*args, **kwargs):
+            if engine:
+                if name == "compute_accumulated_metrics":
+                    self.bucket = get_length_bucket(args[0].packets)
+                elif name == "compute_plugin_metrics":
+                    self.bucket = get_length_bucket(len(args[0]))
+                else:
+                    self.bucket = "batch"
+            children = self.children
+            self.children = 0.0
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.add(name, elapsed - self.children)
+                self.children = children + elapsed
+                if engine:
+                    self.stages["features"] += elapsed
+
+        return wrapper
+
+    def wrap_chunks(self, function):
+        """Create wrapper of read_packet_chunks measuring reading of chunks as parse stage."""
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            chunks = iter(function(*args, **kwargs))
+            self.stages["parse"] += time.perf_counter() - start
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                self.stages["parse"] += time.perf_counter() - start
+                if chunk is None:
+                    return
+                yield chunk
+
+        return wrapper
+
+    def wrap_writer(self, function):
+        """Create wrapper of context manager of writer returning ProfiledWriter."""
+
+        @contextmanager
+        def wrapper(*args, **kwargs):
+            with function(*args, **kwargs) as writer:
+                yield ProfiledWriter(writer, self)
+
+        return wrapper
+
+    def enable(self):
+        """Replace profiled functions of module by timed wrappers."""
+        module = globals()
+        for name in PROFILED_ENGINES + PROFILED_FEATURES:
+            self.originals[name] = module[name]
+            module[name] = self.wrap_function(name, module[name])
+        self.originals["read_packet_chunks"] = module["read_packet_chunks"]
+        module["read_packet_chunks"] = self.wrap_chunks(module["read_packet_chunks"])
+        for name in PROFILED_WRITERS:
+            self.originals[name] = module[name]
+            module[name] = self.wrap_writer(module[name])
+
+    def disable(self):
+        """Restore original functions of module."""
+        globals().update(self.originals)
+        self.originals = {}
+
+    def get_percentiles(self, bins: Counter, calls: int):
+        """Get percentiles of durations in seconds from histogram of durations."""
+        percentiles = {}
+        cumulative = 0
+        ordered = sorted(bins.items())
+        i = 0
+        for q in PROFILE_PERCENTILES:
+            while cumulative < q / 100 * calls and i < len(ordered):
+                cumulative += ordered[i][1]
+                i += 1
+            value = 2 ** ((ordered[i - 1][0] + 0.5) / PROFILE_BINS_PER_OCTAVE) / 1e9
+            percentiles[f"p{q}"] = value
+        return percentiles
+
+    def get_report(self, seconds: float):
+        """Create report of profiling.
+
+        Args:
+            seconds (float): Wall-clock time of pipeline, time that is not in other
+                stages is assemble stage.
+
+        Returns:
+            dict: Report with stages and functions sorted by time with percentiles of
+                durations and cumulative share of features stage for all flows and for
+                every bucket of flow length.
+        """
+        stages = dict(self.stages)
+        stages["assemble"] = max(
+            0.0, seconds - stages["parse"] - stages["features"] - stages["write"]
+        )
+        totals = {}
+        for (name, bucket), (calls, total, bins) in self.functions.items():
+            if name not in totals:
+                totals[name] = [0, 0.0, Counter(), {}]
+            totals[name][0] += calls
+            totals[name][1] += total
+            totals[name][2].update(bins)
+            totals[name][3][bucket] = {
+                "calls": calls,
+                "seconds": total,
+                **self.get_percentiles(bins, calls),
+            }
+        features = max(stages["features"], 1e-12)
+        functions = []
+        cumulative = 0.0
+        for name, (calls, total, bins, buckets) in sorted(
+            totals.items(), key=lambda item: -item[1][1]
+        ):
+            cumulative += total
+            functions.append(
+                {
+                    "function": name,
+                    "calls": calls,
+                    "seconds": total,
+                    "share": total / features,
+                    "cumulative_share": cumulative / features,
+                    **self.get_percentiles(bins, calls),
+                    "buckets": dict(
+                        sorted(buckets.items(), key=lambda item: get_bucket_order(item[0]))
+                    ),
+                }
+            )
+        return {
+            "seconds": seconds,
+            "stages": {
+                stage: {"seconds": stages[stage], "share": stages[stage] / max(seconds, 1e-12)}
+                for stage in PROFILE_STAGES
+            },
+            "functions": functions,
+        }
+
+
+def get_bucket_order(bucket: str):
+    """Get sort key of bucket from get_length_bucket, batch is the last."""
+    if bucket == "batch":
+        return math.inf
+    return int(bucket.split("-")[0])
+
+
+def format_profile_report(report: dict):
+    """Format report of Profiler.get_report as text tables.
+
+    Args:
+        report (dict): Report of profiling.
+
+    Returns:
+        str: Text report.
+    """
+    lines = [f"Profile of {report['seconds']:.4f} seconds:", "  stage         seconds   share"]
+    for stage, value in report["stages"].items():
+        lines.append(f"  {stage:<10} {value['seconds']:10.4f} {value['share']:7.1%}")
+    lines.append("")
+    header = f"  {'function':<32} {'calls':>8} {'seconds':>10} {'share':>7} {'cum.':>7}"
+    header += "".join(f" {'p' + str(q) + ' [us]':>11}" for q in PROFILE_PERCENTILES)
+    lines.append(header)
+    for function in report["functions"]:
+        line = f"  {function['function']:<32} {function['calls']:8d} {function['seconds']:10.4f}"
+        line += f" {function['share']:7.1%} {function['cumulative_share']:7.1%}"
+        line += "".join(f" {function['p' + str(q)] * 1e6:11.1f}" for q in PROFILE_PERCENTILES)
+        lines.append(line)
+    buckets = []
+    for function in report["functions"]:
+        for bucket in function["buckets"]:
+            if bucket not in buckets:
+                buckets.append(bucket)
+    buckets.sort(key=get_bucket_order)
+    lines.append("")
+    lines.append("  seconds by flow length")
+    lines.append(f"  {'function':<32}" + "".join(f" {bucket:>10}" for bucket in buckets))
+    for function in report["functions"]:
+        line = f"  {function['function']:<32}"
+        for bucket in buckets:
+            if bucket in function["buckets"]:
+                line += f" {function['buckets'][bucket]['seconds']:10.4f}"
+            else:
+                line += f" {'':>10}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def save_timeseries(arg):
+    cnt_flows = 0
+    cnt_packets = 0
+    with open_timeseries_writer(arg.file, arg.file_format) as writer:
+        progress = ProgressReporter("Creating extended flows from packets:", arg.quiet)
+        flows = {}
+        timers = []
+        memory = get_flow_table_memory(arg)
+        packets = iter_chunk_packets(read_packet_chunks(arg))
+        for t, src_ip, src_port, dst_ip, dst_port, protocol, length in packets:
+            if protocol == TCP:
+                key, is_low = get_flow_key(src_ip, src_port, dst_ip, dst_port, protocol)
+                if arg.shards > 1 and get_shard(key, arg.shards) != arg.shard:
                     continue
                 cnt_packets += 1
-                dev, ports = get_dev_and_ports_from_packets(
-                    src_ip, src_port, dst_ip, dst_port, flows
-                )
-                t = _t / 1000000000
-                if dev in flows:
-                    if ports in flows[dev]:
-                        if (flows[dev][ports]["time"][0] + ACTIVE_TIMEOUT < t) or (
-                            len(flows[dev][ports]["time"]) > 0
-                            and t - flows[dev][ports]["time"][-1] >= INACTIVE_TIMEOUT
-                        ):
-                            extended_flow = compute_plugin_metrics(
-                                flows[dev][ports]["bytes"],
-                                flows[dev][ports]["time"],
-                                dev.split("-")[0],
-                                dev.split("-")[1],
-                                ports.split("-")[0],
-                                ports.split("-")[1],
-                            )
-                            if extended_flow is None:
-                                continue
-                            # export extended flow
-                            writer.writerow(extended_flow.export())
-                            # print
-                            cnt_flows += 1
-                            # clear data
-                            flows[dev][ports]["bytes"].clear()
-                            flows[dev][ports]["time"].clear()
-                        flows[dev][ports]["bytes"].append(length)
-                        flows[dev][ports]["time"].append(t)
-                    else:
-                        flows[dev][ports] = create_new_flow_ts(length, t)
+                expired = pop_expired_flows(flows, timers, t, memory)
+                expired += pop_evicted_flows(flows, timers, memory)
+                if len(expired) > 0:
+                    _, cnt_flows = save_all_to_file(dict(expired), cnt_flows, writer)
+                if key in flows:
+                    flows[key].append(length, t)
                 else:
-                    flows[dev] = {ports: create_new_flow_ts(length, t)}
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-                    end="",
-                    flush=True,
-                )
-        for dev in flows:
-            for ports in flows[dev]:
-                extended_flow = compute_plugin_metrics(
-                    flows[dev][ports]["bytes"],
-                    flows[dev][ports]["time"],
-                    dev.split("-")[0],
-                    dev.split("-")[1],
-                    ports.split("-")[0],
-                    ports.split("-")[1],
-                )
-                if extended_flow is None:
-                    continue
-                # export extended flow
-                writer.writerow(extended_flow.export())
-                # print
-                cnt_flows += 1
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-                    end="",
-                    flush=False,
-                )
+                    insert_flow(
+                        flows, timers, key, FlowRecord(length, t, low_first=is_low)
+                    )
+                memory.add(key, flows[key])
+                progress.update(cnt_flows, cnt_packets, len(flows), memory=memory)
+
+        flows, cnt_flows = save_all_to_file(flows, cnt_flows, writer)
+        progress.close(cnt_flows, cnt_packets)
     return cnt_flows, cnt_packets
 
 
-def save_all_to_file(flows, cnt_flows, cnt_packets, writer, t=None):
-    for dev in flows:
-        for ports in flows[dev]:
-            if len(flows[dev][ports]["bytes"]) == 0 or (
-                t is not None
-                and t - flows[dev][ports]["time"][-1] - 5 < INACTIVE_TIMEOUT
-            ):
+def timeseries_plugin(arg):
+    cnt_flows = 0
+    cnt_packets = 0
+    steps, header = get_export_settings(arg)
+    with open_flow_writer(arg.flows, header, arg.output_format) as writer:
+        progress = ProgressReporter("Creating extended flows from packets:", arg.quiet)
+        flows = {}
+        timers = []
+        memory = get_flow_table_memory(arg)
+        pool = get_worker_pool(arg, writer, steps, header)
+
+        packets = iter_chunk_packets(read_packet_chunks(arg))
+        for t, src_ip, src_port, dst_ip, dst_port, protocol, length in packets:
+            if protocol == TCP:
+                key, is_low = get_flow_key(src_ip, src_port, dst_ip, dst_port, protocol)
+                if arg.shards > 1 and get_shard(key, arg.shards) != arg.shard:
+                    continue
+                cnt_packets += 1
+                expired = pop_expired_flows(flows, timers, t, memory)
+                expired += pop_evicted_flows(flows, timers, memory)
+                for expired_key, flow in expired:
+                    ip1, ip2, port1, port2 = get_flow_endpoints(
+                        expired_key, flow.low_first
+                    )
+                    if pool is not None:
+                        cnt_flows += pool.submit(
+                            (
+                                flow.get_bytes(),
+                                flow.get_time(),
+                                ip1,
+                                ip2,
+                                port1,
+                                port2,
+                                {"EVICTED": flow.evicted},
+                            )
+                        )
+                        continue
+                    extended_flow = compute_plugin_metrics(
+                        flow.get_bytes(),
+                        flow.get_time(),
+                        ip1,
+                        ip2,
+                        port1,
+                        port2,
+                        steps,
+                        arg.spectral_backend,
+                        arg.frequency_grid,
+                    )
+                    if extended_flow is None:
+                        continue
+                    extended_flow.EVICTED = flow.evicted
+                    # export extended flow
+                    writer.writerow(extended_flow.export(header))
+                    # print
+                    cnt_flows += 1
+                if key in flows:
+                    flows[key].append(length, t)
+                else:
+                    insert_flow(
+                        flows, timers, key, FlowRecord(length, t, low_first=is_low)
+                    )
+                memory.add(key, flows[key])
+                progress.update(
+                    cnt_flows, cnt_packets, len(flows), get_export_backlog(pool), memory
+                )
+        for key in flows:
+            ip1, ip2, port1, port2 = get_flow_endpoints(key, flows[key].low_first)
+            if pool is not None:
+                cnt_flows += pool.submit(
+                    (
+                        flows[key].get_bytes(),
+                        flows[key].get_time(),
+                        ip1,
+                        ip2,
+                        port1,
+                        port2,
+                        {"EVICTED": flows[key].evicted},
+                    )
+                )
                 continue
-            writer.writerow(
-                [
-                    dev.split("-")[0],
-                    ports.split("-")[0],
-                    dev.split("-")[1],
-                    ports.split("-")[1],
-                    flows[dev][ports]["bytes"],
-                    flows[dev][ports]["time"],
-                ]
+            extended_flow = compute_plugin_metrics(
+                flows[key].get_bytes(),
+                flows[key].get_time(),
+                ip1,
+                ip2,
+                port1,
+                port2,
+                steps,
+                arg.spectral_backend,
+                arg.frequency_grid,
             )
+            if extended_flow is None:
+                continue
+            extended_flow.EVICTED = flows[key].evicted
+            # export extended flow
+            writer.writerow(extended_flow.export(header))
+            # print
             cnt_flows += 1
-            flows[dev][ports]["bytes"].clear()
-            flows[dev][ports]["time"].clear()
-            print(
-                f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-                end="",
-                flush=False,
+            progress.update(
+                cnt_flows, cnt_packets, len(flows), get_export_backlog(pool)
             )
+        if pool is not None:
+            cnt_flows += pool.close()
+        progress.close(cnt_flows, cnt_packets)
+    return cnt_flows, cnt_packets
+
+
+def save_all_to_file(flows, cnt_flows, writer):
+    for key in flows:
+        if len(flows[key].bytes) == 0:
+            continue
+        writer.write_flow(key, flows[key])
+        cnt_flows += 1
+        flows[key].clear()
     return flows, cnt_flows
 
 
 def save_timeseries_csv(arg):
     cnt_flows = 0
     cnt_packets = 0
-    with open(arg.file, "w") as wf:
-        writer = csv.writer(wf, delimiter=";")
-        print("Write header:", end=" ")
-        writer.writerow(["SRC_IP", "SRC_PORT", "DST_IP", "DST_PORT", "bytes", "time"])
-        print("Done")
-        print("Creating extended flows from packets:")
-        print(
-            f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-            end="",
-        )
+    with open_timeseries_writer(arg.file, arg.file_format) as writer:
+        progress = ProgressReporter("Creating extended flows from packets:", arg.quiet)
         flows = {}
-        with open(arg.csv, "r") as rf:
-            reader = csv.reader(rf, delimiter=" ")
-            for row in reader:
-                # row is in format ['1662638393.520198', 'IP', '192.168.1.104.8085', '>', '192.168.1.245.45820:', 'tcp', '78']
-                if len(row) < 6:
-                    # print(row)
-                    continue
-                t = float(row[0])
-                if row[5] == "tcp":
-                    length = int(row[6])
-                    dst_port = row[4].split(".")[-1]
-                    dst_ip = row[4][: -len(dst_port) + 1]
-                elif row[5] == "UDP,":
-                    length = int(row[7])
-                    dst_port = row[4][:-1].split(".")[-1]
-                    dst_ip = row[4][:-1][: -len(dst_port) + 1]
-                else:
-                    # print(row)
-                    continue
-                src_port = row[2].split(".")[-1]
-                src_ip = row[2][: -len(src_port) + 1]
-                cnt_packets += 1
-                dev, ports, direction = get_dev_and_ports_from_packets(
-                    src_ip, src_port, dst_ip, dst_port, flows
-                )
-                if dev in flows:
-                    if ports in flows[dev]:
-                        if len(flows[dev][ports]["time"]) != 0 and (
-                            flows[dev][ports]["time"][0] + ACTIVE_TIMEOUT < t
-                            or t - flows[dev][ports]["time"][-1] >= INACTIVE_TIMEOUT
-                        ):
-                            if len(flows[dev][ports]["bytes"]) == 0:
-                                continue
-                            writer.writerow(
-                                [
-                                    src_ip,
-                                    src_port,
-                                    dst_ip,
-                                    dst_port,
-                                    flows[dev][ports]["bytes"],
-                                    flows[dev][ports]["time"],
-                                ]
-                            )
-                            cnt_flows += 1
-                            flows[dev][ports]["bytes"].clear()
-                            flows[dev][ports]["time"].clear()
-                        flows[dev][ports]["bytes"].append(length)
-                        flows[dev][ports]["time"].append(t)
-                    else:
-                        flows[dev][ports] = create_new_flow_ts(length, t)
-                else:
-                    flows[dev] = {ports: create_new_flow_ts(length, t)}
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-                    end="",
-                    flush=False,
+        timers = []
+        memory = get_flow_table_memory(arg)
+        packets = iter_chunk_packets(read_packet_chunks(arg))
+        for t, src_ip, src_port, dst_ip, dst_port, protocol, length in packets:
+            key, is_low = get_flow_key(src_ip, src_port, dst_ip, dst_port, protocol)
+            if arg.shards > 1 and get_shard(key, arg.shards) != arg.shard:
+                continue
+            cnt_packets += 1
+            expired = pop_expired_flows(flows, timers, t, memory)
+            expired += pop_evicted_flows(flows, timers, memory)
+            if len(expired) > 0:
+                _, cnt_flows = save_all_to_file(dict(expired), cnt_flows, writer)
+            if key in flows:
+                flows[key].append(length, t)
+            else:
+                insert_flow(
+                    flows, timers, key, FlowRecord(length, t, low_first=is_low)
                 )
-                if cnt_packets % 1000000 == 0:
-                    flows, cnt_flows = save_all_to_file(
-                        flows, cnt_flows, cnt_packets, writer, t
-                    )
-        flows, cnt_flows = save_all_to_file(flows, cnt_flows, cnt_packets, writer)
-        print("")
+            memory.add(key, flows[key])
+            progress.update(cnt_flows, cnt_packets, len(flows), memory=memory)
+        flows, cnt_flows = save_all_to_file(flows, cnt_flows, writer)
+        progress.close(cnt_flows, cnt_packets)
     return cnt_flows, cnt_packets
 
 
+# feature workers of flow assembler
+WORKER_BATCH = 64
+# maximum number of submitted batches per worker, assembler waits for writer above it
+WORKER_BACKLOG = 4
+
+
+def compute_worker_rows(
+    pending: list, engine: str, steps=None, header=HEADER, backend="astropy", grid="fixed"
+):
+    """Compute exported rows of pending flows. Runs in process of WorkerPool.
+
+    Args:
+        pending (list): Flows as tuples (bytes, time, ip1, ip2, port1, port2, overrides),
+            for incremental engine (accumulator, None, ip1, ip2, port1, port2, overrides).
+        engine (str): Engine of computation (default, batch or incremental).
+        steps (frozenset, optional): Steps from FEATURE_STEPS to compute. Defaults to None (all steps).
+        header (list, optional): Exported columns. Defaults to HEADER.
+        backend (str, optional): Spectral backend from SPECTRAL_BACKENDS. Defaults to "astropy".
+        grid (str, optional): Frequency grid policy from FREQUENCY_GRIDS. Defaults to "fixed".
+
+    Returns:
+        list: Exported rows of flows with computed metrics.
+    """
+    if engine == "batch":
+        lengths = [len(flow[0]) for flow in pending]
+        offsets = np.zeros(len(pending) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.concatenate([np.asarray(flow[0], dtype=np.int64) for flow in pending])
+        times = np.concatenate([np.asarray(flow[1], dtype=np.float64) for flow in pending])
+        res, missing = compute_batch_metrics(values, times, offsets, steps, backend, grid)
+        return [
+            export_batch_row(row, row_missing, ip1, ip2, port1, port2, overrides, header)
+            for row, row_missing, (_, _, ip1, ip2, port1, port2, overrides) in zip(
+                res, missing, pending
+            )
+        ]
+    rows = []
+    for data, time, ip1, ip2, port1, port2, overrides in pending:
+        if engine == "incremental":
+            extended_flow = compute_accumulated_metrics(
+                data, ip1, ip2, port1, port2, steps, backend, grid
+            )
+        else:
+            extended_flow = compute_plugin_metrics(
+                data, time, ip1, ip2, port1, port2, steps, backend, grid
+            )
+        if extended_flow is None:
+            continue
+        if overrides is not None:
+            for name, value in overrides.items():
+                setattr(extended_flow, name, value)
+        rows.append(extended_flow.export(header))
+    return rows
+
+
+class WorkerPool(object):
+    """Process pool computing features of expired flows for flow assembler. Flows are
+    sent to workers in batches and rows of finished batches are written by the main
+    process, in order of submission when ordered is True, otherwise as they finish.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        writer,
+        engine: str = "default",
+        steps=None,
+        header=HEADER,
+        backend="astropy",
+        grid="fixed",
+        batch: int = WORKER_BATCH,
+        ordered: bool = False,
+    ):
+        """Start worker processes.
+
+        Args:
+            workers (int): Number of worker processes.
+            writer (csv.writer): Writer of extended flows.
+            engine (str, optional): Engine of computation (default, batch or incremental). Defaults to "default".
+            steps (frozenset, optional): Steps from FEATURE_STEPS to compute. Defaults to None (all steps).
+            header (list, optional): Exported columns. Defaults to HEADER.
+            backend (str, optional): Spectral backend from SPECTRAL_BACKENDS. Defaults to "astropy".
+            grid (str, optional): Frequency grid policy from FREQUENCY_GRIDS. Defaults to "fixed".
+            batch (int, optional): Number of flows in one task of worker. Defaults to WORKER_BATCH.
+            ordered (bool, optional): Write flows in order of submission. Defaults to False.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.writer = writer
+        self.args = (engine, steps, header, backend, grid)
+        self.batch = batch
+        self.ordered = ordered
+        self.backlog = workers * WORKER_BACKLOG
+        self.pending = []
+        self.futures = deque()
+
+    def submit(self, flow: tuple):
+        """Add flow to pending batch and submit batch to workers when it is full.
+
+        Args:
+            flow (tuple): Flow in format of compute_worker_rows.
+
+        Returns:
+            int: Number of written flows.
+        """
+        self.pending.append(flow)
+        if len(self.pending) < self.batch:
+            return 0
+        return self.flush()
+
+    def flush(self):
+        """Submit pending batch to workers and write finished batches. Waits for
+        the oldest batches when more than backlog batches are running.
+
+        Returns:
+            int: Number of written flows.
+        """
+        if len(self.pending) > 0:
+            self.futures.append(
+                self.executor.submit(compute_worker_rows, self.pending, *self.args)
+            )
+            self.pending = []
+        cnt_flows = 0
+        while len(self.futures) > self.backlog:
+            cnt_flows += self.write(self.futures.popleft())
+        if self.ordered:
+            while len(self.futures) > 0 and self.futures[0].done():
+                cnt_flows += self.write(self.futures.popleft())
+        else:
+            done = [future for future in self.futures if future.done()]
+            for future in done:
+                self.futures.remove(future)
+                cnt_flows += self.write(future)
+        return cnt_flows
+
+    def write(self, future):
+        """Write rows of batch, waits for batch to finish.
+
+        Args:
+            future (Future): Submitted batch.
+
+        Returns:
+            int: Number of written flows.
+        """
+        rows = future.result()
+        self.writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        """Submit remaining flows, write all batches and stop worker processes.
+
+        Returns:
+            int: Number of written flows.
+        """
+        cnt_flows = self.flush()
+        if self.ordered:
+            while len(self.futures) > 0:
+                cnt_flows += self.write(self.futures.popleft())
+        else:
+            for future in as_completed(self.futures):
+                cnt_flows += self.write(future)
+            self.futures.clear()
+        self.executor.shutdown()
+        return cnt_flows
+
+    def get_backlog(self):
+        """Get number of flows submitted to pool and not written yet. Batches are
+        submitted full except for the last one, so it is counted by batch size."""
+        return len(self.pending) + len(self.futures) * self.batch
+
+
+def get_worker_pool(arg, writer, steps=None, header=HEADER):
+    """Create pool of feature workers selected by arguments.
+
+    Args:
+        arg (Namespace): Parsed arguments.
+        writer (csv.writer): Writer of extended flows.
+        steps (frozenset, optional): Steps from FEATURE_STEPS to compute. Defaults to None (all steps).
+        header (list, optional): Exported columns. Defaults to HEADER.
+
+    Returns:
+        WorkerPool: Pool of feature workers, None if workers are disabled.
+    """
+    if arg.workers <= 0:
+        return None
+    if arg.incremental:
+        engine = "incremental"
+    elif arg.batch > 0:
+        engine = "batch"
+    else:
+        engine = "default"
+    return WorkerPool(
+        arg.workers,
+        writer,
+        engine,
+        steps,
+        header,
+        arg.spectral_backend,
+        arg.frequency_grid,
+        arg.batch if arg.batch > 0 else WORKER_BATCH,
+        arg.ordered,
+    )
+
+
+def get_export_backlog(pool: WorkerPool = None, pending: list = ()):
+    """Get number of expired flows waiting for export in worker pool or in pending
+    batch of batched engine.
+
+    Args:
+        pool (WorkerPool, optional): Worker processes computing features. Defaults to None.
+        pending (list, optional): Pending flows of batched engine. Defaults to ().
+
+    Returns:
+        int: Number of flows waiting for export.
+    """
+    if pool is None:
+        return len(pending)
+    return len(pending) + pool.get_backlog()
+
+
+def export_flow(
+    key: int,
+    flow: FlowRecord,
+    arg,
+    steps,
+    header: list,
+    writer,
+    pending: list,
+    pool: WorkerPool = None,
+):
+    """Compute features of expired flow by engine selected by arguments and write it.
+    Flows for batched engine are added to pending and written when batch is full.
+    With pool, flow is sent to worker processes instead.
+
+    Args:
+        key (int): Key of flow from get_flow_key.
+        flow (FlowRecord): Record of flow.
+        arg (Namespace): Parsed arguments.
+        steps (frozenset): Steps from FEATURE_STEPS to compute.
+        header (list): Exported columns.
+        writer (csv.writer): Writer of extended flows.
+        pending (list): Pending flows of batched engine.
+        pool (WorkerPool, optional): Worker processes computing features. Defaults to None.
+
+    Returns:
+        int: Number of written flows.
+    """
+    if flow.get_size() <= arg.I:
+        return 0
+    if flow.first is True:
+        tmp_i = arg.H
+    else:
+        tmp_i = 0
+    ip1, ip2, port1, port2 = get_flow_endpoints(key, flow.low_first)
+    if pool is not None:
+        if arg.incremental:
+            return pool.submit(
+                (flow.accumulator, None, ip1, ip2, port1, port2, get_flow_overrides(flow))
+            )
+        if len(flow.bytes) <= tmp_i:
+            return 0
+        return pool.submit(get_pending_flow(flow, key, tmp_i))
+    if arg.incremental:
+        extended_flow = compute_accumulated_metrics(
+            flow.accumulator,
+            ip1,
+            ip2,
+            port1,
+            port2,
+            steps,
+            arg.spectral_backend,
+            arg.frequency_grid,
+        )
+    elif arg.batch > 0:
+        if len(flow.bytes) <= tmp_i:
+            return 0
+        pending.append(get_pending_flow(flow, key, tmp_i))
+        if len(pending) < arg.batch:
+            return 0
+        cnt_flows = export_flows_batch(
+            pending,
+            writer,
+            steps,
+            header,
+            arg.spectral_backend,
+            arg.frequency_grid,
+        )
+        pending.clear()
+        return cnt_flows
+    else:
+        extended_flow = compute_plugin_metrics(
+            flow.get_bytes(tmp_i),
+            flow.get_time(tmp_i),
+            ip1,
+            ip2,
+            port1,
+            port2,
+            steps,
+            arg.spectral_backend,
+            arg.frequency_grid,
+        )
+    if extended_flow is None:
+        return 0
+    # extended_flow_0 = compute_plugin_metrics(
+    #     flow["bytes_0"][tmp_i:],
+    #     flow["time_0"][tmp_i:],
+    #     ip1,
+    #     ip2,
+    #     port1,
+    #     port2,
+    # )
+    # if extended_flow_0 is not None:
+    #     extended_flow.extend_with_0_direction(extended_flow_0)
+
+    # extended_flow_1 = compute_plugin_metrics(
+    #     flow["bytes_1"][tmp_i:],
+    #     flow["time_1"][tmp_i:],
+    #     ip1,
+    #     ip2,
+    #     port1,
+    #     port2,
+    # )
+    # if extended_flow_1 is not None:
+    #     extended_flow.extend_with_1_direction(extended_flow_1)
+
+    extended_flow.DIRECTIONS = (flow.direction_1) / (flow.direction_1 + flow.direction_0)
+    extended_flow.PACKETS = flow.npackets
+    extended_flow.PACKETS_REV = flow.npackets_rev
+    extended_flow.BYTES = flow.nbytes
+    extended_flow.BYTES_REV = flow.nbytes_rev
+    extended_flow.EVICTED = flow.evicted
+    # export extended flow
+    writer.writerow(extended_flow.export(header))
+    return 1
+
+
 def timeseries_plugin_csv(arg):
     cnt_flows = 0
     cnt_packets = 0
-    with open(arg.flows, "w") as w:
-        writer = csv.writer(w)
-        print("Write header:", end=" ")
-        writer.writerow(HEADER)
-        print("Done")
-        print("Creating extended flows from packets:")
-        print(
-            f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-            end="",
-        )
+    steps, header = get_export_settings(arg)
+    series = is_series_needed(header)
+    with open_flow_writer(arg.flows, header, arg.output_format) as writer:
+        progress = ProgressReporter("Creating extended flows from packets:", arg.quiet)
         flows = {}
-        with open(arg.csv, "r") as rf:
-            reader = csv.reader(rf, delimiter=" ")
-            for row in reader:
-                if len(row) < 6:
-                    # print(row)
-                    continue
-                try:
-                    t = float(row[0])
-                except:
-                    continue
-                if row[5] == "tcp":
-                    length = int(row[6])
-                    dst_port = row[4][:-1].split(".")[-1]
-                    dst_ip = row[4][: -(len(dst_port) + 1)]
-                elif row[5] == "UDP,":
-                    length = int(row[7])
-                    dst_port = row[4][:-1].split(".")[-1]
-                    dst_ip = row[4][:-1][: -(len(dst_port) + 1)]
-                else:
-                    # print(row)
-                    continue
-                src_port = row[2].split(".")[-1]
-                src_ip = row[2][: -(len(src_port) + 1)]
-                cnt_packets += 1
-                dev, ports, direction = get_dev_and_ports_from_packets(
-                    src_ip, src_port, dst_ip, dst_port, flows
+        timers = []
+        pending = []
+        memory = get_flow_table_memory(arg, arg.incremental)
+        # keys of expired flows, next records of them are not shortened by -H
+        expired_keys = ExpiredKeys(memory)
+        pool = get_worker_pool(arg, writer, steps, header)
+        packets = iter_chunk_packets(read_packet_chunks(arg))
+        for t, src_ip, src_port, dst_ip, dst_port, protocol, length in packets:
+            key, is_low = get_flow_key(src_ip, src_port, dst_ip, dst_port, protocol)
+            if arg.shards > 1 and get_shard(key, arg.shards) != arg.shard:
+                continue
+            cnt_packets += 1
+            expired = pop_expired_flows(flows, timers, t, memory)
+            expired += pop_evicted_flows(flows, timers, memory)
+            if arg.H > 0:
+                expired_keys.prune(t)
+            for expired_key, flow in expired:
+                if arg.H > 0:
+                    expired_keys.add(expired_key, flow.get_deadline())
+                cnt_flows += export_flow(
+                    expired_key, flow, arg, steps, header, writer, pending, pool
                 )
-                if dev in flows:
-                    if ports in flows[dev]:
-                        if (flows[dev][ports]["time"][0] + ACTIVE_TIMEOUT < t) or (
-                            len(flows[dev][ports]["time"]) > 0
-                            and t - flows[dev][ports]["time"][-1] >= INACTIVE_TIMEOUT
-                        ):
-                            if len(flows[dev][ports]["bytes"]) <= arg.I:
-                                continue
-                            if flows[dev][ports]["first"] is True:
-                                tmp_i = arg.H
-                            else:
-                                tmp_i = 0
-                            extended_flow = compute_plugin_metrics(
-                                flows[dev][ports]["bytes"][tmp_i:],
-                                flows[dev][ports]["time"][tmp_i:],
-                                dev.split("-")[0],
-                                dev.split("-")[1],
-                                ports.split("-")[0],
-                                ports.split("-")[1],
-                            )
-                            if extended_flow is None:
-                                continue
-                            # extended_flow_0 = compute_plugin_metrics(
-                            #     flows[dev][ports]["bytes_0"][tmp_i:],
-                            #     flows[dev][ports]["time_0"][tmp_i:],
-                            #     dev.split("-")[0],
-                            #     dev.split("-")[1],
-                            #     ports.split("-")[0],
-                            #     ports.split("-")[1],
-                            # )
-                            # if extended_flow_0 is not None:
-                            #     extended_flow.extend_with_0_direction(extended_flow_0)
-                            
-                            # extended_flow_1 = compute_plugin_metrics(
-                            #     flows[dev][ports]["bytes_1"][tmp_i:],
-                            #     flows[dev][ports]["time_1"][tmp_i:],
-                            #     dev.split("-")[0],
-                            #     dev.split("-")[1],
-                            #     ports.split("-")[0],
-                            #     ports.split("-")[1],
-                            # )
-                            # if extended_flow_1 is not None:
-                            #     extended_flow.extend_with_1_direction(extended_flow_1)
-                            
-                            extended_flow.DIRECTIONS = (flows[dev][ports]["direction_1"]) / (flows[dev][ports]["direction_1"] + flows[dev][ports]["direction_0"]) 
-                            extended_flow.PACKETS = flows[dev][ports]["npackets"]
-                            extended_flow.PACKETS_REV = flows[dev][ports]["npackets_rev"]
-                            extended_flow.BYTES = flows[dev][ports]["nbytes"]
-                            extended_flow.BYTES_REV = flows[dev][ports]["nbytes_rev"]
-                            # export extended flow
-                            writer.writerow(extended_flow.export())
-                            # print
-                            cnt_flows += 1
-                            # clear data
-                            flows[dev][ports]["bytes"].clear()
-                            flows[dev][ports]["time"].clear()
-                            # flows[dev][ports]["bytes_0"].clear()
-                            # flows[dev][ports]["time_0"].clear()
-                            # flows[dev][ports]["bytes_1"].clear()
-                            # flows[dev][ports]["time_1"].clear()
-                            flows[dev][ports]["first"] = False
-                            flows[dev][ports]["npackets"] = 0
-                            flows[dev][ports]["nbytes"] = 0
-                            flows[dev][ports]["direction_1"] = 0
-                            flows[dev][ports]["npackets_rev"] = 0
-                            flows[dev][ports]["nbytes_rev"] = 0
-                            flows[dev][ports]["direction_0"] = 0    
-                        flows[dev][ports]["bytes"].append(length)
-                        flows[dev][ports]["time"].append(t)
-                        if direction is True:
-                            flows[dev][ports]["npackets"] += 1
-                            flows[dev][ports]["nbytes"] += length
-                            flows[dev][ports]["direction_1"] += 1
-                            # flows[dev][ports]["bytes_1"].append(length)
-                            # flows[dev][ports]["time_1"].append(t)    
-                        else:
-                            flows[dev][ports]["npackets_rev"] += 1
-                            flows[dev][ports]["nbytes_rev"] += length
-                            flows[dev][ports]["direction_0"] += 1  
-                            # flows[dev][ports]["bytes_0"].append(length)
-                            # flows[dev][ports]["time_0"].append(t)    
-                    else:
-                        flows[dev][ports] = create_new_flow_ts(length, t)
+            if key in flows:
+                direction = is_low == flows[key].low_first
+                flows[key].append(length, t)
+                if direction is True:
+                    flows[key].npackets += 1
+                    flows[key].nbytes += length
+                    flows[key].direction_1 += 1
+                    # flows[key]["bytes_1"].append(length)
+                    # flows[key]["time_1"].append(t)
                 else:
-                    flows[dev] = {ports: create_new_flow_ts(length, t)}
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-                    end="",
-                    flush=True,
-                )
-        for dev in flows:
-            for ports in flows[dev]:
-                if len(flows[dev][ports]["bytes"]) <= arg.I:
-                    continue
-                if flows[dev][ports]["first"] is True:
-                    tmp_i = arg.H
+                    flows[key].npackets_rev += 1
+                    flows[key].nbytes_rev += length
+                    flows[key].direction_0 += 1
+                    # flows[key]["bytes_0"].append(length)
+                    # flows[key]["time_0"].append(t)
+            else:
+                first = key not in expired_keys
+                if arg.incremental:
+                    accumulator = FlowAccumulator(arg.H if first else 0, series)
                 else:
-                    tmp_i = 0
-                extended_flow = compute_plugin_metrics(
-                    flows[dev][ports]["bytes"][tmp_i:],
-                    flows[dev][ports]["time"][tmp_i:],
-                    dev.split("-")[0],
-                    dev.split("-")[1],
-                    ports.split("-")[0],
-                    ports.split("-")[1],
-                )
-                if extended_flow is None:
-                    continue
-                # extended_flow_0 = compute_plugin_metrics(
-                #     flows[dev][ports]["bytes_0"][tmp_i:],
-                #     flows[dev][ports]["time_0"][tmp_i:],
-                #     dev.split("-")[0],
-                #     dev.split("-")[1],
-                #     ports.split("-")[0],
-                #     ports.split("-")[1],
-                # )
-                # if extended_flow_0 is not None:
-                #     extended_flow.extend_with_0_direction(extended_flow_0)
-                
-                # extended_flow_1 = compute_plugin_metrics(
-                #     flows[dev][ports]["bytes_1"][tmp_i:],
-                #     flows[dev][ports]["time_1"][tmp_i:],
-                #     dev.split("-")[0],
-                #     dev.split("-")[1],
-                #     ports.split("-")[0],
-                #     ports.split("-")[1],
-                # )
-                # if extended_flow_1 is not None:
-                #     extended_flow.extend_with_1_direction(extended_flow_1)
-                            
-                extended_flow.DIRECTIONS = (flows[dev][ports]["direction_1"]) / (flows[dev][ports]["direction_1"] + flows[dev][ports]["direction_0"]) 
-                extended_flow.PACKETS = flows[dev][ports]["npackets"]
-                extended_flow.PACKETS_REV = flows[dev][ports]["npackets_rev"]
-                extended_flow.BYTES = flows[dev][ports]["nbytes"]
-                extended_flow.BYTES_REV = flows[dev][ports]["nbytes_rev"]
-                # export extended flow
-                writer.writerow(extended_flow.export())
-                # print
-                cnt_flows += 1
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}      Number of parsed packets: {cnt_packets}",
-                    end="",
-                    flush=False,
+                    accumulator = None
+                insert_flow(
+                    flows,
+                    timers,
+                    key,
+                    FlowRecord(length, t, accumulator, is_low, first),
                 )
+            memory.add(key, flows[key])
+            progress.update(
+                cnt_flows,
+                cnt_packets,
+                len(flows),
+                get_export_backlog(pool, pending),
+                memory,
+            )
+        for key, flow in flows.items():
+            cnt_flows += export_flow(
+                key, flow, arg, steps, header, writer, pending, pool
+            )
+            progress.update(
+                cnt_flows, cnt_packets, len(flows), get_export_backlog(pool, pending)
+            )
+        if pool is not None:
+            cnt_flows += pool.close()
+        cnt_flows += export_flows_batch(
+            pending,
+            writer,
+            steps,
+            header,
+            arg.spectral_backend,
+            arg.frequency_grid,
+        )
+        progress.close(cnt_flows, cnt_packets)
     return cnt_flows, cnt_packets
 
 
 def timeseries_plugin_timeseries_csv(arg):
     cnt_flows = 0
-    with open(arg.flows, "w") as w:
-        writer = csv.writer(w)
-        print("Write header:", end=" ")
-        writer.writerow(HEADER)
-        print("Done")
-        print("Creating extended flows from single flow time series:")
-        print(f"\r      Number of exported flows: {cnt_flows}", end="")
-        with open(arg.timeseries_csv, "r") as rf:
+    cnt_packets = 0
+    steps, header = get_export_settings(arg)
+    with open_flow_writer(arg.flows, header, arg.output_format) as writer:
+        progress = ProgressReporter(
+            "Creating extended flows from single flow time series:", arg.quiet, False
+        )
+        pending = []
+        with open_text_input(arg.timeseries_csv) as rf:
             reader = csv.reader(rf, delimiter=";")
             for row in reader:
                 if row[0] == "SRC_IP":
                     continue
                 # row is in format SRC_IP;SRC_PORT;DST_IP;DST_PORT;bytes;time
+                bytes = json.loads(row[4])
+                cnt_packets += len(bytes)
+                if arg.batch > 0:
+                    if len(bytes) == 0:
+                        continue
+                    pending.append(
+                        (bytes, json.loads(row[5]), row[0], row[2], row[1], row[3], None)
+                    )
+                    if len(pending) >= arg.batch:
+                        cnt_flows += export_flows_batch(
+                            pending,
+                            writer,
+                            steps,
+                            header,
+                            arg.spectral_backend,
+                            arg.frequency_grid,
+                        )
+                        pending = []
+                    continue
                 extended_flow = compute_plugin_metrics(
-                    json.loads(row[4]),
+                    bytes,
                     json.loads(row[5]),
                     row[0],
-                    row[1],
                     row[2],
+                    row[1],
                     row[3],
+                    steps,
+                    arg.spectral_backend,
+                    arg.frequency_grid,
                 )
                 if extended_flow is None:
                     continue
                 # export extended flow
-                writer.writerow(extended_flow.export())
+                writer.writerow(extended_flow.export(header))
                 # print
                 cnt_flows += 1
-                print(
-                    f"\r      Number of exported flows: {cnt_flows}", end="", flush=True
+                progress.update(cnt_flows, backlog=len(pending))
+        cnt_flows += export_flows_batch(
+            pending,
+            writer,
+            steps,
+            header,
+            arg.spectral_backend,
+            arg.frequency_grid,
+        )
+        progress.close(cnt_flows)
+    return cnt_flows, cnt_packets
+
+
+def timeseries_plugin_binary_timeseries(arg):
+    cnt_flows = 0
+    cnt_packets = 0
+    steps, header = get_export_settings(arg)
+    timeseries = BinaryTimeSeries(arg.timeseries_csv)
+    with open_flow_writer(arg.flows, header, arg.output_format) as writer:
+        progress = ProgressReporter(
+            "Creating extended flows from single flow time series:", arg.quiet, False
+        )
+        if arg.batch > 0:
+            for start, values, times, offsets in timeseries.iter_chunks(arg.batch):
+                # empty flows are not written by BinaryTimeSeriesWriter, skip them anyway
+                lengths = np.diff(offsets)
+                flows = np.flatnonzero(lengths > 0)
+                if len(flows) == 0:
+                    continue
+                offsets = np.zeros(len(flows) + 1, dtype=np.int64)
+                np.cumsum(lengths[flows], out=offsets[1:])
+                res, missing = compute_batch_metrics(
+                    np.asarray(values, dtype=np.int64),
+                    np.asarray(times, dtype=np.float64),
+                    offsets,
+                    steps,
+                    arg.spectral_backend,
+                    arg.frequency_grid,
                 )
-    return cnt_flows, 0
+                for row, row_missing, i in zip(res, missing, flows.tolist()):
+                    writer.writerow(
+                        export_batch_row(
+                            row,
+                            row_missing,
+                            *timeseries.get_endpoints(start + i),
+                            None,
+                            header,
+                        )
+                    )
+                cnt_flows += len(flows)
+                cnt_packets += int(offsets[-1])
+                progress.update(cnt_flows)
+            progress.close(cnt_flows)
+            return cnt_flows, cnt_packets
+        for i in range(len(timeseries)):
+            values, times = timeseries.get_flow(i)
+            cnt_packets += len(values)
+            extended_flow = compute_plugin_metrics(
+                values,
+                times,
+                *timeseries.get_endpoints(i),
+                steps,
+                arg.spectral_backend,
+                arg.frequency_grid,
+            )
+            if extended_flow is None:
+                continue
+            # export extended flow
+            writer.writerow(extended_flow.export(header))
+            # print
+            cnt_flows += 1
+            progress.update(cnt_flows)
+        progress.close(cnt_flows)
+    return cnt_flows, cnt_packets
+
+
+def get_shard_path(path: str, shard: int):
+    """Get path of output file of shard.
+
+    Args:
+        path (str): Path of merged output file.
+        shard (int): Shard.
+
+    Returns:
+        str: Path of output file of shard.
+    """
+    return f"{path}.shard{shard}"
+
+
+def run_shard(pipeline, arg, shard: int):
+    """Run pipeline on packets of one shard and write output to file of shard.
+
+    Args:
+        pipeline (function): Pipeline of input (timeseries_plugin_csv, save_timeseries, ...).
+        arg (Namespace): Parsed arguments.
+        shard (int): Shard.
+
+    Returns:
+        tuple: Number of exported flows and number of parsed packets of shard.
+    """
+    arg = copy.copy(arg)
+    arg.shard = shard
+    if arg.file != "":
+        arg.file = get_shard_path(arg.file, shard)
+    else:
+        arg.flows = get_shard_path(arg.flows, shard)
+    return pipeline(arg)
+
+
+def merge_shards(path: str, shards: int, output_format: str = "csv"):
+    """Merge outputs of shards into one output and remove them.
+
+    Args:
+        path (str): Path of merged output.
+        shards (int): Number of shards.
+        output_format (str, optional): Format of outputs, csv (one header is kept),
+            binary (time series from TIMESERIES_FORMATS), npy or parquet (from
+            OUTPUT_FORMATS). Defaults to "csv".
+    """
+    paths = [get_shard_path(path, shard) for shard in range(shards)]
+    if output_format == "binary":
+        merge_binary_timeseries(paths, path)
+    elif output_format in ("npy", "parquet"):
+        parts = [read_columnar_output(part, output_format) for part in paths]
+        header = list(parts[0])
+        writer = ColumnarWriter(path, header, output_format)
+        for part in parts:
+            if len(part[header[0]]) > 0:
+                writer.write_columns([part[name] for name in header])
+        writer.close()
+        del parts
+    else:
+        with open(path, "w", newline="") as w:
+            for shard, part in enumerate(paths):
+                with open(part, "r", newline="") as r:
+                    header = r.readline()
+                    if shard == 0:
+                        w.write(header)
+                    shutil.copyfileobj(r, w)
+    for part in paths:
+        if os.path.isdir(part):
+            shutil.rmtree(part)
+        else:
+            os.remove(part)
+
+
+def run_sharded(pipeline, arg):
+    """Run pipeline in arg.shards processes. Every process reads whole input and
+    keeps only packets of flows of its shard (get_shard), so both directions of
+    flow are in the same process. Outputs of shards are merged at the end.
+
+    Args:
+        pipeline (function): Pipeline of input (timeseries_plugin_csv, save_timeseries, ...).
+        arg (Namespace): Parsed arguments.
+
+    Returns:
+        tuple: Number of exported flows and number of parsed packets.
+    """
+    with ProcessPoolExecutor(max_workers=arg.shards) as executor:
+        futures = [
+            executor.submit(run_shard, pipeline, arg, shard)
+            for shard in range(arg.shards)
+        ]
+        results = [future.result() for future in futures]
+    if arg.file != "":
+        merge_shards(arg.file, arg.shards, arg.file_format)
+    else:
+        merge_shards(arg.flows, arg.shards, arg.output_format)
+    return sum(r[0] for r in results), sum(r[1] for r in results)
 
 
 def parse_arguments():
@@ -2374,7 +6708,7 @@ def parse_arguments():
     parser.add_argument(
         "-c",
         "--csv",
-        help="Specification of csv file with IP header info from tcpdump command (tcpdump -r  example.pcap -N -n -q -tt > example.csv).",
+        help="Specification of csv file with IP header info from tcpdump command (tcpdump -r  example.pcap -N -n -q -tt > example.csv), may be compressed by gzip, xz, bzip2 or zstd, - reads standard input.",
         type=str,
         metavar="NAME.pcap",
         default="",
@@ -2382,7 +6716,7 @@ def parse_arguments():
     parser.add_argument(
         "-t",
         "--timeseries_csv",
-        help="Specification of csv file with single flow time series.",
+        help="Specification of csv file with single flow time series (or directory of binary single flow time series from --file-format binary), csv file may be compressed, - reads standard input.",
         type=str,
         metavar="NAME.pcap",
         default="",
@@ -2390,7 +6724,7 @@ def parse_arguments():
     parser.add_argument(
         "-p",
         "--pcap",
-        help="Specification of pcap file for pcap type of input.",
+        help="Specification of pcap or pcapng file for pcap type of input, may be compressed by gzip, xz, bzip2 or zstd, - reads standard input (e.g. tcpdump -w - | feature_mining.py -p - ...).",
         type=str,
         metavar="NAME.pcap",
         default="",
@@ -2402,6 +6736,18 @@ def parse_arguments():
         type=str,
         metavar="NAME.csv",
     )
+    parser.add_argument(
+        "--output-format",
+        help="""Format of -f output:
+    csv     - CSV file, features without value are empty (default),
+    npy     - directory with typed .npy file per column and schema.json, features without
+              value are NaN, boolean features are float 0/1,
+    parquet - Parquet file with the same types, boolean features are nullable bool
+              (requires pyarrow).""",
+        type=str,
+        choices=OUTPUT_FORMATS,
+        default="csv",
+    )
     parser.add_argument(
         "--file",
         help="Specification of CSV file for packet time series. Default is disabled.",
@@ -2409,6 +6755,16 @@ def parse_arguments():
         metavar="NAME.csv",
         default="",
     )
+    parser.add_argument(
+        "--file-format",
+        help="""Format of --file:
+    csv    - rows SRC_IP;SRC_PORT;DST_IP;DST_PORT;bytes;time (default),
+    binary - directory with flat arrays of values and times of all flows, offsets of flows
+             and table of flow keys, memory mapped by -t without decoding of rows.""",
+        type=str,
+        choices=TIMESERIES_FORMATS,
+        default="csv",
+    )
     parser.add_argument(
         "-H",
         help="Remove first x packets from flow (do not add into analysis). Default is disabled.",
@@ -2423,7 +6779,139 @@ def parse_arguments():
         metavar="NUMBER",
         default=0,
     )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        help="Compute features of flows in batches of x flows by batched engine. Default is disabled.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Update accumulators of flows at packet arrival instead of storing time series, time series is stored only for features that need it. Used instead of batched engine.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--workers",
+        help="Compute features of expired flows by x worker processes, main process only assembles flows and writes results. Default is disabled.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    parser.add_argument(
+        "--ordered",
+        help="Write flows computed by workers in the same order as without workers. Default is order in which workers finish.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--parsers",
+        help="Parse -c input by chunks in x processes, packets are passed to flow assembler in order of file. Default is parsing in main process.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    parser.add_argument(
+        "--no-cache",
+        help=f"Do not read or write binary cache of parsed packets (NAME{PACKET_CACHE_SUFFIX} next to -p or -c input). Default is to parse input once and read packets from cache in next runs.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shards",
+        help="Split packets of -c or -p input by flow into x shards processed by x processes, outputs of shards are merged. Default is disabled.",
+        type=int,
+        metavar="NUMBER",
+        default=1,
+    )
+    parser.add_argument(
+        "--shard",
+        help="Process only shard x of --shards in this process and write its output without merge (for example to run shards on more machines). Default is all shards.",
+        type=int,
+        metavar="NUMBER",
+        default=None,
+    )
+    parser.add_argument(
+        "--max-memory",
+        help="Ceiling of estimated memory of flow table in MB, flows are evicted by --eviction-policy above it. Default is unlimited.",
+        type=int,
+        metavar="MB",
+        default=0,
+    )
+    parser.add_argument(
+        "--max-flows",
+        help="Ceiling of number of flows in flow table, flows are evicted by --eviction-policy above it. Default is unlimited.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    parser.add_argument(
+        "--max-buffered-packets",
+        help="Ceiling of number of packets buffered in flow table, flows are evicted by --eviction-policy above it. Default is unlimited.",
+        type=int,
+        metavar="NUMBER",
+        default=0,
+    )
+    parser.add_argument(
+        "--eviction-policy",
+        help="""Policy of eviction from flow table above --max-memory, --max-flows or
+--max-buffered-packets, evicted flows are exported early with EVICTED column True:
+    idle    - flows with the oldest last packet (the longest idle) first (default),
+    lru     - least recently updated flows first,
+    largest - flows with the most buffered packets first, flow table is reduced
+              to 90 %% of limits.""",
+        type=str,
+        choices=EVICTION_POLICIES,
+        default="idle",
+    )
+    parser.add_argument(
+        "--quiet",
+        help="Do not print progress, only JSON summary of run at the end.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Measure time of pipeline stages (parse, assemble, features, write) and of feature functions by flow length, write JSON report to x and print it as text. Default is disabled.",
+        type=str,
+        metavar="NAME.json",
+        default="",
+    )
+    parser.add_argument(
+        "--spectral-backend",
+        help="""Backend of Lomb-Scargle periodogram for spectral features:
+    astropy - astropy LombScargle with default method (default),
+    direct  - exact evaluation of periodogram, O(n * frequencies),
+    fast    - O(n log n) extirpolation and FFT checked against exact evaluation.""",
+        type=str,
+        choices=SPECTRAL_BACKENDS,
+        default="astropy",
+    )
+    parser.add_argument(
+        "--frequency-grid",
+        help="""Frequency grid of periodogram for spectral features:
+    fixed    - the same grid of N frequencies from 1/Pmax to 1/Pmin for all flows (default),
+    adaptive - grid sized to duration and number of packets of flow, cached per size class.""",
+        type=str,
+        choices=FREQUENCY_GRIDS,
+        default="fixed",
+    )
+    parser.add_argument(
+        "--feature-set",
+        help=f"Compute and export only features of feature set ({', '.join(FEATURE_REDUCTED.FEATURES)}), list from FEATURE_REDUCTED.py or comma separated features. Default is all features.",
+        type=str,
+        metavar="NAME",
+        default="",
+    )
     arg = parser.parse_args()
+    if arg.output_format == "parquet" and pyarrow is None:
+        parser.error("--output-format parquet requires pyarrow")
+    if arg.shard is not None and not 0 <= arg.shard < arg.shards:
+        parser.error("--shard must be from 0 to --shards - 1")
+    if arg.profile != "" and (arg.workers > 0 or (arg.shards > 1 and arg.shard is None)):
+        parser.error("--profile measures only main process, it cannot be used with --workers or --shards")
+    if arg.shards > 1 and arg.shard is None and STDIN_PATH in (arg.pcap, arg.csv):
+        parser.error("--shards reads input in every shard, use --shard with standard input")
+    if arg.pcap != "" and (arg.batch > 0 or arg.incremental):
+        parser.error("-p computes features only by default engine, it cannot be used with -b or --incremental")
     return arg
 
 
@@ -2431,42 +6919,45 @@ def main():
     """Main function of the module."""
     arg = parse_arguments()
 
-    print("Loadind pcap:", end=" ")
-
+    if arg.profile != "":
+        profiler = Profiler()
+        profiler.enable()
     tic = time.perf_counter()
-    print("Open write file")
-    if arg.pcap != "":
-        if arg.file != "":
-            cnt_flows, cnt_packets = save_timeseries(arg)
+    if arg.pcap != "" or arg.csv != "":
+        if arg.pcap != "" and arg.file != "":
+            pipeline = save_timeseries
+        elif arg.pcap != "":
+            pipeline = timeseries_plugin
+        elif arg.file != "":
+            pipeline = save_timeseries_csv
         else:
-            cnt_flows, cnt_packets = timeseries_plugin(arg)
-    elif arg.csv != "":
-        if arg.file != "":
-            cnt_flows, cnt_packets = save_timeseries_csv(arg)
+            pipeline = timeseries_plugin_csv
+        if arg.shards > 1 and arg.shard is None:
+            cnt_flows, cnt_packets = run_sharded(pipeline, arg)
         else:
-            cnt_flows, cnt_packets = timeseries_plugin_csv(arg)
+            cnt_flows, cnt_packets = pipeline(arg)
     elif arg.timeseries_csv != "":
         if arg.file != "":
             print(
                 "WARNING: Creating single flow timeseries file from another single flow timeseries file is stupid. Use cp command."
             )
             sys.exit(1)
+        elif is_binary_timeseries(arg.timeseries_csv):
+            cnt_flows, cnt_packets = timeseries_plugin_binary_timeseries(arg)
         else:
             cnt_flows, cnt_packets = timeseries_plugin_timeseries_csv(arg)
     else:
         print("ERROR: Not input selected!")
         sys.exit(1)
     toc = time.perf_counter()
-    print("")
-    if cnt_flows != 0:
-        print(
-            f"Completed in {toc - tic:0.4f} seconds, thats is {(toc - tic)/cnt_flows:0.4f} seconds on one flow, that is {1/((toc - tic)/cnt_flows)} flow per second."
-        )
-    if cnt_packets != 0:
-        print(
-            f"It parse one packet at {(toc - tic)/cnt_packets:0.4f} seconds, that is {1/((toc - tic)/cnt_packets)} packets per second."
-        )
-    print("All exported")
+    if arg.profile != "":
+        profiler.disable()
+        report = profiler.get_report(toc - tic)
+        with open(arg.profile, "w") as f:
+            json.dump(report, f, indent=2)
+        if not arg.quiet:
+            print(format_profile_report(report))
+    print(json.dumps(get_summary(arg, cnt_flows, cnt_packets, toc - tic)))
 
 
 if __name__ == "__main__":